@@ -0,0 +1,268 @@
+################################################################################
+# Author:
+# Date:
+# Description:
+#
+#
+#
+# Copyright:
+#
+#
+################################################################################
+# Import libraries
+import os
+import types
+import hashlib
+import functools
+import numpy as np
+import pandas as pd
+
+# Specific
+from collections import OrderedDict
+
+# Attributes that are not stored (recomputed from the arguments)
+_SKIP = ['_raw', '_config', 'estimator', '_timings']
+
+
+# -------------------------------------------------------------------------
+#                            helper methods
+# -------------------------------------------------------------------------
+def _update(h, value):
+    """Updates the hash with the (normalized) content of the value.
+
+    The arrays are hashed by dtype, shape and content, the dictionaries
+    are sorted by key and the objects (e.g. weights functions) by class
+    and attributes, so that equal configurations have equal hashes. The
+    functions are hashed by name and also by their code, constants,
+    default values and closure (e.g. lambdas or functions created by
+    the same factory with different values), and the partial functions
+    by function and arguments.
+
+    Parameters
+    ----------
+    h : hashlib object
+      The hash to update.
+
+    value : object
+      The value.
+
+    Returns
+    -------
+    None
+    """
+    if isinstance(value, (pd.Series, pd.DataFrame)):
+        value = value.to_numpy()
+    if isinstance(value, np.ndarray):
+        value = np.ascontiguousarray(value)
+        h.update(b'a%s%s' % (value.dtype.str.encode(),
+                             str(value.shape).encode()))
+        h.update(value.tobytes() if value.dtype != object
+                 else repr(value.tolist()).encode())
+    elif isinstance(value, dict):
+        h.update(b'd%d' % len(value))
+        for k in sorted(value, key=str):
+            _update(h, str(k))
+            _update(h, value[k])
+    elif isinstance(value, (list, tuple)):
+        h.update(b'l%d' % len(value))
+        for v in value:
+            _update(h, v)
+    elif isinstance(value, functools.partial):
+        h.update(b'p')
+        _update(h, [value.func, value.args, value.keywords])
+    elif isinstance(value, types.MethodType):
+        h.update(b'm')
+        _update(h, [value.__self__, value.__func__])
+    elif isinstance(value, types.CodeType):
+        h.update(b'c%s' % value.co_code)
+        _update(h, [value.co_consts, value.co_names])
+    elif isinstance(value, type) or callable(value):
+        h.update(b'f%s.%s' % (str(getattr(value, '__module__', '')).encode(),
+            str(getattr(value, '__qualname__', repr(value))).encode()))
+        if isinstance(value, types.FunctionType):
+            cells = [c.cell_contents for c in value.__closure__ or []
+                     if c.cell_contents is not value]
+            _update(h, [value.__code__, value.__defaults__,
+                        value.__kwdefaults__, cells])
+    elif hasattr(value, '__dict__'):
+        _update(h, value.__class__)
+        _update(h, vars(value))
+    else:
+        h.update(b'v%s%s' % (type(value).__name__.encode(),
+                             repr(value).encode()))
+
+
+def fit_key(wrapper, kwargs):
+    """Returns the key of a fit (wrapper and arguments).
+
+    Parameters
+    ----------
+    wrapper : object
+      The wrapper (e.g. WLSWrapper).
+
+    kwargs : dict-like
+      The arguments passed to fit (e.g. endog, exog, weights, order).
+
+    Returns
+    -------
+    string
+    """
+    h = hashlib.sha1()
+    _update(h, [wrapper.__class__, wrapper.estimator,
+                wrapper.__dict__.get('diagnostics'), kwargs])
+    return h.hexdigest()
+
+
+class FitCache:
+    """Content-addressed cache of fitted wrappers.
+
+    The fits are identified by a hash of the arguments passed to fit
+    (e.g. the content of endog, exog and weights and the configuration)
+    together with the wrapper class and estimator. The results of the
+    fit (``_result``, residuals, coefficients and covariance matrix) are
+    kept in memory with a bounded size (least recently used fits are
+    discarded) and, optionally, on disk (one compact npz file per fit,
+    see pyamr.core.serialize).
+
+    .. note:: The fits retrieved from the cache do not have the underlying
+              model (_raw) so methods that need it (e.g. get_prediction)
+              are not available. The coefficients and covariance matrix
+              are available in _params and _cov_params.
+
+    Examples
+    --------
+
+    .. code-block:: python
+
+        # Enable the cache for all the wrappers
+        BaseWrapper.cache = FitCache(maxsize=1024, path='./fits')
+
+        # The second fit is retrieved from the cache
+        WLSWrapper(estimator=sm.WLS).fit(endog=x, trend='c')
+        WLSWrapper(estimator=sm.WLS).fit(endog=x, trend='c')
+
+        # Disable
+        BaseWrapper.cache = None
+    """
+
+    def __init__(self, maxsize=128, path=None):
+        """Constructor.
+
+        Parameters
+        ----------
+        maxsize : int
+          The maximum number of fits kept in memory.
+
+        path : string, default=None
+          The folder to store the fits on disk. If None, the fits are
+          only kept in memory.
+
+        Returns
+        -------
+        FitCache instance
+        """
+        self.maxsize = maxsize
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+
+    def __len__(self):
+        return len(self._memory)
+
+    # ---------------------------------------------------------------------
+    #                           helper methods
+    # ---------------------------------------------------------------------
+    def _file(self, key):
+        """Returns the path of the file of the key."""
+        return os.path.join(self.path, '%s.npz' % key)
+
+    def _copy(self, state):
+        """Returns a copy of the state (shallow copy of its containers).
+
+        The wrappers retrieved from the cache may update their attributes
+        (e.g. _result or _config in grid_search), so the dictionaries and
+        the coefficients (_params) are not shared with the cache or with
+        other hits. The arrays are not copied.
+        """
+        return {k: v.copy() if isinstance(v, (dict, list, pd.Series))
+                else v for k, v in state.items()}
+
+    def _remember(self, key, state):
+        """Adds the state to memory (discarding the oldest)."""
+        self._memory[key] = state
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)
+
+    # ---------------------------------------------------------------------
+    #                             get and put
+    # ---------------------------------------------------------------------
+    def get(self, key):
+        """Returns the stored state of the fit (or None).
+
+        Parameters
+        ----------
+        key : string
+          The key (see fit_key).
+
+        Returns
+        -------
+        dict-like with the attributes of the wrapper or None.
+        """
+        # Memory
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return self._copy(self._memory[key])
+
+        # Disk
+        if self.path is not None and os.path.exists(self._file(key)):
+            from pyamr.core.serialize import load_wrappers
+            w = load_wrappers(self._file(key))[0]
+            state = {k: v for k, v in w.__dict__.items() if k not in _SKIP}
+            self._remember(key, state)
+            self.hits += 1
+            return self._copy(state)
+
+        # Missing
+        self.misses += 1
+        return None
+
+    def put(self, key, wrapper):
+        """Stores the fitted wrapper.
+
+        Parameters
+        ----------
+        key : string
+          The key (see fit_key).
+
+        wrapper : object
+          The fitted wrapper.
+
+        Returns
+        -------
+        None
+        """
+        # Compact state
+        state = self._copy({k: v for k, v in wrapper.__dict__.items()
+                            if k not in _SKIP})
+        state['_result'] = dict(wrapper._result)
+        params = getattr(wrapper._raw, 'params', None)
+        cov = getattr(wrapper._raw, 'cov_params', None)
+        if params is not None and callable(cov):
+            state['_params'] = pd.Series(params, index=getattr(
+                getattr(wrapper._raw, 'model', None), 'param_names', None))
+            state['_cov_params'] = np.asarray(cov())
+        self._remember(key, state)
+
+        # Disk
+        if self.path is not None:
+            from pyamr.core.serialize import save_wrappers
+            os.makedirs(self.path, exist_ok=True)
+            save_wrappers([wrapper], self._file(key))
+
+    def clear(self):
+        """Removes the fits from memory (the files on disk are kept)."""
+        self._memory.clear()
+        self.hits, self.misses = 0, 0
@@ -0,0 +1,385 @@
+################################################################################
+# Author:
+# Date:
+# Description:
+#
+#
+#
+# Copyright:
+#
+#
+################################################################################
+# Import libraries
+import itertools
+import numpy as np
+import pandas as pd
+
+# Import sari
+from pyamr.core.sari import sari
+
+
+# -------------------------------------------------------------------------
+#                            helper methods
+# -------------------------------------------------------------------------
+def _aggregate(codes, counts, sizes):
+    """Adds up the counts of the rows with the same codes.
+
+    Parameters
+    ----------
+    codes: np.array
+        The integer codes with shape (n, k).
+
+    counts: np.array
+        The frequencies with shape (n, outcomes).
+
+    sizes: list
+        The number of categories for each of the k dimensions.
+
+    Returns
+    -------
+    codes, counts: np.array
+        The unique codes (sorted) and the aggregated frequencies.
+    """
+    # No dimensions (grand total)
+    if codes.shape[1] == 0:
+        return codes[:1], counts.sum(axis=0, keepdims=True)
+
+    # Linear (flat) index of each row
+    flat = np.ravel_multi_index(codes.T, sizes)
+
+    # Aggregate
+    ukeys, inverse = np.unique(flat, return_inverse=True)
+    agg = np.zeros((ukeys.size, counts.shape[1]))
+    np.add.at(agg, inverse, counts)
+
+    # Return
+    return np.column_stack(np.unravel_index(ukeys, sizes)), agg
+
+
+class FrequencyCube:
+    """Frequency cube with precomputed roll-ups.
+
+    The susceptibility test records are counted once for each combination
+    of the dimensions (e.g. specimen, organism, antimicrobial and month)
+    and outcome. The dimensions are integer coded and the counts are
+    stored sparsely (only combinations with records). In addition, the
+    marginal roll-ups (all the subsets of the dimensions, also known as
+    lattice of cuboids) are precomputed so that any slice can be queried
+    without scanning the raw records again.
+
+    Examples
+    --------
+
+    .. code-block:: python
+
+        # Build cube
+        cube = FrequencyCube(dimensions=['SPECIMEN',
+                                         'MICROORGANISM',
+                                         'GENUS',
+                                         'ANTIMICROBIAL',
+                                         'CATEGORY'],
+                             column_date='DATE',
+                             period='M').fit(data)
+
+        # Resistance by organism and antimicrobial for urine cultures
+        cube.compute_sari(by=['MICROORGANISM', 'ANTIMICROBIAL'],
+                          where={'SPECIMEN': 'URICUL'})
+    """
+
+    # Attributes
+    c_spe = 'SPECIMEN'
+    c_org = 'MICROORGANISM'
+    c_abx = 'ANTIMICROBIAL'
+    c_dat = 'DATE'
+    c_out = 'SENSITIVITY'
+
+    def __init__(self, dimensions=[c_spe, c_org, c_abx],
+                       column_date=None,
+                       column_outcome=c_out,
+                       period='M',
+                       rollups=None):
+        """Constructor.
+
+        Parameters
+        ----------
+        dimensions: list
+            The labels of the columns used as dimensions.
+
+        column_date: string, default=None
+            The column with the dates. If not None, an additional
+            dimension (with the same name) is included with the dates
+            converted to periods (e.g. month).
+
+        column_outcome: string
+            The column with the outcome (e.g. sensitive, resistant).
+
+        period: string, default='M'
+            The period used to convert the dates (see pd.Period).
+
+        rollups: list of lists, default=None
+            The roll-ups to precompute. If None, all the subsets of
+            the dimensions are precomputed.
+
+        Returns
+        --------
+        FrequencyCube instance
+        """
+        # Columns
+        self.c_dat = column_date
+        self.c_out = column_outcome
+
+        # Configuration
+        self.period = period
+        self.rollups = rollups
+        self.dimensions = list(dimensions)
+        if column_date is not None:
+            self.dimensions.append(column_date)
+
+        # Containers
+        self.categories = {}
+        self.outcomes = None
+        self.cuboids = {}
+
+    # ---------------------------------------------------------------------
+    #                           helper methods
+    # ---------------------------------------------------------------------
+    def _key(self, dimensions):
+        """Returns the cuboid key (sorted indexes) for the dimensions."""
+        # Check dimensions
+        missing = set(dimensions).difference(self.dimensions)
+        if missing:
+            raise ValueError("""
+                The dimensions {0} are not in the cube. The available
+                dimensions are {1}.""".format(sorted(missing),
+                                             self.dimensions))
+        # Return
+        return tuple(sorted(self.dimensions.index(d) for d in dimensions))
+
+    def _sizes(self, key):
+        """Returns the number of categories for each dimension in key."""
+        return [len(self.categories[self.dimensions[i]]) for i in key]
+
+    def _rollup(self, key):
+        """Computes the cuboid from the smallest precomputed parent.
+
+        Parameters
+        ----------
+        key: tuple
+            The indexes of the dimensions in the cuboid.
+
+        Returns
+        -------
+        codes, counts: np.array
+        """
+        # Find the smallest precomputed parent
+        parents = [k for k in self.cuboids if set(key).issubset(k)]
+        parent = min(parents, key=lambda k: self.cuboids[k][0].shape[0])
+        codes, counts = self.cuboids[parent]
+
+        # Select the columns and aggregate
+        columns = [parent.index(i) for i in key]
+        return _aggregate(codes[:, columns], counts, self._sizes(key))
+
+    # ---------------------------------------------------------------------
+    #                               build
+    # ---------------------------------------------------------------------
+    def fit(self, dataframe):
+        """Builds the cube from the susceptibility test records.
+
+        Parameters
+        ----------
+        dataframe: pd.DataFrame
+            The DataFrame with the raw susceptibility test records.
+
+        Returns
+        -------
+        FrequencyCube instance
+        """
+        # Copy the relevant columns
+        columns = self.dimensions + [self.c_out]
+        aux = dataframe[columns].dropna()
+
+        # Format as period
+        if self.c_dat is not None:
+            aux[self.c_dat] = \
+                pd.to_datetime(aux[self.c_dat]).dt.to_period(self.period)
+
+        # Integer code the dimensions and outcome
+        codes = np.empty((aux.shape[0], len(self.dimensions)), dtype=np.int64)
+        for i, c in enumerate(self.dimensions):
+            codes[:, i], self.categories[c] = \
+                pd.factorize(aux[c], sort=True)
+        outcome, self.outcomes = pd.factorize(aux[self.c_out], sort=True)
+
+        # One-hot counts of the outcomes
+        counts = np.zeros((aux.shape[0], len(self.outcomes)))
+        counts[np.arange(aux.shape[0]), outcome] = 1
+
+        # Base cuboid (all dimensions)
+        base = tuple(range(len(self.dimensions)))
+        self.cuboids = {}
+        self.cuboids[base] = _aggregate(codes, counts, self._sizes(base))
+
+        # Roll-ups to precompute
+        if self.rollups is None:
+            keys = [k for n in range(len(base))
+                    for k in itertools.combinations(base, n)]
+        else:
+            keys = [self._key(r) for r in self.rollups]
+
+        # Compute from larger to smaller (parents first).
+        for key in sorted(set(keys), key=len, reverse=True):
+            if key not in self.cuboids:
+                self.cuboids[key] = self._rollup(key)
+
+        # Return
+        return self
+
+    # ---------------------------------------------------------------------
+    #                               query
+    # ---------------------------------------------------------------------
+    def query(self, by, where=None):
+        """Queries the frequencies of a slice of the cube.
+
+        Parameters
+        ----------
+        by: list
+            The dimensions to group by.
+
+        where: dict, default=None
+            The values (scalar or list) to select for some dimensions,
+            e.g. {'SPECIMEN': 'URICUL'}. These dimensions are added
+            up unless they also appear in by.
+
+        Returns
+        -------
+        pd.DataFrame
+            The frequencies with the dimensions in by as index and the
+            outcomes as columns (similar to SARI.compute).
+        """
+        # Format
+        by = [by] if isinstance(by, str) else list(by)
+        where = {} if where is None else where
+
+        # Find (or compute) the cuboid
+        key = self._key(set(by).union(where))
+        if key not in self.cuboids:
+            self.cuboids[key] = self._rollup(key)
+        codes, counts = self.cuboids[key]
+
+        # Filter
+        mask = np.ones(codes.shape[0], dtype=bool)
+        for c, values in where.items():
+            values = [values] if np.isscalar(values) else list(values)
+            if c == self.c_dat:
+                values = pd.PeriodIndex(values, freq=self.period)
+            indexer = self.categories[c].get_indexer(values)
+            mask &= np.isin(codes[:, key.index(self._key([c])[0])], indexer)
+
+        # Aggregate by
+        target = self._key(by)
+        columns = [key.index(i) for i in target]
+        codes, counts = _aggregate(codes[mask][:, columns],
+            counts[mask], self._sizes(target))
+
+        # Create index (in the order given by the user)
+        order = [target.index(self._key([c])[0]) for c in by]
+        arrays = [self.categories[c][codes[:, i]] for c, i in zip(by, order)]
+        index = None
+        if len(by) == 1:
+            index = arrays[0].rename(by[0])
+        elif len(by) > 1:
+            index = pd.MultiIndex.from_arrays(arrays, names=by)
+
+        # Create DataFrame
+        freqs = pd.DataFrame(counts, index=index,
+            columns=pd.Index(self.outcomes))
+        if len(by) > 1:
+            freqs = freqs.sort_index()
+
+        # Return
+        return freqs
+
+    def compute_sari(self, by, where=None, return_frequencies=True, **kwargs):
+        """Computes the single antibiotic resistance index of a slice.
+
+        Parameters
+        ----------
+        by: list
+            The dimensions to group by.
+
+        where: dict, default=None
+            The values to select for some dimensions (see query).
+
+        return_frequencies: boolean, default=True
+            Whether to return the frequencies or just the resistance index.
+
+        **kwargs: arguments to pass the sari function (e.g. strategy).
+
+        Returns
+        -------
+        pd.Series or pd.DataFrame
+            The resistance index (pd.Series) or a pd.DataFrame with the
+            resistance index (sari) and the frequencies.
+        """
+        # Query frequencies
+        freqs = self.query(by=by, where=where)
+
+        # Return
+        if return_frequencies:
+            freqs['freq'] = freqs.sum(axis=1)
+            freqs['sari'] = sari(freqs, **kwargs)
+            return freqs
+        return sari(freqs, **kwargs).rename('sari')
+
+
+
+if __name__ == '__main__': # pragma: no cover
+
+    # Libraries
+    import time
+    import pandas as pd
+
+    # Specific
+    from pyamr.core.sari import SARI
+    from pyamr.core.cube import FrequencyCube
+
+    # ----------------------------------
+    # Create data
+    # ----------------------------------
+    # Number of records
+    n = 100000
+
+    # Create susceptibility test records
+    data = pd.DataFrame({
+        'DATE': pd.Timestamp('2020-01-01') +
+            pd.to_timedelta(np.random.randint(0, 730, n), unit='D'),
+        'SPECIMEN': np.random.choice(['BLDCUL', 'URICUL'], n),
+        'MICROORGANISM': np.random.choice(['ECOL', 'SAUR', 'KPNE'], n),
+        'ANTIMICROBIAL': np.random.choice(['AAUG', 'ACIP', 'AMER'], n),
+        'SENSITIVITY': np.random.choice(['sensitive', 'resistant'], n)
+    })
+
+    # Build cube
+    t0 = time.time()
+    cube = FrequencyCube(dimensions=['SPECIMEN',
+                                     'MICROORGANISM',
+                                     'ANTIMICROBIAL'],
+                         column_date='DATE').fit(data)
+    print("\nCube built in %.3fs with %s cuboids." %
+          (time.time() - t0, len(cube.cuboids)))
+
+    # Query
+    t0 = time.time()
+    r1 = cube.compute_sari(by=['MICROORGANISM', 'ANTIMICROBIAL'],
+                           where={'SPECIMEN': 'URICUL'})
+    print("\nQuery in %.5fs:" % (time.time() - t0))
+    print(r1)
+
+    # Compare with SARI
+    r2 = SARI(groupby=['MICROORGANISM',
+                       'ANTIMICROBIAL',
+                       'SENSITIVITY']) \
+        .compute(data[data.SPECIMEN == 'URICUL'])
+    print("\nSARI:")
+    print(r2)
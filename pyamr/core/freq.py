@@ -14,8 +14,17 @@ import numpy as np
 import pandas as pd
 
 
-class Frequency(): # pragma: no cover
-    """
+class Frequency():
+    """Computes the frequencies of the susceptibility test outcomes.
+
+    The time-series frequencies (ITI and OTI) are computed for all the
+    groups at once. The records are scattered (added) into a dense
+    array of shape (groups, time bins, outcomes) and the overlapping
+    windows are obtained from its cumulative sum along the time axis.
+
+    .. note: The dense array has one cell per group, time bin and
+             outcome. For very long periods at daily resolution with
+             many groups, consider a larger sampling frequency.
     """
 
     # Attributes
@@ -85,6 +94,132 @@ class Frequency(): # pragma: no cover
                              "the following [pairs, organisms, antibiotics]; "
                              "the value <%s> was found." % by_category)
 
+    def _time_bins(self, dates, freq):
+        """This method assigns each date to a time bin.
+
+        The bins (and their labels) are the same that pd.Grouper and
+        resample would create. However, they are computed only for the
+        unique dates and then broadcasted to all the records.
+
+        Parameters
+        ----------
+        dates : pd.Series
+          The dates (no missing values).
+
+        freq : string
+          The frequency sample (e.g. 1D, 1M, 7D, ...)
+
+        Returns
+        -------
+        labels : pd.DatetimeIndex
+          The labels of the (dense) time bins.
+
+        bins : np.array
+          The bin of each date.
+        """
+        # Unique dates
+        udates, inverse = np.unique(dates.values, return_inverse=True)
+
+        # Bin of each date (as assigned by pandas, including the
+        # empty bins) and labels of the dense bins.
+        grouped = pd.Series(np.arange(len(udates)),
+            index=pd.DatetimeIndex(udates)).groupby(pd.Grouper(freq=freq))
+        labels = grouped.size().index
+        ubins = grouped.ngroup().to_numpy()
+
+        # Return
+        return labels, ubins[inverse]
+
+    def _scatter(self, dataframe, by_category='pairs', fs='1D'):
+        """This method computes the dense frequency array.
+
+        Parameters
+        ----------
+        dataframe:  dataframe-like
+          The microbiology dataframe.
+
+        by_category: string
+          The category to group the outcomes (see compute).
+
+        fs : string
+          The frequency sample (e.g. 1D, 1M, 7D, ...)
+
+        Returns
+        -------
+        counts : np.array
+          The frequencies with shape (groups, time bins, outcomes).
+
+        first, last : np.array
+          The first and last time bin with records for each group.
+
+        keys : pd.DataFrame
+          The values of the categories for each group.
+
+        labels : pd.DatetimeIndex
+          The labels of the time bins.
+
+        outcomes : pd.Index
+          The outcomes.
+        """
+        # Get the definition of groupby
+        groupby = self._by_category_groupby(by_category)
+
+        # Remove records that cannot be counted.
+        dataframe = dataframe.dropna(subset=groupby + [self.c_dat])
+
+        # Integer codes for groups, time bins and outcomes.
+        grouped = dataframe.groupby(groupby[:-1], sort=True)
+        g = grouped.ngroup().to_numpy()
+        o, outcomes = pd.factorize(dataframe[self.c_out], sort=True)
+        labels, t = self._time_bins(dataframe[self.c_dat], fs)
+
+        # Shape
+        G, T, O = grouped.ngroups, len(labels), len(outcomes)
+
+        # Scatter-add the records into the dense array.
+        counts = np.bincount((g * T + t) * O + o, minlength=G * T * O)
+        counts = counts.reshape(G, T, O).astype(float)
+
+        # Range of bins with records for each group.
+        first = np.full(G, T - 1)
+        last = np.zeros(G, dtype=int)
+        np.minimum.at(first, g, t)
+        np.maximum.at(last, g, t)
+
+        # Values of the categories for each group.
+        keys = grouped.size().index.to_frame(index=False)
+
+        # Return
+        return counts, first, last, keys, labels, pd.Index(outcomes)
+
+    def _to_dataframe(self, counts, first, last, keys, labels, outcomes):
+        """This method creates the frequency DataFrame from the dense array.
+
+        For each group only the time bins between the first and the last
+        record are included; that is, the same range resample would give
+        when applied to each group independently.
+
+        Returns
+        -------
+        dataframe
+        """
+        # Mask with the range of each group.
+        bins = np.arange(len(labels))
+        mask = (bins >= first[:, None]) & (bins <= last[:, None])
+        gi, ti = np.nonzero(mask)
+
+        # Create index
+        arrays = [keys[c].to_numpy()[gi] for c in keys.columns]
+        index = pd.MultiIndex.from_arrays(arrays + [labels[ti]],
+            names=list(keys.columns) + [self.c_dat])
+
+        # Create DataFrame
+        dataframe = pd.DataFrame(counts[gi, ti], index=index,
+            columns=outcomes.rename(self.c_out))
+
+        # Return
+        return dataframe
+
     def fit(self):
         """
         """
@@ -129,31 +264,23 @@ class Frequency(): # pragma: no cover
         -------
         dataframe
         """
-        # Format the dataframe to have datetime index
-        dataframe = dataframe.reset_index()
-        dataframe = dataframe.set_index(self.c_dat)
-
-        # Get the definition of groupby
-        groupby = [pd.Grouper(freq=fs)] + self._by_category_groupby(by_category)
-
-        # Compute independent window
-        dataframe = dataframe.groupby(groupby).size().unstack().fillna(0)
-
-        # Resample
-        dataframe = dataframe.reset_index()
-        dataframe = dataframe.set_index(self.c_dat) \
-            .groupby([self.c_org, self.c_abx]) \
-            .resample(fs).mean() \
-            .fillna(0)
+        # Compute dense frequencies
+        counts, first, last, keys, labels, outcomes = \
+            self._scatter(dataframe, by_category=by_category, fs=fs)
 
         # Return
-        return dataframe
+        return self._to_dataframe(counts, first, last,
+                                  keys, labels, outcomes)
 
     def _compute_overlapping(self, dataframe, by_category='pairs',
                              wshift='1D',
                              wsize='2D'):
         """This method computes the overlapping time intervals frequency
 
+        Each window includes the time bin and the previous ones (wsize
+        bins in total). Similar to rolling with min_periods=1, the
+        first windows include the available bins only.
+
         Parameters
         ----------
         dataframe:  dataframe-like
@@ -167,42 +294,39 @@ class Frequency(): # pragma: no cover
         wshift : string
           The shift between consecutive windows (OTI).
 
-        wsize : integer
-          The size of the window (OTI)
+        wsize : integer or string
+          The size of the window (OTI) as number of shifts (e.g. 5) or
+          as a fixed duration multiple of wshift (e.g. 90D).
 
         Returns
         -------
         dataframe
         """
-        # Format the dataframe to have datetime index
-        dataframe = self._compute_independent(dataframe=dataframe,
-                                              by_category=by_category,
-                                              fs=wshift)
-
-        # Reset index
-        dataframe = dataframe.reset_index()
-
-        # Compute rolling window
-        dataframe = dataframe.groupby([self.c_org, self.c_abx], as_index=False) \
-            .apply(lambda x: x.set_index(self.c_dat) \
-                   .rolling(window=wsize).sum()).fillna(0)
-
-        # Drop index level (which appears when executing previous code)
-        dataframe.index = dataframe.index.droplevel()
-
-
-        print(dataframe)
-        print(self.c_dat, self.c_org, self.c_abx)
-
-        # Resample
-        dataframe = dataframe.reset_index()
-        dataframe = dataframe.set_index(self.c_dat) \
-            .groupby([self.c_org, self.c_abx]) \
-            .resample(wshift).mean() \
-            .fillna(0)
+        # Number of bins in the window.
+        if isinstance(wsize, str):
+            try:
+                wsize = pd.Timedelta(wsize) // pd.Timedelta(wshift)
+            except ValueError:
+                raise ValueError("The window size <%s> cannot be converted "
+                                 "to a number of shifts <%s>. Please use an "
+                                 "integer instead." % (wsize, wshift))
+        if wsize is None or int(wsize) < 1:
+            raise ValueError("The window size must be at least one shift; "
+                             "the value <%s> was found." % wsize)
+        wsize = int(wsize)
+
+        # Compute dense frequencies
+        counts, first, last, keys, labels, outcomes = \
+            self._scatter(dataframe, by_category=by_category, fs=wshift)
+
+        # Compute windows from the cumulative sum.
+        cumsum = np.cumsum(counts, axis=1)
+        windows = cumsum.copy()
+        windows[:, wsize:] -= cumsum[:, :-wsize]
 
         # Return
-        return dataframe
+        return self._to_dataframe(windows, first, last,
+                                  keys, labels, outcomes)
 
     def compute(self, dataframe, strategy='overall',
                 by_category='pairs',
@@ -212,7 +336,7 @@ class Frequency(): # pragma: no cover
         """This function computes the frequencies.
 
         The method allows to compute the overall frequencies, the frequencies for
-        independent time intervals (ITI) such as monthly or yearly and the
+        independent time intervals (ITI) such as daily, monthly or yearly and the
         frequencies for overlapping time intervals (OTI) in which the parameters
         wshift and wsize need to be specified.
 
@@ -221,19 +345,22 @@ class Frequency(): # pragma: no cover
         dataframe:  dataframe-like
           The microbiology dataframe with the following columns.
 
+        strategy: string, options = {overall, ITI, OTI}
+          The strategy used to compute the frequencies.
+
         by_category: string
           The category to group the outcomes. The outcomes are grouped in pairs
           formed by (organism, antibiotic) by default. However, these can be
           also grouped by organisms or antibiotics.
 
         fs : string
-          The frequency sample (e.g. 1D, 1M, 7D, ...)
+          The frequency sample (e.g. 1D, 1M, 7D, ...). By default is 1D (daily).
 
-        wshift : integer
-          The shift between consecutive windows (OTI).
+        wshift : string
+          The shift between consecutive windows (OTI). By default is 1D.
 
-        wsize : integer
-          The size of the window (OTI)
+        wsize : integer or string
+          The size of the window (OTI). It is required for OTI.
 
         Returns
         -------
@@ -261,14 +388,18 @@ class Frequency(): # pragma: no cover
         elif strategy == 'ITI':
             return self._compute_independent(dataframe=dataframe,
                                              by_category=by_category,
-                                             fs=fs)
+                                             fs='1D' if fs is None else fs)
 
         elif strategy == 'OTI':
             return self._compute_overlapping(dataframe=dataframe,
                                              by_category=by_category,
-                                             wshift=wshift,
+                                             wshift='1D' if wshift is None else wshift,
                                              wsize=wsize)
 
+        raise ValueError("The strategy parameter must be one of the following "
+                         "[overall, ITI, OTI]; the value <%s> was found."
+                         % strategy)
+
 
 if __name__ == '__main__': # pragma: no cover
 
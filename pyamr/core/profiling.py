@@ -0,0 +1,207 @@
+################################################################################
+# Author:
+# Date:
+# Description:
+#
+#
+#
+# Copyright:
+#
+#
+################################################################################
+# Import libraries
+import time
+import threading
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+# Specific
+from contextlib import contextmanager
+
+# The phases of the wrappers (in report order)
+PHASES = ['cache', 'deepcopy', 'fit', 'evaluate', 'diagnostics', 'summary']
+
+# The memory frames of the phases being recorded (nested) in each thread
+_LOCAL = threading.local()
+
+
+# -------------------------------------------------------------------------
+#                            helper methods
+# -------------------------------------------------------------------------
+@contextmanager
+def _memory():
+    """Measures the memory high-water mark (bytes) of the block.
+
+    The phases can be nested (e.g. diagnostics within evaluate) so the
+    peak of an inner phase is propagated to the outer phases. The memory
+    is traced (tracemalloc) only while the outermost phase runs, unless
+    it was already being traced.
+
+    Yields
+    ------
+    list whose only element is set to the high-water mark on exit.
+    """
+    # Start tracing
+    stack = _LOCAL.__dict__.setdefault('stack', [])
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+
+    # Keep the peak of the outer phase and reset
+    current, peak = tracemalloc.get_traced_memory()
+    if stack:
+        stack[-1][1] = max(stack[-1][1], peak)
+    tracemalloc.reset_peak()
+    frame = [current, current]
+    stack.append(frame)
+
+    # Run
+    result = [0]
+    try:
+        yield result
+    finally:
+        peak = max(frame[1], tracemalloc.get_traced_memory()[1])
+        result[0] = peak - frame[0]
+        stack.pop()
+        if stack:
+            stack[-1][1] = max(stack[-1][1], peak)
+        if started:
+            tracemalloc.stop()
+
+
+def _add(wrapper, phase, seconds, memory=np.nan):
+    """Adds a call of the phase to the records of the wrapper.
+
+    The records are kept in wrapper._timings as {phase: [calls, seconds,
+    max seconds, max bytes]}.
+    """
+    timings = wrapper.__dict__.setdefault('_timings', {})
+    calls, total, slowest, highest = \
+        timings.get(phase, [0, 0.0, 0.0, np.nan])
+    timings[phase] = [calls + 1, total + seconds, max(slowest, seconds),
+                      float(np.fmax(highest, memory))]
+
+
+@contextmanager
+def record(wrapper, phase):
+    """Records the time (and memory) of a phase of the wrapper.
+
+    Nothing is recorded unless the attribute profiling of the wrapper
+    is True (time) or 'memory' (time and memory high-water mark).
+
+    Parameters
+    ----------
+    wrapper : object
+      The wrapper.
+
+    phase : string
+      The phase (e.g. fit, evaluate, diagnostics, summary).
+
+    Returns
+    -------
+    None
+    """
+    # Not profiling
+    profiling = getattr(wrapper, 'profiling', False)
+    if not profiling:
+        yield
+        return
+
+    # Record time
+    if profiling != 'memory':
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            _add(wrapper, phase, time.perf_counter() - start)
+        return
+
+    # Record time and memory (also if the phase fails)
+    try:
+        with _memory() as peak:
+            start = time.perf_counter()
+            try:
+                yield
+            finally:
+                seconds = time.perf_counter() - start
+    finally:
+        _add(wrapper, phase, seconds, peak[0])
+
+
+def profile_report(wrappers):
+    """Returns the report of the phases recorded in the wrappers.
+
+    The phases may be nested (e.g. diagnostics is included in evaluate
+    when the diagnostics are computed during the fit), so the total times
+    do not add up.
+
+    Parameters
+    ----------
+    wrappers : object or list
+      The wrapper or wrappers (e.g. those returned by grid_search or by
+      SARIMAXWrapper.auto with return_fits=True).
+
+    Returns
+    -------
+    pd.DataFrame with the phases as index and the number of calls, total
+    seconds, mean seconds, maximum seconds and memory high-water mark
+    (megabytes, nan if not recorded) as columns.
+    """
+    # Format
+    if not isinstance(wrappers, (list, tuple)):
+        wrappers = [wrappers]
+
+    # Aggregate
+    records = {}
+    for w in wrappers:
+        for phase, (calls, total, slowest, highest) in \
+                w.__dict__.get('_timings', {}).items():
+            r = records.setdefault(phase, [0, 0.0, 0.0, np.nan])
+            r[0] += calls
+            r[1] += total
+            r[2] = max(r[2], slowest)
+            r[3] = float(np.fmax(r[3], highest))
+
+    # Create report
+    report = pd.DataFrame.from_dict(records, orient='index',
+        columns=['calls', 'total', 'max', 'memory'], dtype=float)
+    report['mean'] = report.total / report.calls
+    report['memory'] /= 2 ** 20
+    report['calls'] = report.calls.astype(int)
+    order = [p for p in PHASES if p in records] + \
+            sorted(set(records).difference(PHASES))
+
+    # Return
+    return report.loc[order, ['calls', 'total', 'mean', 'max', 'memory']] \
+        .rename_axis('phase')
+
+
+
+if __name__ == '__main__': # pragma: no cover
+
+    # Libraries
+    import statsmodels.api as sm
+
+    # Import pyamr
+    from pyamr.core.regression.wls import WLSWrapper
+    from pyamr.datasets.load import make_timeseries
+
+    # Create timeseries
+    x, y, f = make_timeseries()
+
+    # Profile the grid search (time and memory)
+    wrapper = WLSWrapper(estimator=sm.WLS)
+    wrapper.profiling = 'memory'
+    wrappers = wrapper.grid_search(grid_params=[
+        {'endog': [y], 'trend': ['c'], 'weights': [None, f]},
+        {'endog': [y[:50]], 'trend': ['c']}])
+
+    # Access a summary
+    wrappers[0].as_series()
+
+    # Report of a wrapper and of the whole grid search
+    print("\nWrapper:")
+    print(profile_report(wrappers[0]))
+    print("\nGrid search:")
+    print(profile_report(wrappers))
@@ -32,6 +32,7 @@ from pyamr.core.regression.wreg import RegressionWrapper
 from pyamr.core.regression.wreg import _forecast_error
 from pyamr.core.regression.wreg import _forecast_conf_int
 from pyamr.core.regression.wreg import _insample_conf_int
+from pyamr.core.regression.wreg import _stepwise_search
 
 
 class ARIMAWrapper(RegressionWrapper):
@@ -249,10 +250,12 @@ class ARIMAWrapper(RegressionWrapper):
   # ---------------------------------------------------------------------------
   def auto(self, endog, exog=None, ic='bic', trends=['n','c'], max_ar=3,
                  max_ma=3, max_d=1, warn='ignore', return_fits=False, 
-                 converged=True, disp=0, verbose=0, **kwargs):
+                 converged=True, disp=0, verbose=0, n_jobs=None,
+                 search='grid', max_fits=None, **kwargs):
     """This method finds the best arima through bruteforce.
 
-    Note: It uses grid search through the base wrapper.
+    Note: It uses grid search through the base wrapper. The orders with
+          no parameters to estimate (p=q=0 without trend) are skipped.
 
     Parameters
     ----------
@@ -287,30 +290,65 @@ class ARIMAWrapper(RegressionWrapper):
       Whether or not to return only converging models. If false all models
       are returned. If true, only those models that converged are returned.
 
+    n_jobs: int, default=None
+      The number of workers used to fit the candidates (see grid_search).
+
+    search: string, options = {grid, stepwise}
+      Whether to fit all the candidates (grid) or to move from simple
+      models to the best neighbour until the information criteria does
+      not improve (stepwise, see _stepwise_search).
+
+    max_fits: int, default=None
+      The maximum number of models to fit in the stepwise search.
+
     Returns
     -------
     """
-    # Compute all the orders to perform bruteforce search.
-    # Note that some orders are not valid, these will throw an
-    # exception that will be catched in the base wrapper 
-    # grid_search method. For instance (0,0,0) is invalid.
-    orders = set(itertools.product(*[np.arange(0,max_ar+1),
-                                     np.arange(0,max_d+1),
-                                     np.arange(0,max_ma+1)]))
-
-    # Parameters
-    grid_params = {'exog': [exog], 
-                   'endog': [endog], 
-                   'order': orders,
-                   'trend': trends, 
-                   'disp': [0]}
-
-    # Perform grid search
+    # Check search
+    if search not in ['grid', 'stepwise']:
+      raise ValueError("""
+          The search <{0}> is not supported. The options are
+          grid or stepwise.""".format(search))
+
+    def candidate(position):
+      """Returns the key and fit arguments (None if invalid)."""
+      p, d, q, t = [int(e) for e in position]
+      # Invalid (no parameters to estimate)
+      if p == q == 0 and trends[t] in ['n', 'nc']:
+        return None
+      # Return
+      return ((p, d, q), trends[t]), \
+             {'exog': exog, 'endog': endog, 'order': (p, d, q),
+              'trend': trends[t], 'disp': 0}
+
+    # Bounds of the position (p, d, q, trend)
+    bounds = (max_ar, max_d, max_ma, len(trends) - 1)
+
+    # Perform search
     with warnings.catch_warnings():
       # What to do with the warnings
       warnings.filterwarnings(warn)
-      # Perform gridsearch.
-      wrappers = self.grid_search(grid_params=grid_params, verbose=verbose)
+
+      # Stepwise search (for each difference)
+      if search == 'stepwise':
+        memo = {}
+        for d in range(max_d + 1):
+          starts = [(2, d, 2, 0), (0, d, 0, 0), (1, d, 0, 0), (0, d, 1, 0)]
+          wrappers = _stepwise_search(self,
+            starts=[tuple(min(e, b) for e, b in zip(p, bounds))
+                    for p in starts],
+            bounds=bounds, candidate=candidate, ic=ic, converged=converged,
+            pairs=[(0, 2)], categorical=[3], fixed=[1], memo=memo,
+            max_fits=max_fits, n_jobs=n_jobs)
+
+      # Grid search
+      else:
+        grids = [candidate(p) for p in
+                 itertools.product(*[range(b + 1) for b in bounds])]
+        grids = [{k: [v] for k, v in c[1].items()}
+                 for c in grids if c is not None]
+        wrappers = self.grid_search(grid_params=grids, verbose=verbose,
+                                    n_jobs=n_jobs)
 
     # Keep only those that converged.
     if converged:
@@ -0,0 +1,341 @@
+################################################################################
+# Author:
+# Date:
+# Description:
+#
+#
+#
+# Copyright:
+#
+#
+################################################################################
+# Libraries
+import os
+import math
+import warnings
+import numpy as np
+import pandas as pd
+
+# Specific
+from copy import deepcopy
+
+# Import pyamr
+from pyamr.metrics.scores import _forecast_scores
+
+
+# -----------------------------------------------------------------------------
+#                              helper methods
+# -----------------------------------------------------------------------------
+def _slice(kwargs, n, lo, hi):
+    """Slices the arguments with the same length as the series.
+
+    Parameters
+    ----------
+    kwargs : dict-like
+      The arguments to fit the wrapper (e.g. weights, exog).
+
+    n : int
+      The length of the whole series.
+
+    lo, hi : int
+      The training window [lo, hi).
+
+    Returns
+    -------
+    dict-like
+    """
+    return {k: v[lo:hi] if isinstance(v, (np.ndarray, pd.Series))
+                           and len(v) == n else v
+            for k, v in kwargs.items()}
+
+
+def _backtest_task(template, kwargs, endog, windows, horizon, warm_start):
+    """Fits and forecasts the wrapper at consecutive origins.
+
+    The origins are fitted in order so that the wrappers implementing
+    refit (e.g. SARIMAXWrapper) can start from the parameters of the
+    previous origin.
+
+    Parameters
+    ----------
+    template : object
+      The wrapper (not fitted).
+
+    kwargs : dict-like
+      The arguments to fit the wrapper.
+
+    endog : np.array
+      The whole time series.
+
+    windows : list
+      The training windows (lo, hi) of each origin.
+
+    horizon : int
+      The number of steps to forecast.
+
+    warm_start : bool
+      Whether to refit from the previous origin (if supported).
+
+    Returns
+    -------
+    forecasts (len(windows), horizon) and list of errors.
+    """
+    # Containers
+    forecasts = np.full((len(windows), horizon), np.nan)
+    errors, previous = [], None
+
+    # Loop
+    for i, (lo, hi) in enumerate(windows):
+        params = _slice(kwargs, len(endog), lo, hi)
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                # Fit
+                if warm_start and previous is not None and \
+                        hasattr(previous, 'refit'):
+                    wrapper = previous.refit(endog=endog[lo:hi], **params)
+                else:
+                    wrapper = deepcopy(template).fit(endog=endog[lo:hi],
+                                                     **params)
+                # Forecast (last horizon values)
+                prediction = wrapper.get_prediction(start=None,
+                    end=hi - lo + horizon - 1)
+            forecasts[i] = np.asarray(prediction)[1, -horizon:]
+            previous = wrapper
+        except Exception as e:
+            errors.append((hi, str(e)))
+            previous = None
+
+    # Return
+    return forecasts, errors
+
+
+class Backtest:
+    """Rolling or expanding origin evaluation of forecasting wrappers.
+
+    For each origin t (the number of observations available), the wrapper
+    is fitted to the training window and the next ``horizon`` values are
+    forecasted. The training window is either expanding (all the values
+    until t) or rolling (the last ``window`` values until t). The errors
+    are then summarised for each configuration and horizon with the mean
+    absolute error (mae), mean absolute percentage error (mape), mean
+    directional accuracy (mda) and mean absolute scaled error (mase).
+
+    .. note:: The configurations are evaluated in parallel (n_jobs). The
+              origins of a configuration are evaluated in order so that
+              the wrappers implementing refit (e.g. SARIMAXWrapper) are
+              warm-started from the previous origin. When n_jobs exceeds
+              the number of configurations, the origins are also split in
+              contiguous blocks (warm-started within each block).
+
+    Examples
+    --------
+
+    .. code-block:: python
+
+        # Configurations (name, wrapper and fit arguments)
+        configs = {
+            'wls': (WLSWrapper(estimator=sm.WLS), {'trend': 'c'}),
+            'sarimax': (SARIMAXWrapper(estimator=SARIMAX),
+                        {'order': (1, 0, 0), 'trend': 'c', 'disp': 0})
+        }
+
+        # Evaluate
+        bt = Backtest(horizon=3, initial=24, n_jobs=2).fit(x, configs)
+        bt.scores()
+    """
+
+    def __init__(self, horizon=1, initial=None, step=1, window=None,
+                       warm_start=True, n_jobs=None):
+        """Constructor.
+
+        Parameters
+        ----------
+        horizon : int
+          The number of steps to forecast at each origin.
+
+        initial : int, default=None
+          The first origin (number of observations to fit). If None, half
+          of the series.
+
+        step : int
+          The number of observations between consecutive origins.
+
+        window : int, default=None
+          The length of the rolling training window. If None, the window
+          is expanding (from the start of the series).
+
+        warm_start : bool
+          Whether to refit from the previous origin (if supported).
+
+        n_jobs : int, default=None
+          The number of processes. If None or 1 it is serial. If -1, all
+          the processors are used.
+
+        Returns
+        -------
+        Backtest instance
+        """
+        # Configuration
+        self.horizon = horizon
+        self.initial = initial
+        self.step = step
+        self.window = window
+        self.warm_start = warm_start
+        self.n_jobs = n_jobs
+
+        # Results
+        self.names = []
+        self.origins = None
+        self.forecasts = None
+        self.actuals = None
+        self.errors = {}
+
+    # ---------------------------------------------------------------------------
+    #                               helper methods
+    # ---------------------------------------------------------------------------
+    def _windows(self, n):
+        """Returns the training windows (lo, hi) of each origin."""
+        # First origin
+        initial = n // 2 if self.initial is None else self.initial
+        if initial < 2 or initial >= n:
+            raise ValueError("""
+                The initial origin {0} must be between 2 and the length
+                of the series minus one ({1}).""".format(initial, n - 1))
+        # Windows
+        return [(0 if self.window is None else max(0, t - self.window), t)
+                for t in range(initial, n, self.step)]
+
+    # ---------------------------------------------------------------------------
+    #                                    fit
+    # ---------------------------------------------------------------------------
+    def fit(self, endog, configs):
+        """Evaluates the configurations on the series.
+
+        Parameters
+        ----------
+        endog : array-like
+          The time series.
+
+        configs : dict-like
+          The configurations as name and tuple (wrapper, fit arguments).
+          The arguments with the same length as the series (e.g. weights)
+          are sliced with the training window.
+
+        Returns
+        -------
+        Backtest instance
+        """
+        # Format
+        endog = np.asarray(endog, dtype=float)
+        n, h = endog.size, self.horizon
+        windows = self._windows(n)
+
+        # Number of jobs
+        n_jobs = self.n_jobs
+        if n_jobs is not None and n_jobs < 0:
+            n_jobs = os.cpu_count()
+
+        # Blocks of origins
+        blocks = 1
+        if n_jobs is not None and n_jobs > len(configs):
+            blocks = min(len(windows), math.ceil(n_jobs / len(configs)))
+        size = math.ceil(len(windows) / blocks)
+        blocks = [windows[i:i + size] for i in range(0, len(windows), size)]
+
+        # Tasks
+        tasks = [(name, template, kwargs, endog, b, h, self.warm_start)
+                 for name, (template, kwargs) in configs.items()
+                 for b in blocks]
+
+        # Compute
+        if n_jobs is None or n_jobs == 1 or len(tasks) < 2:
+            outputs = [_backtest_task(*t[1:]) for t in tasks]
+        else:
+            from concurrent import futures
+            with futures.ProcessPoolExecutor(max_workers=n_jobs) as pool:
+                outputs = list(pool.map(_backtest_task,
+                    *zip(*[t[1:] for t in tasks])))
+
+        # Gather results (configurations, origins, horizons)
+        self.names = list(configs)
+        self.origins = np.array([hi for lo, hi in windows])
+        self.forecasts = np.concatenate([o[0] for o in outputs]) \
+            .reshape(len(configs), len(windows), h)
+        self.errors = {name: [] for name in self.names}
+        for t, o in zip(tasks, outputs):
+            self.errors[t[0]].extend(o[1])
+
+        # Actual values (NaN beyond the series)
+        idx = self.origins[:, None] + np.arange(h)
+        self.actuals = np.where(idx < n, endog[np.minimum(idx, n - 1)],
+                                np.nan)
+
+        # Last value and in-sample naive error (for mda and mase)
+        self._last = endog[self.origins - 1]
+        self._scale = np.array([np.abs(np.diff(endog[lo:hi])).mean()
+                                for lo, hi in windows])
+
+        # Return
+        return self
+
+    # ---------------------------------------------------------------------------
+    #                                  scores
+    # ---------------------------------------------------------------------------
+    def scores(self):
+        """Returns the scores of each configuration and horizon.
+
+        Returns
+        -------
+        pd.DataFrame with the configuration and horizon as index and the
+        scores (mae, mape, mda and mase) as columns.
+        """
+        # Compute (configurations, horizons)
+        scores = _forecast_scores(self.actuals, self.forecasts,
+                                  self._last, self._scale)
+
+        # Create index
+        index = pd.MultiIndex.from_product(
+            [self.names, np.arange(1, self.horizon + 1)],
+            names=['config', 'horizon'])
+
+        # Return
+        return pd.DataFrame({k: v.ravel() for k, v in scores.items()},
+                            index=index)
+
+
+
+if __name__ == '__main__': # pragma: no cover
+
+    # Libraries
+    import time
+    import statsmodels.api as sm
+    from statsmodels.tsa.statespace.sarimax import SARIMAX
+
+    # Import pyamr
+    from pyamr.core.regression.wls import WLSWrapper
+    from pyamr.core.regression.sarimax import SARIMAXWrapper
+    from pyamr.datasets.load import make_timeseries
+
+    # Create timeseries
+    x, y, f = make_timeseries()
+
+    # Configurations
+    configs = {
+        'wls': (WLSWrapper(estimator=sm.WLS), {'trend': 'c'}),
+        'wls-w': (WLSWrapper(estimator=sm.WLS), {'trend': 'c', 'weights': f}),
+        'sarimax': (SARIMAXWrapper(estimator=SARIMAX),
+                    {'order': (1, 0, 0), 'trend': 'c', 'disp': 0}),
+    }
+
+    # Evaluate (expanding)
+    t0 = time.time()
+    bt = Backtest(horizon=3, initial=50, n_jobs=3).fit(y, configs)
+    print("\nExpanding origin (%.2fs):" % (time.time() - t0))
+    print(bt.scores())
+
+    # Evaluate (rolling)
+    t0 = time.time()
+    bt = Backtest(horizon=3, initial=50, window=40).fit(y, configs)
+    print("\nRolling origin (%.2fs):" % (time.time() - t0))
+    print(bt.scores())
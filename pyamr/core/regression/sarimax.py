@@ -26,6 +26,8 @@ from statsmodels.tsa.statespace.sarimax import SARIMAX
 
 # Libraries wrapper.
 from pyamr.core.regression.wreg import RegressionWrapper
+from pyamr.core.regression.wreg import _stepwise_search
+from pyamr.core.stats.wbase import fargs
 
 
 # --------------------------------------------------------------------------
@@ -40,6 +42,29 @@ def _cast_float(e):
         return e
 
 
+def _warm_start(wrapper, params):
+    """Returns the start parameters for a neighbour model.
+
+    The parameters of the fitted wrapper are reused only if the neighbour
+    extends it (same trend, differences and period and larger or equal
+    orders). Then the fitted values with the new lags set to zero are a
+    point of the neighbour model with the same likelihood. Otherwise, the
+    parametrization changes (e.g. the intercept depends on the
+    autoregressive terms) and None is returned.
+    """
+    # Orders
+    p, d, q = params['order']
+    P, D, Q, s = params['seasonal_order']
+    p0, d0, q0 = wrapper.order
+    P0, D0, Q0, s0 = wrapper.seasonal_order
+    # Nested
+    nested = (params['trend'] == wrapper.trend) and \
+             (d, D, s) == (d0, D0, s0) and \
+             p >= p0 and q >= q0 and P >= P0 and Q >= Q0
+    # Return
+    return wrapper.params_dict() if nested else None
+
+
 class SARIMAXWrapper(RegressionWrapper):
     """Description
 
@@ -174,6 +199,95 @@ class SARIMAXWrapper(RegressionWrapper):
         # Return
         return smry
 
+    # --------------------------------------------------------------------------
+    #                              warm start
+    # --------------------------------------------------------------------------
+    def _fit_class(self, **kwargs):
+        """This method creates and fits the model.
+
+        It extends the base method so that start_params can also be a
+        dictionary (or pd.Series) with the values of the parameters by
+        name (see params_dict). In such case, the parameters which are
+        not in the model are ignored and those which are missing start
+        from the default values (zero for the new lags). If the fit fails
+        with these values (e.g. non-stationary), it is repeated with the
+        default start parameters.
+        """
+        # Get arguments
+        conkwargs = fargs(self.estimator.__init__, kwargs)
+        fitkwargs = fargs(self.estimator.fit, kwargs)
+
+        # Create model
+        model = self.estimator(**conkwargs)
+
+        # Map parameters by name
+        start = fitkwargs.get('start_params', None)
+        if isinstance(start, (dict, pd.Series)):
+            start = dict(start)
+            names = model.param_names
+            if not set(names).issubset(start):
+                default = dict(zip(names, model.start_params))
+                for name in names:
+                    if name not in start and ('.L' not in name):
+                        start[name] = default[name]
+            fitkwargs['start_params'] = \
+                np.array([start.get(n, 0.0) for n in names])
+
+        # Fit (with default start parameters if warm start fails)
+        try:
+            self._raw = model.fit(**fitkwargs)
+        except Exception as e:
+            if start is None:
+                raise e
+            fitkwargs.pop('start_params')
+            self._raw = model.fit(**fitkwargs)
+
+    def params_dict(self):
+        """This method returns the fitted parameters by name.
+
+        It can be passed as start_params to fit models with a similar
+        order or on a similar time series (e.g. the next window).
+        """
+        return dict(zip(self._raw.model.param_names,
+                        np.asarray(self._raw.params)))
+
+    def refit(self, endog, exog=None, warm_start=True, **kwargs):
+        """This method fits the same model on another time series.
+
+        It is useful to fit consecutive (e.g. rolling) windows of the same
+        time series where the parameters change slowly, so the optimizer
+        starts from the current parameters and needs fewer iterations.
+
+        Parameters
+        ----------
+        endog : array-like
+          The endogenous variable (aka. time series data)
+
+        exog : array-like
+          The exogenous variable.
+
+        warm_start : bool
+          Whether to start from the current parameters.
+
+        kwargs : dict-like
+          Other arguments to overwrite the current configuration.
+
+        Returns
+        -------
+        SARIMAXWrapper
+        """
+        # Same configuration
+        params = {k: v for k, v in self._config.items()
+                  if k not in ['endog', 'exog', 'start_params']}
+        params.update(kwargs)
+        if warm_start:
+            params.setdefault('start_params', self.params_dict())
+
+        # Return
+        return self.__class__(estimator=self.estimator,
+                              diagnostics=self.diagnostics) \
+            .fit(endog=endog, exog=exog, **params)
+
     # ---------------------------------------------------------------------------
     #                           prediction method
     # ---------------------------------------------------------------------------
@@ -240,10 +354,15 @@ class SARIMAXWrapper(RegressionWrapper):
     def auto(self, endog, exog=None, ic='bic', max_ar=3, max_ma=3, max_d=1,
              max_P=0, max_D=0, max_Q=0, list_s=[12], warn='ignore',
              trends=['n', 'c', 't', 'ct'], return_fits=False, verbose=0,
-             converged=True, **kwargs):
+             converged=True, n_jobs=None, search='grid', max_fits=None,
+             warm_start=False, start_from=None, **kwargs):
         """This method finds the best arima through bruteforce.
 
-        Note: It uses grid search through the base wrapper.
+        Note: It uses grid search through the base wrapper. Models which
+              are invalid or equivalent to others are not fitted. For
+              instance, the order (0,0,0)x(0,0,0) with trend 'n' is
+              skipped and the seasonal order (0,0,0,s) is only fitted
+              for the first period s in list_s.
 
         Parameters
         ----------
@@ -286,37 +405,107 @@ class SARIMAXWrapper(RegressionWrapper):
           Whether or not to return only converging models. If false all models
           are returned. If true, only those models that converged are returned.
 
+        n_jobs: int, default=None
+          The number of workers used to fit the candidates (see grid_search).
+
+        search: string, options = {grid, stepwise}
+          Whether to fit all the candidates (grid) or to move from simple
+          models to the best neighbour until the information criteria does
+          not improve (stepwise, see _stepwise_search). The stepwise search
+          fits a fraction of the models but it might not find the best one.
+
+        max_fits: int, default=None
+          The maximum number of models to fit in the stepwise search.
+
+        warm_start: bool
+          Whether to start the optimization of the neighbours from the
+          parameters of the current best model (stepwise search).
+
+        start_from: list of SARIMAXWrapper, default=None
+          The models fitted for another time series (e.g. the fits for the
+          previous window). The candidates with the same order, seasonal
+          order and trend start the optimization from their parameters.
+
         Returns
         -------
         """
-        # Compute all the orders to perform bruteforce search.
-        # Note that some orders are not valid, these will throw an
-        # exception that will be catched in the base wrapper
-        # grid_search method. For instance (0,0,0) is invalid.
-        orders = list(itertools.product(*[np.arange(0, max_ar + 1),
-                                          np.arange(0, max_d + 1),
-                                          np.arange(0, max_ma + 1)]))
-
-        # Similar than previous guide but with seasonal orders.
-        seasonal_orders = list(itertools.product(*[np.arange(0, max_P + 1),
-                                                   np.arange(0, max_D + 1),
-                                                   np.arange(0, max_Q + 1),
-                                                   list_s]))
-
-        # Parameters
-        grid_params = {'exog': [exog],
-                       'endog': [endog],
-                       'order': orders,
-                       'seasonal_order': seasonal_orders,
-                       'trend': trends,
-                       'disp': [0]}
-
-        # Perform grid search
-        with warnings.catch_warnings():
-            # What to do with the warnings
-            warnings.filterwarnings(warn)
-            # Perform grid search.
-            wrappers = self.grid_search(grid_params=grid_params, verbose=verbose)
+        # Check search
+        if search not in ['grid', 'stepwise']:
+            raise ValueError("""
+                The search <{0}> is not supported. The options are
+                grid or stepwise.""".format(search))
+
+        # Start parameters
+        if isinstance(start_from, SARIMAXWrapper):
+            start_from = [start_from]
+        start = {(tuple(w.order), tuple(w.seasonal_order), w.trend):
+                 w.params_dict() for w in (start_from or [])}
+
+        def candidate(position):
+            """Returns the key and fit arguments (None if invalid)."""
+            p, d, q, P, D, Q, s, t = [int(e) for e in position]
+            # Seasonal order (equivalent for all periods when zero)
+            if P == D == Q == 0:
+                s = 0
+            # Invalid (no parameters to estimate)
+            if p == d == q == P == D == Q == 0 and trends[t] == 'n':
+                return None
+            # Return
+            order, seasonal_order = (p, d, q), (P, D, Q, list_s[s])
+            params = {'exog': exog, 'endog': endog, 'order': order,
+                      'seasonal_order': seasonal_order,
+                      'trend': trends[t], 'disp': 0}
+            key = (order, seasonal_order, trends[t])
+            if key in start:
+                params['start_params'] = start[key]
+            return key, params
+
+        # Bounds of the position (p, d, q, P, D, Q, s, trend)
+        bounds = (max_ar, max_d, max_ma, max_P, max_D, max_Q,
+                  len(list_s) - 1, len(trends) - 1)
+
+        # Stepwise search
+        if search == 'stepwise':
+            # Starting models (Hyndman and Khandakar, 2008)
+            starts = [(2, 0, 2, 1, 0, 1, 0, 0),
+                      (0, 0, 0, 0, 0, 0, 0, 0),
+                      (1, 0, 0, 1, 0, 0, 0, 0),
+                      (0, 0, 1, 0, 0, 1, 0, 0)]
+
+            # Models fitted
+            memo = {}
+
+            with warnings.catch_warnings():
+                # What to do with the warnings
+                warnings.filterwarnings(warn)
+                # Perform stepwise search (for each difference).
+                for d in range(max_d + 1):
+                    wrappers = _stepwise_search(self, starts=[
+                            tuple(min(e, b) for e, b in
+                                  zip(p[:1] + (d,) + p[2:], bounds))
+                            for p in starts],
+                        bounds=bounds, candidate=candidate, ic=ic,
+                        converged=converged, pairs=[(0, 2), (3, 5)],
+                        categorical=[6, 7], fixed=[1], memo=memo,
+                        max_fits=max_fits, n_jobs=n_jobs,
+                        warm_start=_warm_start if warm_start else None)
+
+        # Grid search
+        else:
+            # Compute all the valid (and distinct) candidates.
+            grids = {}
+            for position in itertools.product(*[range(b + 1) for b in bounds]):
+                c = candidate(position)
+                if c is not None and c[0] not in grids:
+                    grids[c[0]] = {k: [v] for k, v in c[1].items()}
+
+            # Perform grid search
+            with warnings.catch_warnings():
+                # What to do with the warnings
+                warnings.filterwarnings(warn)
+                # Perform grid search.
+                wrappers = self.grid_search(grid_params=list(grids.values()),
+                    verbose=verbose, n_jobs=n_jobs)
 
         # Keep only those that converged.
         if converged:
@@ -19,6 +19,381 @@ import statsmodels.api as sm
 
 # Import pyamr
 from pyamr.core.regression.wregression import BaseRegressionWrapper
+from pyamr.core.stats.kendall import _inversions
+from pyamr.core.profiling import record
+
+# Largest number of pairwise slopes enumerated by fast_theilslopes (per
+# observation, i.e. the bracket is narrowed until it has at most _BUDGET * n)
+_BUDGET = 8
+
+# Largest number of pairwise slopes in memory (theilslopes_batch)
+_CHUNK = 2 ** 23
+
+
+# -----------------------------------------------------------------------------
+#                              helper methods
+# -----------------------------------------------------------------------------
+def _ties(x):
+    """Sum of k(k-1)(2k+5) over the runs of equal values of each column.
+
+    Parameters
+    ----------
+    x : np.array
+      The values (n, m). The nan values are not ties.
+
+    Returns
+    -------
+    np.array (m,)
+    """
+    n, m = x.shape
+    xs = np.sort(x, axis=0)
+    new = np.ones(xs.shape, dtype=bool)
+    new[1:] = xs[1:] != xs[:-1]
+    tp = np.bincount(np.cumsum(new.T.ravel()) - 1).astype(float)
+    col = np.repeat(np.arange(m), n)[new.T.ravel()]
+    return np.bincount(col, weights=tp * (tp - 1) * (2 * tp + 5), minlength=m)
+
+
+def _ranks(nt, sigsq, alpha):
+    """Ranks (0-based) of the confidence interval in the sorted slopes.
+
+    It implements (2.6) from Sen (1968) as scipy theilslopes.
+
+    Parameters
+    ----------
+    nt : np.array
+      The number of slopes.
+
+    sigsq : np.array
+      The variance (see Sen 1968).
+
+    alpha : float
+      The confidence degree.
+
+    Returns
+    -------
+    lower and upper ranks (nan if not available).
+    """
+    from scipy.stats import norm
+    alpha = 1. - alpha if alpha > 0.5 else alpha
+    z = norm.ppf(alpha / 2.)
+    with np.errstate(invalid='ignore'):
+        sigma = np.sqrt(sigsq)
+    ru = np.minimum(np.round((nt - z * sigma) / 2.), nt - 1)
+    rl = np.maximum(np.round((nt + z * sigma) / 2.) - 1, 0)
+    invalid = np.isnan(sigma) | (nt < 1)
+    return np.where(invalid, np.nan, rl), np.where(invalid, np.nan, ru)
+
+
+def _order(x, y, t, tie):
+    """Order of the points by y - t*x (ties by -x and then tie).
+
+    When t is -inf the points are sorted by x (ties by y and then tie).
+    """
+    if np.isneginf(t):
+        return np.lexsort((tie, y, x))
+    return np.lexsort((tie, -x, y - t * x))
+
+
+def _flips(x, y, lo, hi):
+    """Ranks at hi of the points sorted at lo.
+
+    For two points with x[i] < x[j], the order of y - t*x changes when t
+    crosses their slope. Hence, the pairs with slope in (lo, hi] are the
+    inversions of the returned ranks.
+
+    Returns
+    -------
+    order (at lo) and ranks (at hi) of the points in that order.
+    """
+    idx = np.arange(x.size)
+    a = _order(x, y, lo, idx)
+    position = np.empty_like(idx)
+    position[a] = idx
+    b = _order(x, y, hi, position)
+    rank = np.empty_like(idx)
+    rank[b] = idx
+    return a, rank[a]
+
+
+def _inversion_pairs(r):
+    """Pairs i < j with r[i] > r[j] of a permutation.
+
+    The pairs are enumerated with a bottom-up merge sort (as the count in
+    pyamr.core.stats.kendall._inversions) where the left elements greater
+    than each right element are a contiguous range of the merged block.
+
+    Returns
+    -------
+    positions (i, j) of the pairs.
+    """
+    n = r.size
+    idx = np.arange(n)
+    ids, values = idx.copy(), r.astype(np.int64)
+    pairs, w = [(np.empty(0, int), np.empty(0, int))], 1
+    while w < n:
+        # Merged block and whether the element is in the right half.
+        block = idx // (2 * w)
+        right = (idx // w) % 2 == 1
+        key = block * n + values
+        left = key[~right]
+        # Range of the left elements greater than each right element.
+        lo = np.searchsorted(left, key[right], side='right')
+        hi = np.searchsorted(left, (block[right] + 1) * n, side='left')
+        count = hi - lo
+        offset = np.arange(count.sum()) - np.repeat(np.cumsum(count) - count,
+                                                    count)
+        pairs.append((ids[~right][np.repeat(lo, count) + offset],
+                      np.repeat(ids[right], count)))
+        # Merge (sort within blocks).
+        order = np.argsort(key, kind='stable')
+        ids, values = ids[order], key[order] % n
+        w *= 2
+    return tuple(np.concatenate(p) for p in zip(*pairs))
+
+
+def _select(x, y, k, nt, random_state=0):
+    """Slope with rank k (0-based) among the slopes of distinct x.
+
+    The slope is found without computing all the pairwise slopes. The
+    interval (lo, hi] containing the slope is first estimated from the
+    slopes of a random sample of pairs and then halved (the number of
+    slopes below a value is the number of inversions, which is counted in
+    O(n log n)) until it contains few slopes, which are enumerated.
+
+    Parameters
+    ----------
+    x, y : np.array
+      The values (without nan).
+
+    k : int
+      The rank of the slope.
+
+    nt : int
+      The number of slopes.
+
+    Returns
+    -------
+    float
+    """
+    # Count of slopes <= t
+    count = lambda t: _inversions(_flips(x, y, -np.inf, t)[1])
+
+    # Margin so that the interval ends are not slopes (rounding)
+    margin = lambda t: 1e-9 * max(abs(t), 1.)
+
+    # Largest slope (between consecutive distinct values of x)
+    xs, ys = x[np.lexsort((y, x))], y[np.lexsort((y, x))]
+    first = np.r_[True, xs[1:] != xs[:-1]]
+    last = np.r_[first[1:], True]
+    hi = np.max((ys[last][1:] - ys[first][:-1]) / np.diff(xs[first]))
+    hi, lo, clo, chi = hi + margin(hi), -np.inf, 0, nt
+
+    # Interval from the slopes of a random sample of pairs
+    rng = np.random.RandomState(random_state)
+    i, j = rng.randint(0, x.size, (2, 4 * x.size))
+    keep = x[i] != x[j]
+    sample = np.sort((y[j] - y[i])[keep] / (x[j] - x[i])[keep])
+    if sample.size:
+        q = k / nt
+        d = 3. / np.sqrt(sample.size)
+        a = int(np.floor((q - d) * sample.size))
+        b = int(np.ceil((q + d) * sample.size))
+        if a >= 0:
+            t = sample[a] - margin(sample[a])
+            c = count(t)
+            if c <= k:
+                lo, clo = t, c
+        if b < sample.size:
+            t = sample[b] + margin(sample[b])
+            c = count(t)
+            if c > k:
+                hi, chi = t, c
+
+    # Halve the interval
+    while chi - clo > _BUDGET * x.size:
+        mid = hi - (hi - lo) / 2. if np.isfinite(lo) else \
+            hi - 2 * max(abs(hi), 1.)
+        if not lo < mid < hi:
+            return hi
+        c = count(mid)
+        if c > k:
+            hi, chi = mid, c
+        else:
+            lo, clo = mid, c
+
+    # Enumerate the slopes in (lo, hi]
+    a, r = _flips(x, y, lo, hi)
+    p, q = _inversion_pairs(r)
+    i, j = a[p], a[q]
+    slopes = (y[j] - y[i]) / (x[j] - x[i])
+    kk = min(max(k - clo, 0), slopes.size - 1)
+    return np.partition(slopes, kk)[kk] if slopes.size else hi
+
+
+# -----------------------------------------------------------------------------
+#                           vectorized theil-sen
+# -----------------------------------------------------------------------------
+def _intercept(x, y, slope, method):
+    """Intercept of many series (n, m) given the slopes (m,)."""
+    if method == 'joint':
+        return np.nanmedian(y - slope * x, axis=0)
+    return np.nanmedian(y, axis=0) - slope * np.nanmedian(x, axis=0)
+
+
+def _sigsq(x, y):
+    """Variance (2.6) of Sen (1968) of many series (n, m)."""
+    ny = (~np.isnan(y)).sum(axis=0)
+    return 1 / 18. * (ny * (ny - 1) * (2 * ny + 5) - _ties(x) - _ties(y))
+
+
+def fast_theilslopes(y, x=None, alpha=0.95, method='separate'):
+    """Theil-Sen estimator in O(n log n).
+
+    It returns the same values as scipy theilslopes (median slope,
+    intercept and confidence interval of the slope) but the slopes with
+    the required ranks are selected (see _select) instead of computing and
+    sorting the n(n-1)/2 pairwise slopes, so it can be used with long
+    series. The nan values are ignored.
+
+    Parameters
+    ----------
+    y : array-like
+      The dependent variable.
+
+    x : array-like, default=None
+      The independent variable. If None, arange(len(y)).
+
+    alpha : float
+      The confidence degree (between 0 and 1).
+
+    method : string, options = {separate, joint}
+      The method to compute the intercept (see scipy theilslopes).
+
+    Returns
+    -------
+    slope, intercept, ci_lower, ci_upper
+    """
+    # Format
+    y = np.asarray(y, dtype=float).ravel()
+    x = np.arange(y.size, dtype=float) if x is None else \
+        np.asarray(x, dtype=float).ravel()
+    valid = ~np.isnan(y) & ~np.isnan(x)
+    x, y = x[valid], y[valid]
+
+    # Number of slopes (pairs with distinct x)
+    counts = np.unique(x, return_counts=True)[1]
+    nt = (x.size * (x.size - 1) - (counts * (counts - 1)).sum()) // 2
+    if nt < 1:
+        return (np.nan,) * 4
+
+    # Ranks (median and confidence interval)
+    rl, ru = _ranks(nt, _sigsq(x[:, None], y[:, None])[0], alpha)
+    select = lambda k: _select(x, y, int(k), nt)
+    slope = select((nt - 1) // 2) if nt % 2 else \
+        (select(nt // 2 - 1) + select(nt // 2)) / 2.
+
+    # Return
+    return (slope, _intercept(x[:, None], y[:, None], slope, method)[0],
+            np.nan if np.isnan(rl) else select(rl),
+            np.nan if np.isnan(ru) else select(ru))
+
+
+def _pairwise_theilslopes(x, y, alpha, method):
+    """Theil-Sen of many series (n, m) computing all the slopes."""
+    # Pairs with distinct x
+    n, m = y.shape
+    i, j = np.triu_indices(n, 1)
+    keep = x[i] != x[j]
+    i, j = i[keep], j[keep]
+
+    # Slopes (nan last)
+    slopes = np.sort(((y[j] - y[i]) / (x[j] - x[i])[:, None]).T, axis=1)
+    nt = (~np.isnan(slopes)).sum(axis=1)
+
+    # Median and confidence interval
+    take = lambda k: np.take_along_axis(slopes,
+        np.clip(np.nan_to_num(k), 0, max(slopes.shape[1] - 1, 0))
+            .astype(int)[:, None], axis=1)[:, 0] \
+        if slopes.shape[1] else np.full(m, np.nan)
+    slope = np.where(nt % 2 == 1, take((nt - 1) // 2),
+                     (take(nt // 2 - 1) + take(nt // 2)) / 2.)
+    slope = np.where(nt > 0, slope, np.nan)
+    x = np.where(np.isnan(y), np.nan, x[:, None])
+    rl, ru = _ranks(nt, _sigsq(x, y), alpha)
+
+    # Return
+    return slope, _intercept(x, y, slope, method), \
+        np.where(np.isnan(rl), np.nan, take(rl)), \
+        np.where(np.isnan(ru), np.nan, take(ru))
+
+
+def theilslopes_batch(y, x=None, alpha=0.95, method='separate', mode='auto'):
+    """Theil-Sen estimator of many series of the same length.
+
+    The series can be computed with all the pairwise slopes at once
+    (pairwise) in chunks of series which fit in memory, or one by one
+    with the O(n log n) selection of fast_theilslopes (fast) which is
+    preferred for long series. The results are the same as scipy
+    theilslopes for each series (nan values are ignored).
+
+    Parameters
+    ----------
+    y : array-like or pd.DataFrame
+      The series (n observations, m series).
+
+    x : array-like, default=None
+      The independent variable (n,). If None, arange(n).
+
+    alpha : float
+      The confidence degree (between 0 and 1).
+
+    method : string, options = {separate, joint}
+      The method to compute the intercept (see scipy theilslopes).
+
+    mode : string, options = {auto, pairwise, fast}
+      Whether to compute all the pairwise slopes or to select them. If
+      auto, the slopes are selected for series longer than 1000.
+
+    Returns
+    -------
+    pd.DataFrame with one row per series and the same columns as the
+    TheilSensWrapper results (slope, intercept, ci_lower and ci_upper).
+    """
+    # Format
+    index = y.columns if isinstance(y, pd.DataFrame) else None
+    y = np.asarray(y, dtype=float)
+    y = y.reshape(-1, 1) if y.ndim == 1 else y
+    n, m = y.shape
+    index = pd.RangeIndex(m) if index is None else index
+    x = np.arange(n, dtype=float) if x is None else \
+        np.asarray(x, dtype=float).ravel()
+    if x.size != n:
+        raise ValueError("""
+            The length of x ({0}) must be equal to the number of
+            observations ({1}).""".format(x.size, n))
+
+    # Mode
+    if mode == 'auto':
+        mode = 'fast' if n > 1000 else 'pairwise'
+
+    # Compute
+    if mode == 'pairwise':
+        size = max(1, _CHUNK // max(n * (n - 1) // 2, 1))
+        r = [np.column_stack(_pairwise_theilslopes(x, y[:, c:c + size],
+                alpha, method)) for c in range(0, m, size)]
+    elif mode == 'fast':
+        r = [[fast_theilslopes(y[:, c], x, alpha, method)] for c in range(m)]
+    else:
+        raise ValueError("""
+            The mode <{0}> is not supported. The options are auto,
+            pairwise or fast.""".format(mode))
+
+    # Return
+    return pd.DataFrame(np.concatenate(r) if m else np.empty((0, 4)),
+        index=index,
+        columns=['slope', 'intercept', 'ci_lower', 'ci_upper'])
+
 
 
 class TheilSensWrapper(BaseRegressionWrapper):
@@ -77,9 +452,11 @@ class TheilSensWrapper(BaseRegressionWrapper):
         self._config.update(kwargs)
         self._conkwargs = self.fargs(self._config, theilslopes)
         # Compute theilsens slopes
-        self._raw = theilslopes(**self._conkwargs)
+        with record(self, 'fit'):
+            self._raw = theilslopes(**self._conkwargs)
         # Set series.
-        self._result = self._init_result()
+        with record(self, 'evaluate'):
+            self._result = self._init_result()
         # Compute residuals.
         x, y = kwargs['x'], kwargs['y']
         self._resid = y - (x * self.slope + self.intercept)
@@ -143,6 +520,28 @@ if __name__ == '__main__': # pragma: no cover
     print("\n")
     print(theilsens.as_summary())
 
+    # -----------------
+    # Batch
+    # -----------------
+    # Libraries
+    import time
+
+    # Many series (one per column)
+    Y = np.cumsum(np.random.randn(length, 500), axis=0)
+
+    # Compute
+    t0 = time.time()
+    r = theilslopes_batch(Y)
+    print("\nTheil-Sen of %s series in %.3fs" % (r.shape[0], time.time() - t0))
+    print(r.head())
+
+    # Long series
+    t0 = time.time()
+    r = fast_theilslopes(np.cumsum(np.random.randn(50000)))
+    print("\nTheil-Sen of a series of length 50000 in %.3fs" %
+          (time.time() - t0))
+    print(r)
+
     import sys
     sys.exit()
 
@@ -18,6 +18,11 @@ import pandas as pd
 from scipy.stats import norm
 from sklearn.model_selection import ParameterGrid
 
+# Specific
+from pyamr.core.stats.wbase import _summary
+from pyamr.core.stats.wbase import _grid_search
+from pyamr.core.profiling import record
+
 
 class BaseWrapper(object):
     # This is the name of the class.
@@ -30,6 +35,9 @@ class BaseWrapper(object):
     _conkwargs = {}
     _fitkwargs = {}
 
+    # Whether to record the time of each phase (see pyamr.core.profiling).
+    profiling = False
+
     # ---------------------------------------------------------------------------
     #                               INIT METHOD
     # ---------------------------------------------------------------------------
@@ -108,11 +116,23 @@ class BaseWrapper(object):
         self.__dict__.update(pickle.load(open(fname, "rb")))
         return self
 
-        # ---------------------------------------------------------------------------
+    def save_npz(self, fname, arrays=True):
+        """This method saves the wrapper in compact format (see serialize)."""
+        from pyamr.core.serialize import save_wrappers
+        save_wrappers([self], fname, arrays=arrays)
+
+    def load_npz(self, fname, mmap_mode=None):
+        """This method loads the wrapper in compact format (see serialize)."""
+        from pyamr.core.serialize import load_wrappers
+        self.__dict__.clear()
+        self.__dict__.update(load_wrappers(fname, mmap_mode=mmap_mode)[0].__dict__)
+        return self
 
+    # ---------------------------------------------------------------------------
     #                               GRID SEARCH
     # ---------------------------------------------------------------------------
-    def grid_search(self, grid_params):
+    def grid_search(self, grid_params, n_jobs=None, executor='process',
+                          chunksize=None, timeout=None):
         """This method computes grid search.
 
         It creates all the possible combinations combining the arguments passed.
@@ -125,106 +145,131 @@ class BaseWrapper(object):
         ----------
         con_kwargs : arguments to be passed to the constructor method.
         fit_kwargs : arguments to be passed to the fit method.
+        n_jobs     : number of workers (None or 1 is serial, -1 all processors).
+        executor   : the pool used when n_jobs > 1 (process or thread).
+        chunksize  : number of candidates sent to each worker at a time.
+        timeout    : maximum number of seconds to fit each candidate.
 
         Returns
         -------
         summary : summary with all the elements.
         """
-        # Create empty list.
-        grid_results = []
+        return list(self._iter_grid_search(grid_params, n_jobs=n_jobs,
+            executor=executor, chunksize=chunksize, timeout=timeout))
+
+    def _iter_grid_search(self, grid_params, **kwargs):
+        """This method yields the wrappers fitted (see grid_search)."""
+        # Create template (keeping the diagnostics and profiling configuration)
+        template = self.__class__()
+        for attr in ['diagnostics', 'profiling']:
+            if attr in self.__dict__:
+                setattr(template, attr, getattr(self, attr))
 
         # Loop for all possible combinations.
-        for i, params in enumerate(ParameterGrid(grid_params)):
-            try:
-                # Create model and fit
-                grid_results.append(self.__class__().fit(**params))
-            except Exception as e:
+        for i, n, params, wrapper, error in _grid_search(template,
+                grid_params, **kwargs):
+
+            if error is not None:
                 # Throw warning
-                msg = "Iteration %s... failed: %s" % (i, e)
+                msg = "Iteration %s... failed: %s" % (i, error)
                 warnings.warn(msg, RuntimeWarning)
+                continue
 
-        # Return summary.
-        return grid_results
+            # Restore the shared parameters (same object)
+            wrapper._config.update({k: v for k, v in params.items()
+                                    if k in wrapper._config})
+            yield wrapper
 
     # --------------------------------------------------------------------------
     #                       CREATES SUMMARY DATAFRAMES
     # --------------------------------------------------------------------------
-    def from_list_dataframe(self, wrapper_list, **kwargs):
+    def from_list_dataframe(self, wrapper_list, fname=None, **kwargs):
         """This methods creates a dataframe summary from a list.
 
         Parameters
         ----------
-        wrapper_list : list with wrapper objects.
+        wrapper_list : list (or iterable) with wrapper objects.
         flabel       : if include the class _name in the index.
+        exclude      : attributes (without label) not to include (e.g. model).
+        fname        : file to write the rows to (json lines) instead.
 
         Returns
         -------
-        summary : pandas dataframe.
+        summary : pandas dataframe (or the number of rows written).
         """
-        # Create summary.
-        summary = pd.DataFrame()
-
-        # Loop filling the summary.
-        for i, wrapper in enumerate(wrapper_list):
-            results = wrapper.as_series(**kwargs).rename(i)
-            summary = pd.concat([summary, results], axis=1, join='outer')
-
-        # Return
-        return summary.T
+        return _summary(wrapper_list, fname=fname, **kwargs)
 
-    def grid_search_dataframe(self, grid_params, **kwargs):
+    def grid_search_dataframe(self, grid_params, fname=None, n_jobs=None,
+                              executor='process', chunksize=None,
+                              timeout=None, **kwargs):
         """This method computes grid search and stores results in a dataframe.
 
+        The summary of each wrapper is created as soon as it is fitted, so
+        the wrappers are not kept in memory when the rows are written to a
+        file (fname).
+
         Parameters
         ----------
-        con_kwargs : arguments to be passed to the constructor method.
-        fit_kwargs : arguments to be passed to the fit method.
+        grid_params : grid of arguments to be passed to the fit method.
+        fname       : file to write the rows to (json lines) instead.
+        n_jobs      : number of workers (see grid_search).
+        executor    : the pool used when n_jobs > 1 (see grid_search).
+        chunksize   : number of candidates sent to each worker at a time.
+        timeout     : maximum number of seconds to fit each candidate.
+        kwargs      : arguments to pass to as_series (flabel, exclude).
 
         Returns
         -------
-        summary : summary with all the elements.
+        summary : summary with all the elements (one column per wrapper) or
+                  the number of rows written.
         """
-        # Compute grid search.
-        grid_results = self.grid_search(grid_params=grid_params)
-
-        # Create empty dataframe.
-        summary = pd.DataFrame()
-
-        # Loop wrappers and fill it.
-        for i, wrapper in enumerate(grid_results):
-            results = wrapper.as_series(**kwargs).rename(i)
-            summary = pd.concat([summary, results], axis=1, join='outer')
+        # Compute grid search and summary.
+        wrappers = self._iter_grid_search(grid_params, n_jobs=n_jobs,
+            executor=executor, chunksize=chunksize, timeout=timeout)
+        summary = _summary(wrappers, fname=fname, **kwargs)
 
         # Return summary.
-        return summary
+        return summary if fname is not None else summary.T
 
     # ---------------------------------------------------------------------------
     #                                OVERRIDE
     # ---------------------------------------------------------------------------
-    def as_series(self, flabel=True, label=None):
+    def as_series(self, flabel=True, label=None, exclude=None):
         """This method returns a series with all the information.
 
         Parameters
         ----------
         label : label to concatenate to index name (e.g. trend to label-trend).
+        exclude : attributes (without label) not to include (e.g. model).
 
         Returns
         -------
         series : pandas series with the results, configuration and model.
         """
-        # Concatenate the configuration.
-        s = {}
-        s.update(self._result)
-        s.update(self._config)
-        s.update({'model': self._raw})
-        s.update({'id': self._identifier()})
-        # No label.
-        if not flabel: return pd.Series(s)
-        # Concat label at the beginning of the index.
-        label = self._name if label is None and hasattr(self, '_name') else label
-        f = lambda x: "%s-%s" % (label.lower(), x)
-        # Return
-        return pd.Series(s).rename(index=f, copy=True)
+        return pd.Series(self._as_dict(flabel=flabel, label=label,
+                                       exclude=exclude))
+
+    def _as_dict(self, flabel=True, label=None, exclude=None):
+        """This method returns a dictionary with all the information."""
+        with record(self, 'summary'):
+            # Concatenate the configuration.
+            s = {}
+            s.update(self._result)
+            s.update(self._config)
+            if not exclude or 'model' not in exclude:
+                s.update({'model': self._raw})
+            if not exclude or 'id' not in exclude:
+                s.update({'id': self._identifier()})
+            # Exclude
+            if exclude:
+                s = {k: v for k, v in s.items() if k not in exclude}
+            # No label.
+            if not flabel: return s
+            # Concat label at the beginning of the index.
+            label = self._name if label is None and hasattr(self, '_name') \
+                else label
+            # Return
+            return {"%s-%s" % (label.lower(), k): v for k, v in s.items()}
 
     def as_summary(self):
         """This method displays the final summary."""
@@ -235,6 +280,16 @@ class BaseWrapper(object):
         # Show the series information.
         return self.as_series().__repr__()
 
+    def profile(self):
+        """This method returns the report of the phases recorded.
+
+        Returns
+        -------
+        pd.DataFrame (see pyamr.core.profiling.profile_report)
+        """
+        from pyamr.core.profiling import profile_report
+        return profile_report(self)
+
     def fit(self, **kwargs):
         """This method performs the fit."""
         # Empty results and update configuration.
@@ -22,6 +22,7 @@ from statsmodels.sandbox.regression.predstd import wls_prediction_std
 
 # Libraries wrapper.
 from pyamr.core.regression.wreg import RegressionWrapper
+from pyamr.core.regression.wreg import _resid_stats
 from pyamr.core.stats.wbase import fargs
 
 
@@ -37,6 +38,149 @@ def _cast_float(e):
         return e
 
 
+def _prediction_arrays(time, params, cov, scale, df_resid, nobs, alpha=0.05):
+    """Computes the predictions and intervals of many linear models.
+
+    The exogenous variable is the time with constant (params and cov
+    are for [const, x1]). The prediction intervals are used for the
+    forecasts (time >= nobs) and the confidence intervals for the
+    in-sample predictions (as in WLSWrapper.get_prediction).
+
+    Parameters
+    ----------
+    time : np.array
+      The time (T,) to predict.
+
+    params : np.array
+      The coefficients (m, 2).
+
+    cov : np.array
+      The covariance of the coefficients (m, 2, 2).
+
+    scale, df_resid, nobs : np.array
+      The residual variance, degrees of freedom and number of
+      observations of each model (m,).
+
+    alpha : float
+      The significance level.
+
+    Returns
+    -------
+    np.array (m, 4, T) with time, mean, lower and upper interval.
+    """
+    # Libraries
+    from scipy.stats import t as tdist
+
+    # Exogenous variable
+    X = np.column_stack((np.ones(time.size), time))
+
+    # Mean and variance of the mean
+    mean = params @ X.T
+    var = np.einsum('tk,mkj,tj->mt', X, cov, X)
+
+    # Prediction variance for forecasts (confidence for in-sample)
+    insample = time[None, :] < np.asarray(nobs)[:, None]
+    var = np.where(insample, var, var + np.asarray(scale)[:, None])
+
+    # Interval
+    q = tdist.ppf(1 - alpha / 2, np.asarray(df_resid))[:, None]
+    half = q * np.sqrt(var)
+
+    # Create result
+    result = np.empty((mean.shape[0], 4, time.size))
+    result[:, 0, :] = time
+    result[:, 1, :] = mean
+    result[:, 2, :] = mean - half
+    result[:, 3, :] = mean + half
+
+    # Return
+    return result
+
+
+def get_prediction_batch(wrappers, start=None, end=None, alpha=0.05):
+    """Computes the predictions and intervals of many fitted models.
+
+    The linear models (WLSWrapper) are computed at once with vectorized
+    operations on their coefficients and covariance matrices (no pandas
+    or statsmodels prediction objects are created). Any other wrapper
+    (e.g. SARIMAXWrapper, WLSARMAWrapper) is predicted with its own
+    get_prediction and copied into the result.
+
+    .. note:: All the models are predicted for the same time. If end
+              is None, it is the largest number of observations minus
+              one (so that every model predicts its full sample).
+
+    Parameters
+    ----------
+    wrappers : list
+      The fitted wrappers (or a fitted WLSBatch).
+
+    start : int (optional)
+      The time t to start the prediction
+
+    end : int (optional)
+      The time t to end the prediction (included)
+
+    alpha : float
+      The significance level of the intervals.
+
+    Returns
+    -------
+    np.array (m, 4, T) with the time, mean, lower and upper interval
+    for each of the m models.
+    """
+    # Batch fit
+    if isinstance(wrappers, WLSBatch):
+        return wrappers.get_prediction(start=start, end=end, alpha=alpha)
+
+    # Time
+    start = 0 if start is None else start
+    if end is None:
+        end = max([len(w.endog) for w in wrappers]) - 1
+    time = np.arange(start, end + 1)
+
+    # Create result
+    result = np.empty((len(wrappers), 4, time.size))
+
+    # Linear models
+    linear = np.array([isinstance(w, WLSWrapper) for w in wrappers],
+                      dtype=bool)
+
+    # Check
+    nparams = [len(wrappers[i]._raw.params) for i in np.flatnonzero(linear)]
+    if nparams and max(nparams) > 2:
+        raise ValueError("""
+            The prediction is only implemented for the time as exogenous
+            variable (and constant), but the linear models have up to {0}
+            parameters.""".format(max(nparams)))
+
+    # Stack the coefficients as [const, x1]
+    m = int(linear.sum())
+    params = np.zeros((m, 2))
+    cov = np.zeros((m, 2, 2))
+    scale, df_resid, nobs = [np.empty(m) for _ in range(3)]
+    for j, i in enumerate(np.flatnonzero(linear)):
+        raw = wrappers[i]._raw
+        k = 2 - len(raw.params)
+        params[j, k:] = raw.params
+        cov[j, k:, k:] = raw.cov_params()
+        scale[j], df_resid[j] = raw.scale, raw.df_resid
+        nobs[j] = len(wrappers[i].endog)
+
+    # Compute linear models
+    if m:
+        result[linear] = _prediction_arrays(time, params, cov,
+            scale, df_resid, nobs, alpha=alpha)
+
+    # Other models
+    for i in np.flatnonzero(~linear):
+        result[i] = wrappers[i].get_prediction(start=start, end=end,
+                                               alpha=alpha)
+
+    # Return
+    return result
+
+
 class PredictionResult():
 
     def __init__(self, mean, cilo, ciup, pstd, pilo,
@@ -377,6 +521,404 @@ class WLSWrapper(RegressionWrapper):
             return self.x1_coef * x
 
 
+
+class WLSBatch():
+    """Weighted least squares for many series with the same time axis.
+
+    The k series (columns of endog) share the exogenous variable so all
+    the coefficients, standard errors, information criteria and residual
+    statistics are computed as arrays with a single (batched) solve of
+    the normal equations. The results are the same as fitting one
+    WLSWrapper for each series.
+
+    Examples
+    --------
+
+    .. code-block:: python
+
+        # Fit one model per series (columns)
+        batch = WLSBatch().fit(endog=Y, trend='c', weights=F, W=W)
+
+        # Summary (one row per series, same columns as WLSWrapper)
+        batch.as_frame()
+    """
+
+    # Attributes.
+    _name = 'WLS'  # Label to add to the attributes when saving.
+
+    def __init__(self):
+        """The constructor."""
+        self._result = {}
+        self._config = {}
+        self._names = []
+
+    def __len__(self):
+        """The number of series."""
+        return len(self._names)
+
+    def __getattr__(self, name):
+        """This method allows to retrieve the results with dot notation."""
+        if name.startswith('__'):
+            raise AttributeError(name)
+        if name in self._result: return self._result[name]
+        if name in self._config: return self._config[name]
+        raise AttributeError("'%s' object has no attribute '%s'" % \
+                             (self.__class__.__name__, name))
+
+    def _identifier(self):
+        """This methods describes de model."""
+        if self.W is not None:
+            if hasattr(self.W, '_identifier'):
+                return "%s(%s,%s)" % (self._name,
+                                      self.trend,
+                                      self.W._identifier())
+            return "%s(%s,%s)" % (self._name,
+                                  self.trend,
+                                  self.W.__class__.__name__)
+        return "%s(%s)" % (self._name, self.trend)
+
+    # --------------------------------------------------------------------------
+    #                            helper methods
+    # --------------------------------------------------------------------------
+    def _weights(self, weights, W, shape):
+        """Computes the weights (one column per series).
+
+        Parameters
+        ----------
+        weights: array-like
+          The weights (1-D if shared by all series, otherwise 2-D).
+
+        W: object-like
+          The instance to transform the weights.
+
+        shape: tuple
+          The shape of endog.
+
+        Returns
+        -------
+        np.array with the given shape.
+        """
+        # Uniform weights
+        if weights is None:
+            return np.ones(shape)
+
+        # Broadcast shared weights
+        weights = np.asarray(weights, dtype=float)
+        if weights.ndim == 1:
+            weights = np.repeat(weights[:, None], shape[1], axis=1)
+
+        # Transform weights (per series)
+        if W is not None:
+            if hasattr(W, 'weights_batch'):
+                weights = W.weights_batch(weights.T).T
+            else:
+                weights = np.column_stack([W.weights(w) for w in weights.T])
+
+            # Set uniform weights on those series that failed
+            invalid = np.isnan(weights).any(axis=0)
+            if invalid.any():
+                warnings.warn("""\n
+                     There was an error computing the weights of {0} series.
+                     In order to avoid a fatal error, uniform weights will
+                     be set. The weight transformer used was: {1}"""
+                    .format(invalid.sum(), W))
+                weights[:, invalid] = 1.0
+
+        # Return
+        return weights
+
+    # --------------------------------------------------------------------------
+    #                                 fit
+    # --------------------------------------------------------------------------
+    def fit(self, endog, exog=None, trend='n', weights=None, W=None,
+            alpha=0.05):
+        """This method computes the WLS of each series.
+
+        Parameters
+        ----------
+        endog: array-like
+          The endogenous variables with one series per column. If it is a
+          pd.DataFrame, the columns are used as names of the series.
+
+        exog: array-like
+          The exogenous variable shared by all series (by default is the
+          time t starting in 0)
+
+        trend:  str-like, options = {c, n}
+          Wether to add a constant or not.
+
+        weights: array-like (optional)
+          The weights for the weighted least square regression. It can be
+          1-D (same weights for all series) or 2-D (one column per series).
+
+        W: object-like (optional)
+          The instance to transform the weights. It must implement the
+          function 'weights' (or 'weights_batch').
+
+        alpha: float
+          The significance level for the confidence intervals.
+
+        Returns
+        -------
+        object : WLSBatch object.
+        """
+        # Libraries
+        from scipy.stats import t as tdist
+        from scipy.stats import f as fdist
+        from scipy.stats import normaltest
+        from statsmodels.stats.stattools import durbin_watson
+        from statsmodels.stats.stattools import jarque_bera
+
+        # Names of the series
+        self._names = list(endog.columns) \
+            if isinstance(endog, pd.DataFrame) else None
+        Y = np.asarray(endog, dtype=float)
+        if Y.ndim == 1:
+            Y = Y[:, None]
+        n, m = Y.shape
+        if self._names is None:
+            self._names = list(range(m))
+
+        # Create a time-series exogenous variable
+        if exog is None:
+            exog = np.arange(n)
+
+        # Names of the parameters
+        exog_names = list(exog.columns) if isinstance(exog, pd.DataFrame) \
+            else ['x%s' % (i + 1) for i in
+                  range(np.asarray(exog).reshape(n, -1).shape[1])]
+        X = np.asarray(exog, dtype=float).reshape(n, -1)
+
+        # Format the exogenous variable to add constant.
+        k_constant = int(trend == 'c')
+        if k_constant:
+            X = np.column_stack((np.ones(n), X))
+            exog_names = ['const'] + exog_names
+        k = X.shape[1]
+
+        # Weights
+        w = self._weights(weights, W, Y.shape)
+        sw = np.sqrt(w)
+
+        # Batched least squares. The pseudo-inverse of the weighted exog
+        # is computed with the SVD (as statsmodels) instead of inverting
+        # the normal equations, which squares the condition number.
+        Xw = sw.T[:, :, None] * X[None, :, :]
+        Yw = sw * Y
+        u, sv, vt = np.linalg.svd(Xw, full_matrices=False)
+        with np.errstate(divide='ignore'):
+            sinv = np.where(sv > 1e-15 * sv[:, :1], 1 / sv, 0)
+            cond = sv[:, 0] / sv[:, -1]
+        pinv = np.einsum('mji,mj,mnj->min', vt, sinv, u)
+        XtXi = np.einsum('min,mjn->mij', pinv, pinv)
+        params = np.einsum('mkn,nm->mk', pinv, Yw)
+
+        # Check the conditioning (near collinear exogenous variables)
+        ill = cond > 1 / np.sqrt(np.finfo(float).eps)
+        if ill.any():
+            warnings.warn("""
+                The (weighted) exogenous variables of {0} series are near
+                collinear (condition number up to {1:.3g}), so the
+                coefficients may be unstable.""".format(
+                    int(ill.sum()), np.max(cond)), RuntimeWarning)
+
+        # Residuals
+        fitted = np.einsum('nk,mk->nm', X, params)
+        resid = Y - fitted
+        wresid = sw * resid
+
+        # Degrees of freedom
+        df_model = k - k_constant
+        df_resid = n - k
+
+        # Sum of squares
+        ssr = np.sum(wresid ** 2, axis=0)
+        if k_constant:
+            ymean = np.sum(w * Y, axis=0) / np.sum(w, axis=0)
+            tss = np.sum(w * (Y - ymean) ** 2, axis=0)
+        else:
+            tss = np.sum(w * Y ** 2, axis=0)
+        ess = tss - ssr
+
+        # Scale and standard errors
+        scale = ssr / df_resid
+        bse = np.sqrt(np.diagonal(XtXi, axis1=1, axis2=2) * scale[:, None])
+        tvalues = params / bse
+        pvalues = 2 * tdist.sf(np.abs(tvalues), df_resid)
+        q = tdist.ppf(1 - alpha / 2, df_resid)
+
+        # Log-likelihood (see statsmodels.WLS.loglike)
+        llf = - n / 2 * np.log(ssr) - n / 2 * (1 + np.log(np.pi / (n / 2))) \
+              + 0.5 * np.sum(np.log(w), axis=0)
+
+        # Create results.
+        d = {}
+        d['rsquared'] = 1 - ssr / tss
+        d['rsquared_adj'] = 1 - (n - k_constant) / df_resid * \
+                                (1 - d['rsquared'])
+        d['fvalue'] = (ess / df_model) / scale
+        d['fprob'] = fdist.sf(d['fvalue'], df_model, df_resid)
+        d['aic'] = -2 * llf + 2 * k
+        d['bic'] = -2 * llf + np.log(n) * k
+        d['llf'] = llf
+        d['mse_model'] = ess / df_model
+        d['mse_resid'] = scale
+        d['mse_total'] = tss / (df_resid + df_model)
+
+        # Add coefficients statistics.
+        for i, name in enumerate(exog_names):
+            d['%s_%s' % (name, 'coef')] = params[:, i]
+            d['%s_%s' % (name, 'std')] = bse[:, i]
+            d['%s_%s' % (name, 'tvalue')] = tvalues[:, i]
+            d['%s_%s' % (name, 'tprob')] = pvalues[:, i]
+            d['%s_%s' % (name, 'cil')] = params[:, i] - q * bse[:, i]
+            d['%s_%s' % (name, 'ciu')] = params[:, i] + q * bse[:, i]
+
+        # Statistics in the summary (weighted residuals, same precision).
+        jb_value, jb_prob, skew, kurtosis = jarque_bera(wresid, axis=0)
+        try:
+            om_value, om_prob = normaltest(wresid, axis=0)
+        except ValueError:
+            om_value = om_prob = np.full(m, np.nan)
+        d['s_dw'] = np.round(durbin_watson(wresid, axis=0), 3)
+        d['s_jb_value'] = np.round(jb_value, 3)
+        d['s_jb_prob'] = np.array([float('%#.3g' % v) for v in jb_prob])
+        d['s_skew'] = np.round(skew, 3)
+        d['s_kurtosis'] = np.round(kurtosis, 3)
+        d['s_omnibus_value'] = np.round(om_value, 3)
+        d['s_omnibus_prob'] = np.round(om_prob, 3)
+
+        # Further statistics.
+        d.update(_resid_stats(resid))
+
+        # Save
+        self._result = d
+        self._config = {'exog': X, 'endog': Y, 'trend': trend,
+                        'weights': w, 'W': W}
+        self.params = params
+        self.bse = bse
+        self._cov_params = XtXi * scale[:, None, None]
+        self.resid = resid
+        self.wresid = wresid
+        self.fittedvalues = fitted
+
+        # Return
+        return self
+
+    # --------------------------------------------------------------------------
+    #                           predict methods
+    # --------------------------------------------------------------------------
+    def get_prediction(self, start=None, end=None, alpha=0.05):
+        """This method predicts all the series at once.
+
+        .. note:: It is only implemented for the time as exogenous
+                  variable (default exog).
+
+        Parameters
+        ----------
+        start : int (optional)
+          The time t to start the prediction
+
+        end : int (optional)
+          The time t to end the prediction (included)
+
+        alpha : float
+          The significance level of the intervals.
+
+        Returns
+        -------
+        np.array (m, 4, T) with the time, mean, lower and upper interval
+        (confidence interval in-sample and prediction interval for the
+        forecasts) for each series.
+        """
+        # Time
+        n = self.endog.shape[0]
+        start = 0 if start is None else start
+        end = n - 1 if end is None else end
+        time = np.arange(start, end + 1)
+
+        # Check
+        if self.params.shape[1] > 2:
+            raise ValueError("""
+                The prediction is only implemented for the time as exogenous
+                variable (and constant), but the models have {0}
+                parameters.""".format(self.params.shape[1]))
+
+        # Coefficients as [const, x1]
+        m = len(self)
+        k = 2 - self.params.shape[1]
+        params = np.zeros((m, 2))
+        params[:, k:] = self.params
+        cov = np.zeros((m, 2, 2))
+        cov[:, k:, k:] = self._cov_params
+
+        # Return
+        return _prediction_arrays(time, params, cov, self.mse_resid,
+            np.full(m, n - 2 + k), np.full(m, n), alpha=alpha)
+
+    # --------------------------------------------------------------------------
+    #                           display methods
+    # --------------------------------------------------------------------------
+    def as_series(self, i, flabel=True, label=None):
+        """This method returns a series with the information of one series.
+
+        The index is the same as in WLSWrapper.as_series except for the
+        model (there is no statsmodels object).
+
+        Parameters
+        ----------
+        i : int
+          The position of the series.
+
+        flabel : boolean
+          Wether to include a label before the attributes.
+
+        label : string
+          The label to include before the attributes.
+
+        Returns
+        -------
+        pandas series.
+        """
+        # Concatenate the configuration.
+        s = {k: v[i] for k, v in self._result.items()}
+        s.update({'exog': self.exog,
+                  'endog': self.endog[:, i],
+                  'trend': self.trend,
+                  'weights': self.weights[:, i],
+                  'W': self.W,
+                  'model': None,
+                  'id': self._identifier()})
+
+        # No label.
+        if not flabel:
+            return pd.Series(s, name=self._names[i])
+
+        # Create the label to include
+        label = self._name.lower() if label is None else str(label)
+
+        # Return
+        return pd.Series(s, name=self._names[i]) \
+            .rename(index=lambda x: "%s-%s" % (label.lower(), x))
+
+    def as_frame(self, flabel=True, label=None):
+        """This method returns a dataframe with one row per series.
+
+        Parameters
+        ----------
+        flabel : boolean
+          Wether to include a label before the attributes.
+
+        label : string
+          The label to include before the attributes.
+
+        Returns
+        -------
+        pandas dataframe.
+        """
+        return pd.DataFrame([self.as_series(i, flabel=flabel, label=label)
+                             for i in range(len(self))])
+
 if __name__ == '__main__': # pragma: no cover
 
     # Import
@@ -12,12 +12,13 @@
 from __future__ import division
 
 # Libraries
+import os
 import sys
 import copy
+import warnings
 import numpy as np
 import pandas as pd
 import statsmodels.api as sm
-from statsmodels.tsa.arima_model import ARIMA
 from statsmodels.tsa.statespace.sarimax import SARIMAX
 
 import scipy.stats as stats
@@ -25,10 +26,47 @@ import scipy.stats as stats
 # Import pyamr
 from pyamr.core.regression.wregression import BaseRegressionWrapper
 from pyamr.core.regression.wls import WLSWrapper
-from pyamr.core.regression.arima import ARIMAWrapper
+from pyamr.core.regression.wls import WLSBatch
 from pyamr.core.regression.sarimax import SARIMAXWrapper
 
 
+# -----------------------------------------------------------------------------
+#                              helper methods
+# -----------------------------------------------------------------------------
+def _fit_arma(resid, sarimax_kwargs=None, auto_kwargs=None):
+    """Fits the SARIMAX on the residuals.
+
+    Parameters
+    ----------
+    resid : array-like
+      The residuals of the weighted least squares.
+
+    sarimax_kwargs : dict-like
+      The arguments to fit the SARIMAXWrapper (e.g. order).
+
+    auto_kwargs : dict-like
+      The arguments to search the best order (see SARIMAXWrapper.auto).
+      It is used when sarimax_kwargs is None.
+
+    Returns
+    -------
+    SARIMAXWrapper
+    """
+    if sarimax_kwargs is not None:
+        return SARIMAXWrapper(estimator=SARIMAX) \
+            .fit(endog=resid, **sarimax_kwargs)
+    return SARIMAXWrapper(estimator=SARIMAX) \
+        .auto(endog=resid, **auto_kwargs)
+
+
+def _fittedvalues(arma, n):
+    """Returns the in-sample predictions of the ARMA (levels)."""
+    fitted = np.asarray(getattr(arma._raw, 'fittedvalues', []))
+    if fitted.size == n:
+        return fitted
+    return arma.get_prediction(start=None, end=n - 1)[1, :]
+
+
 class WLSARMAWrapper(BaseRegressionWrapper):
     # Attributes.
     _name = 'WLSARMA'  # Label to add to the attributes when saving.
@@ -118,21 +156,50 @@ class WLSARMAWrapper(BaseRegressionWrapper):
     def fit(self, endog, exog=None, weights=None, wls_kwargs={},
             arima_kwargs=None,
             sarimax_kwargs=None,
+            auto_kwargs=None,
             **kwargs):
-        """This method...
+        """This method fits the WLS and the ARMA on its residuals.
+
+        .. note:: The fitted values are the sum of the in-sample predictions
+                  of both models (the predictions are not recomputed).
 
         Parameters
         ----------
-        endog        :
-        exog         :
-        wls_kwargs   :
-        arima_kwargs :
-        sarimax_kwargs :
-        kwargs :
+        endog : array-like
+          The endogenous variable (aka. time series data)
+
+        exog : array-like
+          The exogenous variable (by default is the time t starting in 0)
+
+        weights : array-like (optional)
+          The weights for the weighted least square regression.
+
+        wls_kwargs : dict-like
+          The arguments to fit the WLSWrapper (e.g. trend, W).
+
+        arima_kwargs : dict-like
+          The arguments to fit the ARIMAWrapper.
+
+        sarimax_kwargs : dict-like
+          The arguments to fit the SARIMAXWrapper.
+
+        auto_kwargs : dict-like
+          The arguments to search the best SARIMAX order for the residuals
+          (see SARIMAXWrapper.auto, e.g. max_ar, search='stepwise' or
+          n_jobs to run the search in parallel). It is used when both
+          arima_kwargs and sarimax_kwargs are None.
 
         Returns
         -------
+        WLSARMAWrapper
         """
+        # Check
+        if arima_kwargs is None and sarimax_kwargs is None \
+                and auto_kwargs is None:
+            raise ValueError("""
+                Either arima_kwargs, sarimax_kwargs or auto_kwargs must be
+                given to fit the ARMA of the residuals.""")
+
         # Create weighted linear regression
         self._wls = WLSWrapper(sm.WLS).fit(endog=endog, exog=exog,
                                      weights=weights,
@@ -140,16 +207,17 @@ class WLSARMAWrapper(BaseRegressionWrapper):
 
         # Create best fitting for ARIMA.
         if arima_kwargs is not None:
+            from statsmodels.tsa.arima_model import ARIMA
+            from pyamr.core.regression.arima import ARIMAWrapper
             self._arma = \
                 ARIMAWrapper(ARIMA).fit(endog=self._wls._resid, **arima_kwargs)
-
-        # Create best fitting for SARIMAX.
-        if arima_kwargs is None and sarimax_kwargs is not None:
-            self._arma = \
-                SARIMAXWrapper(SARIMAX).fit(endog=self._wls._resid, **sarimax_kwargs)
+        else:
+            self._arma = _fit_arma(self._wls._resid,
+                sarimax_kwargs=sarimax_kwargs, auto_kwargs=auto_kwargs)
 
         # Set fitted values (what if arima d=1).
-        self._fittedvalues = self.get_prediction()[1, :]
+        self._fittedvalues = np.asarray(self._wls._raw.fittedvalues) + \
+            _fittedvalues(self._arma, len(endog))
 
         # Set residuals
         self._resid = endog - self._fittedvalues
@@ -163,11 +231,10 @@ class WLSARMAWrapper(BaseRegressionWrapper):
     def get_prediction(self, start=None, end=None, ptype='combined', **kwargs):
         """This method computes the prediction.
 
-        Note: Correct for ARIMA. The arima is trained with n samples (e.g. 24)
-        and then we ask for start=50 and end=74 hance for some reason arima
-        becomes crazy and return a larger array. Therefore, we predict for
-        indices None (begining) till the maxium number to predict which is
-        fshape-start.
+        The WLS and ARMA predictions (ptype) are computed over the same
+        time (start to end). The combined prediction is the sum of the WLS and ARMA predictions
+        at the same time. The intervals are those of the WLS shifted by
+        the ARMA prediction.
 
         Parameters
         ----------
@@ -178,24 +245,143 @@ class WLSARMAWrapper(BaseRegressionWrapper):
         Returns
         -------
         """
-        # Create end for arma.
-        end_arma = None if start is None or end is None else end - start
-
         # Return partial predictions.
         if ptype == 'wls':
             return self._wls.get_prediction(start=start, end=end)
         if ptype == 'arma':
-            return self._arma.get_prediction(start=None, end=end_arma, **kwargs)
+            return self._arma.get_prediction(start=start, end=end, **kwargs)
+
+        # Compute both predictions (same time)
+        pred = np.array(self._wls.get_prediction(start=start, end=end))
+        pred_arma = self._arma.get_prediction(start=start, end=end, **kwargs)
+
+        # Combine (vectorized)
+        pred[1:, :] += pred_arma[1, :]
+
+        # Return
+        return pred
+
+
+class WLSARMABatch():
+    """WLS and ARMA on the residuals for many series with the same time.
+
+    The weighted least squares of all the series (columns of endog) are
+    computed at once (see WLSBatch) and the ARMA models of the residuals
+    are fitted in parallel.
+
+    Examples
+    --------
 
-        # Compute both predictions
-        pred_wls = self._wls.get_prediction(start=start, end=end)
-        pred_arma = self._arma.get_prediction(start=None, end=end_arma, **kwargs)
+    .. code-block:: python
 
-        # Create combined predictions (careful with this).
-        pred = np.empty(pred_wls.shape)
-        pred[1, :] = pred_wls[1, :]
-        pred[1, pred_arma[0, :].astype(int)] += pred_arma[1, :]
+        # Fit one model per series (columns)
+        batch = WLSARMABatch().fit(endog=Y, weights=F,
+            wls_kwargs={'trend': 'c', 'W': W},
+            auto_kwargs={'max_ar': 2, 'max_ma': 2, 'search': 'stepwise'},
+            n_jobs=4)
 
+        # Predictions (series, [time, mean, lower, upper], time)
+        batch.get_prediction(end=40)
+    """
+
+    def __init__(self):
+        """The constructor."""
+        self._wls = None
+        self._arma = []
+
+    def __len__(self):
+        return len(self._arma)
+
+    def fit(self, endog, weights=None, wls_kwargs={}, sarimax_kwargs=None,
+            auto_kwargs=None, n_jobs=None):
+        """This method fits the models.
+
+        Parameters
+        ----------
+        endog : array-like
+          The series (n observations, m series).
+
+        weights : array-like (optional)
+          The weights (n, m) or (n,) for the weighted least squares.
+
+        wls_kwargs : dict-like
+          The arguments to fit the WLSBatch (e.g. trend, W).
+
+        sarimax_kwargs : dict-like
+          The arguments to fit the SARIMAXWrapper (e.g. order).
+
+        auto_kwargs : dict-like
+          The arguments to search the best SARIMAX order of each series
+          (see SARIMAXWrapper.auto). It is used when sarimax_kwargs is
+          None.
+
+        n_jobs : int, default=None
+          The number of processes to fit the ARMA models. If None or 1 it
+          is serial. If -1, all the processors are used.
+
+        Returns
+        -------
+        WLSARMABatch
+        """
+        # Check
+        if sarimax_kwargs is None and auto_kwargs is None:
+            raise ValueError("""
+                Either sarimax_kwargs or auto_kwargs must be given to fit
+                the ARMA of the residuals.""")
+
+        # Weighted least squares (batched)
+        self._wls = WLSBatch().fit(endog=endog, weights=weights, **wls_kwargs)
+        resid = np.asarray(self._wls.resid)
+
+        # Number of jobs
+        if n_jobs is not None and n_jobs < 0:
+            n_jobs = os.cpu_count()
+
+        # Fit ARMA of the residuals
+        columns = [resid[:, i] for i in range(resid.shape[1])]
+        if n_jobs is None or n_jobs == 1:
+            self._arma = [_fit_arma(r, sarimax_kwargs, auto_kwargs)
+                          for r in columns]
+        else:
+            from concurrent import futures
+            with futures.ProcessPoolExecutor(max_workers=n_jobs) as pool:
+                self._arma = list(pool.map(_fit_arma, columns,
+                    [sarimax_kwargs] * len(columns),
+                    [auto_kwargs] * len(columns)))
+
+        # Fitted values and residuals (n, m)
+        n = resid.shape[0]
+        self.fittedvalues = np.asarray(self._wls.fittedvalues) + \
+            np.column_stack([_fittedvalues(a, n) for a in self._arma])
+        self.resid = np.asarray(self._wls._config['endog']) - self.fittedvalues
+
+        # Return
+        return self
+
+    def get_prediction(self, start=None, end=None, alpha=0.05):
+        """This method predicts all the series.
+
+        Parameters
+        ----------
+        start : int (optional)
+          The time t to start the prediction
+
+        end : int (optional)
+          The time t to end the prediction (included)
+
+        alpha : float
+          The significance level of the intervals.
+
+        Returns
+        -------
+        np.array (m, 4, T) with the time, mean, lower and upper interval
+        (those of the WLS shifted by the ARMA prediction).
+        """
+        # Predictions
+        pred = self._wls.get_prediction(start=start, end=end, alpha=alpha)
+        for i, a in enumerate(self._arma):
+            pred[i, 1:, :] += a.get_prediction(start=start, end=end,
+                                               alpha=alpha)[1, :]
         # Return
         return pred
 
@@ -25,6 +25,8 @@ from sklearn.model_selection import ParameterGrid
 # Import base wrapper
 from pyamr.core.stats.wbase import fargs
 from pyamr.core.stats.wbase import BaseWrapper
+from pyamr.core.stats.wbase import _grid_search
+from pyamr.core.profiling import record
 
 
 # ---------------------------------------------------------------------------
@@ -104,14 +106,310 @@ def _insample_conf_int(forecast, resid, alpha=0.05):
     return conf_int
 
 
+def _by_column(f, resid):
+    """Applies f to the residuals (1-D) or to each column (2-D).
+
+    Returns
+    -------
+    the outputs of f (scalars or arrays with one value per column)
+    """
+    resid = np.asarray(resid)
+    if resid.ndim == 1:
+        return f(resid)
+    return tuple(np.array(v) for v in zip(*[f(r) for r in resid.T]))
+
+
+def _dw(resid):
+    """Auto-correlation (durbin-watson)."""
+    from statsmodels.stats.stattools import durbin_watson
+    return {'m_dw': durbin_watson(resid, axis=0)}
+
+
+def _jb(resid):
+    """Normality (jarque bera)."""
+    from statsmodels.stats.stattools import jarque_bera
+    jb_value, jb_prob, skew, kurtosis = jarque_bera(resid, axis=0)
+    return {'m_jb_value': jb_value,
+            'm_jb_prob': jb_prob,
+            'm_skew': skew,
+            'm_kurtosis': kurtosis}
+
+
+def _nm(resid):
+    """Normality (normal test). It is inf if there are too few samples."""
+    from scipy.stats import normaltest
+    try:
+        nm_value, nm_prob = normaltest(resid, axis=0)
+    except ValueError:
+        nm_value = nm_prob = np.inf if np.ndim(resid) == 1 \
+            else np.full(np.shape(resid)[1], np.inf)
+    return {'m_nm_value': nm_value, 'm_nm_prob': nm_prob}
+
+
+def _ks(resid):
+    """Normality (kolmogorov-smirnov)."""
+    from scipy.stats import kstest
+    ks_value, ks_prob = kstest(resid, 'norm', axis=0)
+    return {'m_ks_value': ks_value, 'm_ks_prob': ks_prob}
+
+
+def _shp(resid):
+    """Normality (shapiro-wilkinson). It is inf if there are too few samples."""
+    from scipy.stats import shapiro
+    def shp(r):
+        try:
+            return tuple(shapiro(r))
+        except ValueError:
+            return np.inf, np.inf
+    sh_value, sh_prob = _by_column(shp, resid)
+    return {'m_shp_value': sh_value, 'm_shp_prob': sh_prob}
+
+
+def _ad(resid):
+    """Normality (anderson-darling).
+
+    The null hypothesis (sample data is drawn from a population that
+    follows a particular distribution; in this case normal) can be rejected
+    if the statistic es larger than the critical values for an specified
+    significance level.
+    """
+    from scipy.stats import anderson
+    def ad(r):
+        ad_value, ad_cv, ad_sl = anderson(r)
+        return ad_value, ad_value < ad_cv[2]
+    ad_value, ad_nnorm = _by_column(ad, resid)
+    return {'m_ad_value': ad_value, 'm_ad_nnorm': ad_nnorm}
+
+
+# The residual diagnostics (name, function and keys).
+_DIAGNOSTICS = {
+    'dw': (_dw, ['m_dw']),
+    'jb': (_jb, ['m_jb_value', 'm_jb_prob', 'm_skew', 'm_kurtosis']),
+    'nm': (_nm, ['m_nm_value', 'm_nm_prob']),
+    'ks': (_ks, ['m_ks_value', 'm_ks_prob']),
+    'shp': (_shp, ['m_shp_value', 'm_shp_prob']),
+    'ad': (_ad, ['m_ad_value', 'm_ad_nnorm'])
+}
+
+# The diagnostic that computes each key.
+_DIAGNOSTIC_KEYS = {k: name for name, (f, keys) in _DIAGNOSTICS.items()
+                    for k in keys}
+
+
+def _resid_stats(resid, diagnostics='all'):
+    """This method computes basic stats on the residuals.
+
+    Parameters
+    ----------
+    resid : array-like
+      The residuals to perform the stats on. If 2-D, the stats are
+      computed for each column (e.g. WLSBatch).
+
+    diagnostics : string or list, default='all'
+      The diagnostics to compute (dw, jb, nm, ks, shp or ad). If 'all',
+      all of them are computed. If None, none of them.
+
+    Returns
+    -------
+    dictionary with the stats (arrays if 2-D) for the residuals
+    """
+    # Format
+    if diagnostics is None:
+        diagnostics = []
+    if isinstance(diagnostics, str):
+        diagnostics = list(_DIAGNOSTICS) if diagnostics == 'all' \
+            else [diagnostics]
+
+    # Check
+    unknown = set(diagnostics).difference(_DIAGNOSTICS)
+    if unknown:
+        raise ValueError("""
+            The diagnostics {0} are not supported. The options are
+            {1}.""".format(sorted(unknown), list(_DIAGNOSTICS)))
+
+    # Compute
+    d = {}
+    for name in diagnostics:
+        d.update(_DIAGNOSTICS[name][0](resid))
+
+    # Return
+    return d
+
+
+def _stepwise_search(wrapper, starts, bounds, candidate, ic='bic',
+                     converged=True, pairs=[], categorical=[], fixed=[],
+                     max_fits=None, n_jobs=None, memo=None, warm_start=None):
+    """This method finds the best model through a stepwise search.
+
+    Used in ARIMAWrapper.auto and SARIMAXWrapper.auto.
+
+    .. note::
+
+        It follows the stepwise algorithm proposed by Hyndman and Khandakar
+        (2008). The search starts with a few simple models and moves to the
+        best neighbour (one element of the position changed by +-1 or both
+        elements of a pair changed together) until the information criteria
+        does not improve. The models already fitted are memoized and those
+        that are invalid are not fitted.
+
+    Parameters
+    ----------
+    wrapper : the wrapper copied to fit each candidate.
+    starts  : list with the initial positions (tuples of integers).
+    bounds  : tuple with the maximum value of each element of the position.
+    candidate : function that returns (key, kwargs) for a position, where
+                key identifies the model (to memoize equivalent positions)
+                and kwargs are the fit arguments. It returns None if the
+                model is invalid.
+    ic      : the information criteria to minimize.
+    converged : whether to consider only those models that converged.
+    pairs   : list of tuples with the elements that are changed together.
+    categorical : list with the elements that can take any value in a move
+                  (e.g. the trend).
+    fixed   : list with the elements that are not changed (e.g. the
+              difference order d, since the information criteria of models
+              with different d are not comparable for searching).
+    max_fits : the maximum number of models to fit.
+    n_jobs  : the number of workers to fit the neighbours (see grid_search).
+    memo    : dictionary with the wrappers already fitted (None if failed).
+              It is updated with the new fits so that it can be shared by
+              several searches.
+    warm_start : function that returns the start_params for a neighbour
+                 given the current best wrapper and the neighbour fit
+                 arguments (or None to use the default values). If None,
+                 all the candidates start from their default values.
+
+    Returns
+    -------
+    fits : list with the wrappers fitted (in order).
+    """
+    # Memory with the wrappers fitted (None if it failed)
+    if memo is None:
+        memo = {}
+
+    def fit(positions, start=None):
+        """Fits the positions not fitted yet and returns their keys."""
+        keys, todo = [], {}
+        for position in positions:
+            c = candidate(position)
+            if c is None:
+                continue
+            keys.append(c[0])
+            if c[0] not in memo and c[0] not in todo:
+                todo[c[0]] = c[1]
+                if start is not None and warm_start(start, c[1]) is not None:
+                    todo[c[0]] = dict(c[1],
+                        start_params=warm_start(start, c[1]))
+        # Limit number of fits
+        if max_fits is not None:
+            todo = dict(list(todo.items())[:max(0, max_fits - len(memo))])
+        # Fit
+        grid = [{k: [v] for k, v in kwargs.items()} for kwargs in todo.values()]
+        for key in todo:
+            memo[key] = None
+        if grid:
+            for i, n, params, w, error in _grid_search(wrapper, grid,
+                                                       n_jobs=n_jobs):
+                if w is not None:
+                    w._config.update({k: v for k, v in params.items()
+                                      if k in w._config})
+                memo[list(todo)[i]] = w
+        # Return
+        return [k for k in keys if k in memo]
+
+    def score(key):
+        """Returns the information criteria (inf if invalid)."""
+        w = memo.get(key)
+        if w is None or (converged and not w.converged):
+            return np.inf
+        value = getattr(w, ic)
+        return value if np.isfinite(value) else np.inf
+
+    def neighbours(position):
+        """Returns the positions next to the current one."""
+        moves = [np.eye(len(bounds), dtype=int)[i]
+                 for i in range(len(bounds)) if i not in fixed]
+        for i, j in pairs:
+            moves.append(np.eye(len(bounds), dtype=int)[[i, j]].sum(axis=0))
+        positions = [tuple(np.array(position) + sign * move)
+                     for move in moves for sign in [-1, 1]]
+        for i in categorical:
+            positions += [position[:i] + (v,) + position[i + 1:]
+                          for v in range(bounds[i] + 1)]
+        return [tuple(int(e) for e in p) for p in positions
+                if all(0 <= e <= b for e, b in zip(p, bounds))]
+
+    # Initial fits
+    current = {}
+    for position, key in zip(starts, [candidate(p) for p in starts]):
+        if key is not None:
+            current[key[0]] = position
+    fit(starts)
+    best = min(current, key=score) if current else None
+
+    # Move to the best neighbour while the criteria improves
+    while best is not None and np.isfinite(score(best)):
+        if max_fits is not None and len(memo) >= max_fits:
+            break
+        positions = neighbours(current[best])
+        keys = fit(positions, start=None if warm_start is None else
+                   memo[best])
+        for position in positions:
+            c = candidate(position)
+            if c is not None and c[0] not in current:
+                current[c[0]] = position
+        new = min(keys + [best], key=score)
+        if score(new) >= score(best):
+            break
+        best = new
+
+    # Return
+    return [w for w in memo.values() if w is not None]
+
+
 class RegressionWrapper(BaseWrapper):
     """Description...
 
-
+    .. note:: The residual diagnostics (e.g. normality tests) that are not
+              computed during the fit (see diagnostics) are computed on
+              first access (e.g. wrapper.m_jb_prob) and cached.
     """
     # Attribute
     _resid = None
 
+    # The residual diagnostics computed during fit (see _resid_stats).
+    diagnostics = 'all'
+
+    def __init__(self, estimator=None, evaluate=True, diagnostics='all'):
+        """Constructor.
+
+        Parameters
+        ----------
+        estimator : object-like
+          The estimator (function or class) to fit.
+
+        diagnostics : string or list, default='all'
+          The residual diagnostics to compute during fit (dw, jb, nm, ks,
+          shp or ad). If None, they are only computed when accessed.
+        """
+        super().__init__(estimator=estimator, evaluate=evaluate)
+        self.diagnostics = diagnostics
+
+    def __getattr__(self, name):
+        """This method allows to retrieve series attributes with dot notation.
+
+        The residual diagnostics not computed yet are computed and cached.
+        """
+        try:
+            return super().__getattr__(name)
+        except AttributeError as e:
+            if name not in _DIAGNOSTIC_KEYS or \
+                    self.__dict__.get('_resid') is None:
+                raise e
+            self._result.update(self._resid_stats(
+                diagnostics=[_DIAGNOSTIC_KEYS[name]]))
+            return self._result[name]
+
     # ---------------------------------------------------------------------------
     #                             HELPER METHODS
     # ---------------------------------------------------------------------------
@@ -176,7 +474,7 @@ class RegressionWrapper(BaseWrapper):
     # ---------------------------------------------------------------------------
     #              STATISTIC METHODS FOR REGRESSION ANALYSIS
     # ---------------------------------------------------------------------------
-    def _resid_stats(self, resid=None, alpha=0.05):
+    def _resid_stats(self, resid=None, alpha=0.05, diagnostics=None):
         """This method computes basic stats on the residuals
 
         Parameters
@@ -187,6 +485,10 @@ class RegressionWrapper(BaseWrapper):
         alpha : int-like
           The alpha selected.
 
+        diagnostics : string or list, default=None
+          The diagnostics to compute (see _resid_stats). If None, those
+          in the attribute diagnostics are computed.
+
         Returns
         -------
         dictionary with the stats for the residuals
@@ -199,62 +501,13 @@ class RegressionWrapper(BaseWrapper):
         if resid is None:
             return {}
 
-        # Create series.
-        d = {}
-
-        # Compute autoc-orrelation (durbin-watson)
-        from statsmodels.stats.stattools import durbin_watson
-        d['m_dw'] = durbin_watson(resid)
-
-        # Compute normalility (jarque bera).
-        from statsmodels.stats.stattools import jarque_bera
-        jb_value, jb_prob, skew, kurtosis = jarque_bera(resid)
-        d['m_jb_value'] = jb_value
-        d['m_jb_prob'] = jb_prob
-        d['m_skew'] = skew
-        d['m_kurtosis'] = kurtosis
-
-        try:
-            # Compute normal test (normal test)
-            from scipy.stats import normaltest
-            nm_value, nm_prob = normaltest(resid)
-            d['m_nm_value'] = nm_value
-            d['m_nm_prob'] = nm_prob
-        except ValueError as e:
-            print(e)
-            d['m_nm_value'] = np.inf
-            d['m_nm_prob'] = np.inf
-
-
-        # Compute the kolmogorov-smirnov test.
-        from scipy.stats import kstest
-        ks_value, ks_prob = kstest(resid, 'norm')
-        d['m_ks_value'] = ks_value
-        d['m_ks_prob'] = ks_prob
-
-        try:
-            # Compute the shapiro-wilkinson test.
-            from scipy.stats import shapiro
-            sh_value, sh_prob = shapiro(resid)
-            d['m_shp_value'] = sh_value
-            d['m_shp_prob'] = sh_prob
-        except ValueError as e:
-            print(e)
-            d['m_shp_value'] = np.inf
-            d['m_shp_prob'] = np.inf
-
-        # Compute anderson-darling.
-        # The null hypothesis (sample data is drawn from a population that
-        # follows a particular distribution; in this case normal) can be rejected
-        # if the statistic es larger than the critical values for an specified
-        # significance level.
-        from scipy.stats import anderson
-        ad_value, ad_cv, ad_sl = anderson(resid)
-        d['m_ad_value'] = ad_value
-        d['m_ad_nnorm'] = ad_value < ad_cv[2]
+        # Diagnostics selected
+        if diagnostics is None:
+            diagnostics = self.diagnostics
 
         # Return
-        return d
+        with record(self, 'diagnostics'):
+            return _resid_stats(resid, diagnostics=diagnostics)
 
     def _exog(self, start=None, end=None):
         """This method generates the exogenous variable time.
@@ -331,23 +584,34 @@ class RegressionWrapper(BaseWrapper):
         -------
 
         """
+        # Retrieve from cache
+        key, found = self._from_cache(kwargs)
+        if found:
+            return self
+
         # Empty the class
         self._empty()
         # Update the configuration
         self._config.update(kwargs)
 
         # Fit the model
-        if inspect.isfunction(self.estimator):
-            self._fit_funct(**kwargs)
-        elif inspect.isclass(self.estimator):
-            self._fit_class(**kwargs)
+        with record(self, 'fit'):
+            if inspect.isfunction(self.estimator):
+                self._fit_funct(**kwargs)
+            elif inspect.isclass(self.estimator):
+                self._fit_class(**kwargs)
 
-        # Set the residual
-        self._resid = self.resid()
+            # Set the residual
+            self._resid = self.resid()
 
         # Evaluate the model
         if self.evaluate:
-            self._result = self.evaluate()
+            with record(self, 'evaluate'):
+                self._result = self.evaluate()
+
+        # Store in cache
+        if key is not None:
+            self.cache.put(key, self)
 
         # Return
         return self
@@ -28,6 +28,9 @@ sys.path.append("../..")
 
 # Import base wrapper
 from pyamr.core.regression.wbase import BaseWrapper
+from pyamr.core.regression.wreg import _resid_stats
+from pyamr.core.regression.wreg import _DIAGNOSTIC_KEYS
+from pyamr.core.profiling import record
 
 
 class BaseRegressionWrapper(BaseWrapper):
@@ -38,6 +41,35 @@ class BaseRegressionWrapper(BaseWrapper):
   # Main attributes of the class.
   _resid = None
 
+  # The residual diagnostics computed during fit (see _resid_stats).
+  diagnostics = 'all'
+
+  def __init__(self, diagnostics='all', **kwargs):
+    """Constructor.
+
+    Parameters
+    ----------
+    diagnostics : string or list, default='all'
+      The residual diagnostics to compute during fit (dw, jb, nm, ks,
+      shp or ad). If None, they are only computed when accessed.
+    """
+    super().__init__(**kwargs)
+    self.diagnostics = diagnostics
+
+  def __getattr__(self, name):
+    """This method allows to call series attributes from wrapper instance.
+
+    The residual diagnostics not computed yet are computed and cached.
+    """
+    try:
+      return super().__getattr__(name)
+    except AttributeError as e:
+      if name not in _DIAGNOSTIC_KEYS or self.__dict__.get('_resid') is None:
+        raise e
+      self._result.update(self._resid_stats(
+        diagnostics=[_DIAGNOSTIC_KEYS[name]]))
+      return self._result[name]
+
   # ---------------------------------------------------------------------------
   #                             HELPER METHODS
   # ---------------------------------------------------------------------------
@@ -91,7 +123,7 @@ class BaseRegressionWrapper(BaseWrapper):
   # ---------------------------------------------------------------------------
   #              STATISTIC METHODS FOR REGRESSION ANALYSIS
   # --------------------------------------------------------------------------- 
-  def _resid_stats(self, resid=None, alpha=0.05):
+  def _resid_stats(self, resid=None, alpha=0.05, diagnostics=None):
     """This method computes basic stats on the residuals 
 
     Parameters
@@ -102,6 +134,10 @@ class BaseRegressionWrapper(BaseWrapper):
     alpha : int-like
       The alpha selected.
 
+    diagnostics : string or list, default=None
+      The diagnostics to compute (see wreg._resid_stats). If None, those
+      in the attribute diagnostics are computed.
+
     Returns
     -------
     dictionary with the stats for the residuals
@@ -114,51 +150,13 @@ class BaseRegressionWrapper(BaseWrapper):
     if resid is None: 
       return {}
 
-    # Create series.
-    d = {}
-    
-    # Compute autocorrelation (durbin-watson)
-    from statsmodels.stats.stattools import durbin_watson
-    d['m_dw'] = durbin_watson(resid)
-
-    # Compute normalility (jarque bera).
-    from statsmodels.stats.stattools import jarque_bera
-    jb_value, jb_prob, skew, kurtosis = jarque_bera(resid)
-    d['m_jb_value'] = jb_value
-    d['m_jb_prob'] = jb_prob
-    d['m_skew'] = skew
-    d['m_kurtosis'] = kurtosis
-
-    # Compute normal test (normal test)
-    from scipy.stats import normaltest
-    nm_value, nm_prob = normaltest(resid)
-    d['m_nm_value'] = nm_value
-    d['m_nm_prob'] = nm_prob
-
-    # Compute the kolmogorov-smirnov test.
-    from scipy.stats import kstest
-    ks_value, ks_prob = kstest(resid, 'norm')
-    d['m_ks_value'] = ks_value
-    d['m_ks_prob'] = ks_prob
-
-    # Compute the shapiro-wilkinson test.
-    from scipy.stats import shapiro
-    sh_value, sh_prob = shapiro(resid)
-    d['m_shp_value'] = sh_value
-    d['m_shp_prob'] = sh_prob
-
-    # Compute anderson-darling. 
-    # The null hypothesis (sample data is drawn from a population that 
-    # follows a particular distribution; in this case normal) can be rejected 
-    # if the statistic es larger than the critical values for an specified 
-    # significante level.
-    from scipy.stats import anderson
-    ad_value, ad_cv, ad_sl = anderson(resid)
-    d['m_ad_value'] = ad_value
-    d['m_ad_nnorm'] = ad_value<ad_cv[2]
+    # Diagnostics selected
+    if diagnostics is None:
+      diagnostics = self.diagnostics
 
     # Return
-    return d
+    with record(self, 'diagnostics'):
+      return _resid_stats(resid, diagnostics=diagnostics)
 
 
   def conf_int_insample(self, forecast, resid=None, alpha=0.05):
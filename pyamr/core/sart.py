@@ -1,9 +1,11 @@
 # Libraries
 import warnings
+import numpy as np
 import pandas as pd
 
 # Own
 from pyamr.core.sari import SARI
+from pyamr.core.sari import sari
 
 class SART:
 
@@ -46,86 +48,116 @@ class SART:
                         self.c_abx,
                         self.c_out]
 
-    def compute(self, dataframe, period='180D', shift='30D', cdate=None,
-                return_objects=True, **kwargs):
-        """Computes single antibiotic resistance index.
+    def _frequencies(self, dataframe, cdate):
+        """Computes the daily frequencies.
 
-        .. todo: Add parameters to rolling!
-        .. todo: Place value at the left, center, right of window?
-        .. todo: Ensure that works when time gaps present!
-        .. todo: Carefull with various indexes!
+        The daily counts (one row per date and tuple in groupby) are
+        the smallest granularity needed by all the windows. Thus, they
+        are computed once and shared by all the (period, shift) windows
+        requested in ``compute``.
 
         Parameters
         ----------
         dataframe: pd.DataFrame
-            It might receive two different types of DataFrames.
+            The DataFrame with the raw susceptibility test records.
 
-            The first option is a DataFrame with the raw susceptibility test
-            records where the interpretation ('sensitive', 'intermediate',
-            'resistant') that will be used to compute the sari.
+        cdate: string
+            The column that will be used as date.
 
-            The second option is a DataFrame with the sari values already
-            computed.
+        Returns
+        -------
+        pd.DataFrame
+            The daily frequencies in long format with the columns
+            [cdate] + groupby + ['freq'].
+        """
+        # Grouper
+        grouper = [pd.Grouper(freq='1D', key=cdate)]
+        grouper = grouper + self.groupby
 
-        shift: str
-            Frequency value to pass to pd.Grouper.
+        # Return
+        return dataframe.groupby(grouper) \
+            .size().rename('freq').reset_index()
 
-        period: str, int
+    def _rolling(self, daily, period, shift, cdate, **kwargs):
+        """Computes the sari time-series from the daily frequencies.
+
+        .. note: It is equivalent to SARI.rolling but adding up the
+                 daily counts instead of the number of records. The
+                 bins created by pd.Grouper start at the first date
+                 in both cases, so the results are the same.
+
+        Parameters
+        ----------
+        daily: pd.DataFrame
+            The daily frequencies (see ``_frequencies``).
+
+        period: str
             Window value to pass to pd.rolling.
 
-        cdate: string, default=None
+        shift: str
+            Frequency value to pass to pd.Grouper.
+
+        cdate: string
             The column that will be used as date.
 
-        return_frequencies: boolean, default=True
-            Whether to return the frequencies or just the resistance index.
+        **kwargs: arguments to pass the sari strategy function.
 
-        strategy: string or func, default='hard'
-            The method used to compute sari. The possible options
-            are 'soft', 'medium' and 'hard'. In addition, a function
-            with the following signature func(DataFrame, **kwargs)
-            can be passed.
+        Returns
+        -------
+        pd.DataFrame
+            The frequencies and the resistance index (sari).
+        """
+        # Grouper
+        grouper = [pd.Grouper(freq=shift, key=cdate)]
+        grouper = grouper + self.groupby
 
-                (i) ``soft``    as R / R+I+S
-                (ii) ``medium`` as R / R+S
-                (iii) ``hard``  as R+I / R+I+S
-                (iv) ``other``  as R+0.5I / R+0.5I+S [Not yet]
+        # Compute frequencies
+        freqs = daily.groupby(grouper).freq \
+            .sum().unstack().reset_index() \
+            .set_index(cdate).groupby(grouper[1:-1]) \
+            .rolling(window=period, min_periods=1) \
+            .sum().fillna(0)
 
-        **kwargs: arguments to pass the strategy function.
+        # Remove index name.
+        freqs.columns.name = None
+
+        # Compute sari
+        freqs['freq'] = freqs.sum(axis=1)
+        freqs['sari'] = sari(freqs, **kwargs)
+
+        # Return
+        return freqs
+
+    def _trends(self, sari_oti, shift, cdate, diagnostics='all'):
+        """Computes the resistance trend for each tuple.
+
+        Parameters
+        ----------
+        sari_oti: pd.DataFrame
+            The sari time-series with the columns groupby[:-1], cdate,
+            sari and freq.
+
+        shift: str
+            Frequency value to resample (interpolate) the time-series.
+
+        cdate: string
+            The column that will be used as date.
+
+        diagnostics: string or list, default='all'
+            The residual diagnostics to compute (see WLSWrapper).
 
         Returns
         -------
-        pd.Series or pd.DataFrame
-            The resistance index (pd.Series) or a pd.DataFrame with the
-            resistance index (sari) and the frequencies.
+        list
+            The list of tuples (name, WLSWrapper).
         """
         # Libraries
-        import numpy as np
-        import pandas as pd
         import statsmodels.api as sm
 
         # Libraries
-        from pyamr.core.sari import SARI
         from pyamr.core.regression.wls import WLSWrapper
         from pyamr.metrics.weights import SigmoidA
 
-        # Copy DataFrame
-        aux = dataframe.copy(deep=True)
-
-        # ------------------------------
-        # Compute resistance time-series
-        # ------------------------------
-        # Create SARI instance
-        sar = SARI(groupby=self.groupby)
-
-        # Compute sari time-series
-        sari_oti = sar.compute(aux, shift=shift,
-            period=period, cdate='date_received')
-
-        sari_oti = sari_oti.reset_index()
-
-        # ------------------------
-        # Compute resistance trend
-        # ------------------------
         # Group by tuples
         groups = sari_oti.groupby(self.groupby[:-1])
 
@@ -137,7 +169,7 @@ class SART:
             print("%2s/%2s. Computing... %s" % (i+1, len(groups), str(name)))
 
             # Warning
-            if aux.shape[0] < 2:
+            if group.shape[0] < 2:
                 warnings.warn("""
                      {}:
                      There is only one single point and therefore the
@@ -148,7 +180,7 @@ class SART:
 
             # Interpolate (if missing dates)
             aux = group \
-                .set_index('date_received') \
+                .set_index(cdate)[['sari', 'freq']] \
                 .resample(shift) \
                 .interpolate(method='linear')
 
@@ -164,7 +196,7 @@ class SART:
             # store the M converter in the instance. Therefore, the code executed is
             # equivalent to <weights=M.weights(f)> with the only difference being that
             # the weight converter is not saved.
-            wls = WLSWrapper(estimator=sm.WLS).fit( \
+            wls = WLSWrapper(estimator=sm.WLS, diagnostics=diagnostics).fit( \
                 exog=x, endog=y, trend='c', weights=f,
                 W=W, missing='raise')
 
@@ -174,21 +206,163 @@ class SART:
             # Append object
             objs += [(name, wls)]
 
-        # Construct DataFrame
-        table = pd.DataFrame([
-            obj.as_series().append(
-                pd.Series({
-                    self.c_spe: name[0],
-                    self.c_org: name[1],
-                    self.c_abx: name[2]
-                })
-            ) for name, obj in objs])
+        # Return
+        return objs
+
+    def compute(self, dataframe, period='180D', shift='30D', cdate=None,
+                windows=None, return_objects=True, diagnostics='all',
+                **kwargs):
+        """Computes single antibiotic resistance trend.
+
+        .. todo: Add parameters to rolling!
+        .. todo: Place value at the left, center, right of window?
+        .. todo: Ensure that works when time gaps present!
+        .. todo: Carefull with various indexes!
+
+        Examples
+        --------
+
+        .. code-block:: python
+
+            # Single window
+            table, objs = sart.compute(data, period='180D', shift='30D')
+
+            # Multiple windows (one pass)
+            table, objs = sart.compute(data, windows=[
+                ('90D', '30D'), ('180D', '30D'), ('365D', '30D')])
+
+        Parameters
+        ----------
+        dataframe: pd.DataFrame
+            It might receive two different types of DataFrames.
+
+            The first option is a DataFrame with the raw susceptibility test
+            records where the interpretation ('sensitive', 'intermediate',
+            'resistant') that will be used to compute the sari.
+
+            The second option is a DataFrame with the sari values already
+            computed.
+
+        shift: str
+            Frequency value to pass to pd.Grouper.
+
+        period: str, int
+            Window value to pass to pd.rolling.
+
+        cdate: string, default=None
+            The column that will be used as date. If None, the column
+            indicated in the constructor (column_date) is used.
+
+        windows: list of tuples, default=None
+            The list of (period, shift) windows to compute. The daily
+            frequencies are computed only once and shared across all
+            the windows. If None, the window (period, shift) is used.
+            When it is passed, the returned table includes the levels
+            period and shift in the index (long format).
+
+        return_objects: boolean, default=True
+            Whether to return the WLSWrapper objects.
+
+        diagnostics: string or list, default='all'
+            The residual diagnostics included in the table (dw, jb, nm,
+            ks, shp or ad). If None, they are only computed if accessed
+            through the objects.
+
+        strategy: string or func, default='hard'
+            The method used to compute sari. The possible options
+            are 'soft', 'medium' and 'hard'. In addition, a function
+            with the following signature func(DataFrame, **kwargs)
+            can be passed.
+
+                (i) ``soft``    as R / R+I+S
+                (ii) ``medium`` as R / R+S
+                (iii) ``hard``  as R+I / R+I+S
+                (iv) ``other``  as R+0.5I / R+0.5I+S [Not yet]
+
+        **kwargs: arguments to pass the strategy function.
+
+        Returns
+        -------
+        pd.DataFrame or (pd.DataFrame, list)
+            The table with the resistance trends and (optionally) the
+            list of tuples (name, WLSWrapper). When multiple windows
+            are computed the name includes (period, shift) first.
+        """
+        # Default date column
+        if cdate is None:
+            cdate = self.c_dat
+
+        # Default windows
+        keyed = windows is not None
+        if windows is None:
+            windows = [(period, shift)]
+
+        # Check windows
+        for p, s in windows:
+            if not isinstance(p, str) or not isinstance(s, str):
+                raise ValueError("""
+                    The window (%s, %s) is not valid. Ensure that both
+                    <period> and <shift> are valid strings such as 30D.
+                    """ % (p, s))
+
+        # Copy DataFrame
+        aux = dataframe.copy(deep=True)
+
+        # Format as datetime
+        aux[cdate] = pd.to_datetime(aux[cdate])
+
+        # ------------------------------
+        # Compute resistance time-series
+        # ------------------------------
+        # Compute daily frequencies (once)
+        daily = self._frequencies(aux, cdate=cdate)
+
+        # Save
+        tables, objs = [], []
+
+        # Loop
+        for p, s in windows:
+
+            # Compute sari time-series
+            sari_oti = self._rolling(daily, period=p, shift=s,
+                cdate=cdate, **kwargs).reset_index()
+
+            # ------------------------
+            # Compute resistance trend
+            # ------------------------
+            window_objs = self._trends(sari_oti, shift=s, cdate=cdate,
+                diagnostics=diagnostics)
+
+            # Construct DataFrame
+            table = pd.DataFrame([
+                pd.concat([obj.as_series(),
+                    pd.Series({
+                        self.c_spe: name[0],
+                        self.c_org: name[1],
+                        self.c_abx: name[2]
+                    })
+                ]) for name, obj in window_objs])
+
+            # Include window information
+            if keyed:
+                table.insert(0, 'shift', s)
+                table.insert(0, 'period', p)
+                window_objs = [((p, s) + name, obj)
+                    for name, obj in window_objs]
+
+            # Append
+            tables.append(table)
+            objs.extend(window_objs)
 
         # Set index information
-        table = table.set_index([
-            self.c_spe,
-            self.c_org,
-            self.c_abx])
+        index = [self.c_spe, self.c_org, self.c_abx]
+        if keyed:
+            index = ['period', 'shift'] + index
+
+        # Combine
+        table = pd.concat(tables, ignore_index=True)
+        if not table.empty:
+            table = table.set_index(index)
 
         # Return
         if return_objects:
@@ -0,0 +1,462 @@
+################################################################################
+# Author:
+# Date:
+# Description:
+#
+#
+#
+# Copyright:
+#
+#
+################################################################################
+# Import libraries
+import json
+import struct
+import zipfile
+import importlib
+import numpy as np
+import pandas as pd
+
+# Version of the format (increase when it changes)
+SCHEMA_VERSION = 1
+
+# Attributes handled separately
+_SKIP = ['_raw', '_result', '_config', 'estimator']
+
+# Packages from which the classes and functions can be loaded. The
+# wrappers and objects (e.g. weights functions) must be from pyamr and
+# the estimators may also be from statsmodels or scipy.
+_PACKAGES = {'wrapper': ('pyamr',), 'object': ('pyamr',),
+             'estimator': ('pyamr', 'statsmodels', 'scipy')}
+
+
+# -------------------------------------------------------------------------
+#                            helper methods
+# -------------------------------------------------------------------------
+def _path(obj):
+    """Returns the import path of a class or function."""
+    if obj is None:
+        return None
+    return '%s:%s' % (obj.__module__, obj.__qualname__)
+
+
+def _is_wrapper(obj):
+    """Whether the object is a wrapper class of pyamr."""
+    from pyamr.core.stats.wbase import BaseWrapper
+    from pyamr.core.regression.wbase import BaseWrapper as BaseRegression
+    return isinstance(obj, type) and \
+        issubclass(obj, (BaseWrapper, BaseRegression))
+
+
+def _import(path, kind):
+    """Imports a class or function from its path (see _path).
+
+    Only the packages allowed for each kind (wrapper, object or estimator,
+    see _PACKAGES) are imported, and the wrappers must be subclasses of
+    BaseWrapper, so loading a file does not run arbitrary code. It raises
+    ValueError otherwise.
+    """
+    if path is None:
+        return None
+
+    # Check package (before importing)
+    module, qualname = path.split(':')
+    if module.split('.')[0] not in _PACKAGES[kind]:
+        raise ValueError("The %s %s can not be loaded." % (kind, path))
+
+    # Import
+    obj = importlib.import_module(module)
+    for name in qualname.split('.'):
+        obj = getattr(obj, name)
+
+    # Check the object (e.g. not a function imported in the module)
+    package = str(getattr(obj, '__module__', '')).split('.')[0]
+    if package not in _PACKAGES[kind] or \
+            (kind == 'wrapper' and not _is_wrapper(obj)) or \
+            (kind == 'object' and not isinstance(obj, type)):
+        raise ValueError("The %s %s can not be loaded." % (kind, path))
+
+    # Return
+    return obj
+
+
+def _encode(value):
+    """Converts a value to a json compatible value.
+
+    The tuples are tagged so that they are restored as tuples (e.g.
+    order). The objects whose attributes are json compatible (e.g. the
+    weights functions) are tagged with their class. It raises TypeError
+    if the value is not supported.
+    """
+    if value is None or isinstance(value, (bool, str)):
+        return value
+    if isinstance(value, (np.bool_, np.integer, np.floating)):
+        return value.item()
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, tuple):
+        return {'__tuple__': [_encode(v) for v in value]}
+    if isinstance(value, list):
+        return [_encode(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): _encode(v) for k, v in value.items()}
+    if hasattr(value, '__dict__') and not callable(value):
+        return {'__object__': _path(value.__class__),
+                '__dict__': _encode(value.__dict__)}
+    raise TypeError("Type %s not supported." % type(value).__name__)
+
+
+def _decode(value):
+    """Restores a value converted with _encode."""
+    if isinstance(value, list):
+        return [_decode(v) for v in value]
+    if isinstance(value, dict):
+        if '__tuple__' in value:
+            return tuple(_decode(v) for v in value['__tuple__'])
+        if '__object__' in value:
+            cls = _import(value['__object__'], 'object')
+            obj = cls.__new__(cls)
+            obj.__dict__.update(_decode(value['__dict__']))
+            return obj
+        return {k: _decode(v) for k, v in value.items()}
+    return value
+
+
+def _is_number(value):
+    """Whether the value is a float scalar (stored in the table).
+
+    The NaN values are kept with the meta information since NaN is
+    used in the table for the missing values.
+    """
+    return isinstance(value, (float, np.floating)) and not np.isnan(value)
+
+
+def _as_array(value):
+    """Returns the numeric array of the value (or None)."""
+    if isinstance(value, (pd.Series, pd.DataFrame)):
+        value = value.to_numpy()
+    if isinstance(value, np.ndarray) and value.dtype.kind in 'biuf':
+        return value
+    return None
+
+
+def _npz_memmap(fname):
+    """Memory maps the arrays of an uncompressed npz file.
+
+    Parameters
+    ----------
+    fname : string
+      The path of the npz file (saved with np.savez).
+
+    Returns
+    -------
+    dict with the np.memmap of each array.
+    """
+    arrays = {}
+    with zipfile.ZipFile(fname) as z, open(fname, 'rb') as f:
+        for info in z.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError("""
+                    The array {0} in {1} is compressed and cannot be
+                    memory-mapped.""".format(info.filename, fname))
+            # Skip the local header (name and extra field lengths)
+            f.seek(info.header_offset)
+            n, m = struct.unpack('<2H', f.read(30)[26:30])
+            f.seek(info.header_offset + 30 + n + m)
+            # Read the array header
+            if np.lib.format.read_magic(f) == (1, 0):
+                header = np.lib.format.read_array_header_1_0(f)
+            else:
+                header = np.lib.format.read_array_header_2_0(f)
+            shape, fortran, dtype = header
+            # Memory map
+            arrays[info.filename[:-4]] = np.memmap(f, dtype=dtype,
+                mode='r', offset=f.tell(), shape=shape,
+                order='F' if fortran else 'C')
+    # Return
+    return arrays
+
+
+# -------------------------------------------------------------------------
+#                             save and load
+# -------------------------------------------------------------------------
+def save_wrappers(wrappers, fname, arrays=True):
+    """Saves many fitted wrappers in a single file.
+
+    Instead of pickling the whole object (including the statsmodels
+    results and raw data), only the following is stored in an
+    uncompressed npz file:
+
+        - ``meta``: json (as bytes) with the schema version, the class,
+          estimator and the non-numeric results and configuration of
+          each wrapper.
+        - ``results``: the float results of all the wrappers as a
+          table (n_wrappers, n_keys) with NaN for the missing values.
+        - ``params`` and ``cov``: the coefficients and covariance matrix
+          of the underlying model (if available).
+        - ``<section>.<key>``: the numeric arrays of the configuration
+          (e.g. endog, exog) and attributes (e.g. _resid), concatenated
+          for all the wrappers (ragged) together with their offsets.
+
+    .. note:: Values that are not numeric arrays nor json compatible
+              (e.g. a lambda function) are not saved. Their names are
+              kept in the meta information (dropped) and they are None
+              when loaded.
+
+    Parameters
+    ----------
+    wrappers : list
+      The fitted wrappers.
+
+    fname : string
+      The path of the file.
+
+    arrays : boolean
+      Whether to save the numeric arrays (e.g. endog, exog, _resid).
+
+    Returns
+    -------
+    None
+    """
+    # Containers
+    models, names, ragged = [], {}, {}
+
+    def add(group, i, array):
+        """Adds an array to the ragged group."""
+        ragged.setdefault(group, {})[i] = np.asarray(array)
+        return list(np.shape(array))
+
+    # Loop
+    for i, w in enumerate(wrappers):
+        # Meta information
+        meta = {'class': _path(w.__class__),
+                'estimator': _path(getattr(w, 'estimator', None)),
+                'result': {}, 'config': {}, 'attrs': {},
+                'shapes': {}, 'dropped': []}
+
+        # Sections
+        sections = {'result': w._result or {},
+                    'config': w._config or {},
+                    'attrs': {k: v for k, v in w.__dict__.items()
+                              if k not in _SKIP}}
+
+        # Encode
+        for section, values in sections.items():
+            for k, v in values.items():
+                if section == 'result' and _is_number(v):
+                    names.setdefault(k, len(names))
+                    continue
+                a = _as_array(v)
+                if a is not None:
+                    if arrays:
+                        group = '%s.%s' % (section, k)
+                        meta['shapes'][group] = add(group, i, a)
+                    continue
+                try:
+                    meta[section][k] = _encode(v)
+                except TypeError:
+                    meta['dropped'].append('%s.%s' % (section, k))
+
+        # Coefficients and covariance
+        params = getattr(w._raw, 'params', None)
+        cov = getattr(w._raw, 'cov_params', None)
+        if _as_array(params) is not None and callable(cov):
+            index = getattr(getattr(w._raw, 'model', None),
+                'param_names', range(len(params)))
+            meta['params'] = [str(e) for e in index]
+            meta['shapes']['params'] = add('params', i, params)
+            meta['shapes']['cov'] = add('cov', i, cov())
+
+        # Append
+        models.append(meta)
+
+    # Numeric results
+    results = np.full((len(wrappers), len(names)), np.nan)
+    for i, w in enumerate(wrappers):
+        for k, v in (w._result or {}).items():
+            if _is_number(v):
+                results[i, names[k]] = v
+
+    # Ragged arrays (concatenated with offsets)
+    data = {}
+    for group, values in ragged.items():
+        sizes = [values[i].size if i in values else 0
+                 for i in range(len(wrappers))]
+        data['%s.offsets' % group] = np.concatenate(([0], np.cumsum(sizes)))
+        data['%s.data' % group] = np.concatenate(
+            [values[i].ravel() for i in sorted(values)])
+
+    # Meta information
+    meta = {'version': SCHEMA_VERSION,
+            'names': sorted(names, key=names.get),
+            'models': models}
+
+    # Save (uncompressed so it can be memory-mapped)
+    np.savez(fname, meta=np.frombuffer(
+        json.dumps(meta).encode('utf-8'), dtype=np.uint8),
+        results=results, **data)
+
+
+def _read(fname, mmap_mode=None):
+    """Reads the arrays and meta information of the file."""
+    # Read arrays
+    if mmap_mode is None:
+        with np.load(fname) as npz:
+            arrays = {k: npz[k] for k in npz.files}
+    else:
+        arrays = _npz_memmap(fname)
+
+    # Meta information
+    meta = json.loads(np.asarray(arrays.pop('meta')).tobytes())
+
+    # Check version
+    if meta['version'] > SCHEMA_VERSION:
+        raise ValueError("""
+            The file {0} was saved with the version {1} of the format
+            but only versions up to {2} are supported.""".format(
+                fname, meta['version'], SCHEMA_VERSION))
+
+    # Return
+    return meta, arrays
+
+
+def read_results(fname, mmap_mode='r'):
+    """Reads the numeric results without creating the wrappers.
+
+    Parameters
+    ----------
+    fname : string
+      The path of the file (see save_wrappers).
+
+    mmap_mode : string, default='r'
+      If not None, the results are memory-mapped.
+
+    Returns
+    -------
+    pd.DataFrame with the numeric results (one row per wrapper).
+    """
+    meta, arrays = _read(fname, mmap_mode=mmap_mode)
+    return pd.DataFrame(arrays['results'], columns=meta['names'],
+                        copy=False)
+
+
+def load_wrappers(fname, mmap_mode=None, indexes=None):
+    """Loads the wrappers saved with save_wrappers.
+
+    The wrappers are restored with their results, configuration and
+    attributes. The underlying model (_raw) is not saved, instead the
+    coefficients and covariance matrix are available in the attributes
+    _params (pd.Series) and _cov_params (np.array).
+
+    Parameters
+    ----------
+    fname : string
+      The path of the file.
+
+    mmap_mode : string, default=None
+      If not None (e.g. 'r'), the arrays are memory-mapped from the
+      file instead of loaded in memory.
+
+    indexes : list, default=None
+      The indexes of the wrappers to load. If None, all of them.
+
+    Returns
+    -------
+    list of wrappers.
+    """
+    # Read
+    meta, arrays = _read(fname, mmap_mode=mmap_mode)
+    names = meta['names']
+    results = arrays['results']
+
+    # Indexes
+    if indexes is None:
+        indexes = range(len(meta['models']))
+
+    # Create wrappers
+    wrappers = []
+    for i in indexes:
+        m = meta['models'][i]
+
+        # Decode sections
+        result = {k: v for k, v in zip(names, results[i])
+                  if not np.isnan(v)}
+        result.update(_decode(m['result']))
+        config = _decode(m['config'])
+        attrs = _decode(m['attrs'])
+
+        # Arrays and dropped values
+        sections = {'result': result, 'config': config, 'attrs': attrs}
+        for name in m['dropped']:
+            section, key = name.split('.', 1)
+            sections[section][key] = None
+        ragged = {}
+        for group, shape in m['shapes'].items():
+            lo, hi = arrays['%s.offsets' % group][i:i + 2]
+            ragged[group] = arrays['%s.data' % group][lo:hi].reshape(shape)
+            if '.' in group:
+                section, key = group.split('.', 1)
+                sections[section][key] = ragged[group]
+
+        # Create wrapper (without calling the constructor)
+        cls = _import(m['class'], 'wrapper')
+        w = cls.__new__(cls)
+        w.__dict__.update(attrs)
+        w.estimator = _import(m['estimator'], 'estimator')
+        w._raw = None
+        w._result = result
+        w._config = config
+        if 'params' in ragged:
+            w._params = pd.Series(ragged['params'], index=m['params'])
+            w._cov_params = ragged['cov']
+        wrappers.append(w)
+
+    # Return
+    return wrappers
+
+
+
+if __name__ == '__main__': # pragma: no cover
+
+    # Libraries
+    import os
+    import time
+    import tempfile
+    import warnings
+    import statsmodels.api as sm
+
+    # Specific
+    from pyamr.core.regression.wls import WLSWrapper
+
+    # Ignore warnings
+    warnings.simplefilter('ignore')
+
+    # Fit many wrappers
+    x = np.arange(50)
+    wrappers = [WLSWrapper(estimator=sm.WLS).fit(
+        endog=x * np.random.rand() + np.random.randn(50), trend='c')
+        for i in range(1000)]
+
+    # Save compact
+    path = tempfile.mkdtemp()
+    t0 = time.time()
+    save_wrappers(wrappers, os.path.join(path, 'wls.npz'))
+    print("\nSaved (npz) in %.3fs: %.1f KB" % (time.time() - t0,
+        os.path.getsize(os.path.join(path, 'wls.npz')) / 1024))
+
+    # Save pickle
+    t0 = time.time()
+    for i, w in enumerate(wrappers):
+        w.save(os.path.join(path, 'wls-%s.pickle' % i))
+    print("Saved (pickle) in %.3fs: %.1f KB" % (time.time() - t0,
+        sum(os.path.getsize(os.path.join(path, 'wls-%s.pickle' % i))
+            for i in range(len(wrappers))) / 1024))
+
+    # Load
+    t0 = time.time()
+    loaded = load_wrappers(os.path.join(path, 'wls.npz'), mmap_mode='r')
+    print("Loaded (npz) in %.3fs" % (time.time() - t0))
+    print(loaded[0].as_series().head(10))
+
+    # Results only
+    print(read_results(os.path.join(path, 'wls.npz')).head())
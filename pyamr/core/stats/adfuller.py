@@ -17,6 +17,202 @@ import pandas as pd
 from pyamr.core.stats.wbase import BaseWrapper
 
 
+# -----------------------------------------------------------------------------
+#                            vectorized adfuller
+# -----------------------------------------------------------------------------
+def _trend(nobs, regression):
+    """Deterministic terms (as statsmodels add_trend) with shape (nobs, k)."""
+    t = np.arange(1, nobs + 1, dtype=float)
+    columns = {'n': [], 'c': [np.ones(nobs)],
+               'ct': [np.ones(nobs), t],
+               'ctt': [np.ones(nobs), t, t ** 2]}[regression]
+    return np.column_stack(columns) if columns else np.empty((nobs, 0))
+
+
+def _design(x, lag, nlags, regression):
+    """Lagged design of the ADF regression for many series.
+
+    Parameters
+    ----------
+    x : np.array
+      The series (n observations, m series).
+
+    lag : int
+      The number of lags used to trim the sample (nobs = n - 1 - lag).
+
+    nlags : int
+      The number of lagged differences in the design (nlags <= lag).
+
+    regression : string
+      The deterministic terms (n, c, ct or ctt).
+
+    Returns
+    -------
+    design (m, nobs, k) with the columns [trend, level, lags] and the
+    endogenous variable (m, nobs).
+    """
+    # Differences
+    n, m = x.shape
+    xdiff = np.diff(x, axis=0)
+    nobs = n - 1 - lag
+
+    # Columns (m, nobs)
+    columns = [np.broadcast_to(c[:, None], (nobs, m))
+               for c in _trend(nobs, regression).T]
+    columns += [x[lag:n - 1]]
+    columns += [xdiff[lag - j:n - 1 - j] for j in range(1, nlags + 1)]
+
+    # Return
+    return np.stack(columns, axis=-1).transpose(1, 0, 2), xdiff[lag:].T
+
+
+def _ols(G, b, yy, nobs, k):
+    """Solves the least squares with the first k columns (batched).
+
+    Parameters
+    ----------
+    G, b, yy : np.array
+      The gram matrix (m, K, K), X'y (m, K) and y'y (m,).
+
+    nobs : int
+      The number of observations.
+
+    k : int
+      The number of columns to use.
+
+    Returns
+    -------
+    ssr (m,), tvalues (m, k)
+    """
+    inv = np.linalg.inv(G[:, :k, :k])
+    beta = np.einsum('mkj,mj->mk', inv, b[:, :k])
+    ssr = yy - np.einsum('mk,mk->m', beta, b[:, :k])
+    se = np.sqrt(np.diagonal(inv, axis1=1, axis2=2) *
+                 (ssr / (nobs - k))[:, None])
+    return ssr, beta / se
+
+
+def adfuller_batch(x, maxlag=None, regression='c', autolag='AIC'):
+    """Augmented Dickey-Fuller test of many series of the same length.
+
+    The lagged design is built once for all the series (and for the largest
+    lag) and the least squares of every series and lag are solved with
+    batched linear algebra on the gram matrices (the regressions with fewer
+    lags use their leading submatrices). It follows the same steps as
+    statsmodels adfuller, so the statistics, number of lags and MacKinnon
+    pvalues and critical values are the same within tolerance. The series
+    with nan values have nan results.
+
+    Parameters
+    ----------
+    x : array-like or pd.DataFrame
+      The series (n observations, m series).
+
+    maxlag : int, default=None
+      The maximum lag. If None, 12*(nobs/100)^{1/4} as in statsmodels.
+
+    regression : string, options = {c, ct, ctt, n}
+      The deterministic terms of the regression.
+
+    autolag : string, options = {AIC, BIC, t-stat, None}
+      The method to choose the number of lags.
+
+    Returns
+    -------
+    pd.DataFrame with one row per series and the same columns as the
+    ADFWrapper results (statistic, pvalue, nlags, nobs, stationary and
+    critical values).
+    """
+    # Libraries
+    from statsmodels.tsa.adfvalues import mackinnonp
+    from statsmodels.tsa.adfvalues import mackinnoncrit
+
+    # Format
+    index = x.columns if isinstance(x, pd.DataFrame) else None
+    x = np.asarray(x, dtype=float)
+    x = x.reshape(-1, 1) if x.ndim == 1 else x
+    n, m = x.shape
+    index = pd.RangeIndex(m) if index is None else index
+    ntrend = len(regression) if regression != 'n' else 0
+
+    # Maximum lag
+    if maxlag is None:
+        maxlag = int(np.ceil(12.0 * np.power(n / 100.0, 1 / 4.0)))
+        maxlag = min(n // 2 - ntrend - 1, maxlag)
+    if maxlag < 0 or maxlag > n // 2 - ntrend - 1:
+        raise ValueError("""
+            The maxlag {0} must be between 0 and {1} (half the number of
+            observations minus the deterministic terms minus one)."""
+            .format(maxlag, n // 2 - ntrend - 1))
+
+    # Series without nan
+    valid = ~np.isnan(x).any(axis=0)
+    xv = x[:, valid]
+
+    # Number of lags
+    usedlag = np.full(xv.shape[1], maxlag)
+    if autolag is not None:
+        # Design (largest lag) and gram matrices
+        D, y = _design(xv, maxlag, maxlag, regression)
+        G = np.einsum('mtk,mtj->mkj', D, D)
+        b = np.einsum('mtk,mt->mk', D, y)
+        yy = np.einsum('mt,mt->m', y, y)
+        nobs = n - 1 - maxlag
+
+        # Information criteria of each lag (lags, m)
+        ssr, tvalues = zip(*[_ols(G, b, yy, nobs, ntrend + 1 + l)
+                             for l in range(maxlag + 1)])
+        k = ntrend + 1 + np.arange(maxlag + 1)[:, None]
+        llf = -nobs / 2 * (np.log(2 * np.pi) + np.log(np.array(ssr) / nobs) + 1)
+
+        # Best lag
+        method = autolag.lower()
+        if method == 'aic':
+            usedlag = np.argmin(-2 * llf + 2 * k, axis=0)
+        elif method == 'bic':
+            usedlag = np.argmin(-2 * llf + np.log(nobs) * k, axis=0)
+        elif method == 't-stat':
+            last = np.abs(np.array([t[:, -1] for t in tvalues]))
+            significant = last >= 1.6448536269514722
+            significant[0] = True
+            usedlag = maxlag - np.argmax(significant[::-1], axis=0)
+        else:
+            raise ValueError("""
+                The autolag <{0}> is not supported. The options are AIC,
+                BIC, t-stat or None.""".format(autolag))
+
+    # Regression with the lags used (grouped by lag)
+    statistic = np.empty(xv.shape[1])
+    for lag in np.unique(usedlag):
+        idx = np.flatnonzero(usedlag == lag)
+        D, y = _design(xv[:, idx], lag, lag, regression)
+        G = np.einsum('mtk,mtj->mkj', D, D)
+        b = np.einsum('mtk,mt->mk', D, y)
+        yy = np.einsum('mt,mt->m', y, y)
+        statistic[idx] = _ols(G, b, yy, n - 1 - lag,
+                              D.shape[2])[1][:, ntrend]
+
+    # Create results
+    r = pd.DataFrame(index=index, columns=['statistic', 'pvalue', 'nlags',
+        'nobs', 'stationary', 'criticalvalue_1%', 'criticalvalue_5%',
+        'criticalvalue_10%'], dtype=float)
+    r.loc[valid, 'statistic'] = statistic
+    r.loc[valid, 'pvalue'] = [mackinnonp(s, regression=regression, N=1)
+                              for s in statistic]
+    r.loc[valid, 'nlags'] = usedlag
+    r.loc[valid, 'nobs'] = n - 1 - usedlag
+    r['stationary'] = (r.pvalue < 0.05).astype(object)
+    r.loc[~valid, 'stationary'] = None
+    for nobs in np.unique(n - 1 - usedlag):
+        crit = mackinnoncrit(N=1, regression=regression, nobs=nobs)
+        rows = r.index[valid][n - 1 - usedlag == nobs]
+        r.loc[rows, ['criticalvalue_1%', 'criticalvalue_5%',
+                     'criticalvalue_10%']] = crit
+
+    # Return
+    return r
+
+
 class ADFWrapper(BaseWrapper):
     """The ADF wrapper.
 
@@ -23,6 +23,250 @@ sys.path.append("../..")
 from pyamr.core.stats.wbase import BaseWrapper
 
 
+# -----------------------------------------------------------------------------
+#                            vectorized correlation
+# -----------------------------------------------------------------------------
+def _format(x):
+  """Returns the values (n, m) and labels of the series."""
+  labels = x.columns if isinstance(x, pd.DataFrame) else \
+    [getattr(x, 'name', None) or 0] if isinstance(x, pd.Series) else None
+  x = np.asarray(x, dtype=float)
+  x = x.reshape(-1, 1) if x.ndim == 1 else x
+  labels = pd.RangeIndex(x.shape[1]) if labels is None else labels
+  return x, pd.Index(labels)
+
+
+def _ranks(x):
+  """Average ranks of each column (nan values are kept as nan)."""
+  from scipy.stats import rankdata
+  r = rankdata(np.where(np.isnan(x), np.inf, x), axis=0)
+  return np.where(np.isnan(x), np.nan, r)
+
+
+def _pearson(x, y):
+  """Pairwise complete pearson correlation of the columns of x and y.
+
+  The sums over the observations available in both series are computed
+  for all the pairs with matrix products of the zero-filled values and
+  the masks.
+
+  Parameters
+  ----------
+  x, y : np.array
+    The series (n, mx) and (n, my).
+
+  Returns
+  -------
+  corr (mx, my), nobs (mx, my) and sum of products (mx, my).
+  """
+  # Masks and zero-filled values
+  mx, my = ~np.isnan(x), ~np.isnan(y)
+  x0, y0 = np.where(mx, x, 0), np.where(my, y, 0)
+  mx, my = mx.astype(float), my.astype(float)
+
+  # Center (numerical stability, it does not change the correlation)
+  xc = np.where(mx > 0, x0 - x0.sum(0) / np.maximum(mx.sum(0), 1), 0)
+  yc = np.where(my > 0, y0 - y0.sum(0) / np.maximum(my.sum(0), 1), 0)
+
+  # Sums over the pairwise complete observations
+  n = mx.T @ my
+  sx, sy = xc.T @ my, mx.T @ yc
+  sxx, syy = (xc ** 2).T @ my, mx.T @ (yc ** 2)
+  sxy = xc.T @ yc
+
+  # Correlation
+  with np.errstate(divide='ignore', invalid='ignore'):
+    corr = (n * sxy - sx * sy) / \
+      np.sqrt((n * sxx - sx ** 2) * (n * syy - sy ** 2))
+  corr = np.clip(corr, -1, 1)
+
+  # Return
+  return corr, n, x0.T @ y0
+
+
+def _pvalue(corr, n):
+  """Two-sided pvalue of the correlation (t-distribution, n-2 dof)."""
+  from scipy.stats import t
+  with np.errstate(divide='ignore', invalid='ignore'):
+    dof = n - 2
+    stat = corr * np.sqrt(dof / ((1.0 - corr) * (1.0 + corr)))
+    return np.where(dof > 0, 2 * t.sf(np.abs(stat), dof), np.nan)
+
+
+def correlation_batch(x, y=None, min_periods=3):
+  """Pearson and spearman correlation of many pairs of series.
+
+  The correlations and pvalues of all the pairs are computed at once.
+  The pearson correlation uses matrix products of the (centered) series
+  and masks so that each pair only uses the observations available in
+  both series. The spearman correlation ranks each series once and then
+  computes the pearson correlation of the ranks. When the masks of the
+  two series differ, the ranks are recomputed with the observations
+  available in both (as scipy spearmanr on the pairwise complete values),
+  one series of x at a time against all the series of y.
+
+  Parameters
+  ----------
+  x : array-like or pd.DataFrame
+    The series (n observations, mx series).
+
+  y : array-like or pd.DataFrame, default=None
+    The series (n observations, my series). If None, the pairs of
+    different series in x (i < j).
+
+  min_periods : int
+    The minimum number of observations in both series. The pairs with
+    fewer observations have nan results.
+
+  Returns
+  -------
+  pd.DataFrame with the pair (x, y) as index and the same columns as the
+  CorrelationWrapper results (spearman_corr, spearman_pval, pearson_corr,
+  pearson_pval and crosscorr) and the number of observations (nobs). Use
+  unstack to obtain the matrices.
+
+  Examples
+  --------
+
+  .. code-block:: python
+
+      # Resistance (columns) against each other
+      r = correlation_batch(sari)
+
+      # Resistance against prescriptions (matrix of coefficients)
+      r = correlation_batch(sari, usage)
+      r.spearman_corr.unstack()
+  """
+  # Format
+  x, lx = _format(x)
+  y, ly = (x, lx) if y is None else _format(y)
+  if x.shape[0] != y.shape[0]:
+    raise ValueError("""
+      The series in x and y must have the same length ({0} != {1})."""
+      .format(x.shape[0], y.shape[0]))
+
+  # Pearson
+  pcorr, n, cross = _pearson(x, y)
+
+  # Spearman (rank once)
+  rx = _ranks(x)
+  ry = rx if y is x else _ranks(y)
+  scorr = _pearson(rx, ry)[0]
+
+  # Spearman (rank again the pairs with different masks)
+  mx, my = ~np.isnan(x), ~np.isnan(y)
+  differ = (mx.sum(0)[:, None] > n) | (my.sum(0)[None, :] > n)
+  differ &= n >= min_periods
+  for i in np.flatnonzero(differ.any(axis=1)):
+    # Ranks of the common observations of x[:, i] and each y
+    m = mx[:, [i]] & my[:, differ[i]]
+    a = _ranks(np.where(m, x[:, [i]], np.nan))
+    b = _ranks(np.where(m, y[:, differ[i]], np.nan))
+    a, b = a - np.nanmean(a, axis=0), b - np.nanmean(b, axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+      scorr[i, differ[i]] = np.nansum(a * b, axis=0) / \
+        np.sqrt(np.nansum(a ** 2, axis=0) * np.nansum(b ** 2, axis=0))
+
+  # Pairs (upper triangle when y is None)
+  mask = np.ones(n.shape, dtype=bool)
+  i, j = np.nonzero(np.triu(mask, k=1) if y is x else mask)
+  keep = n >= min_periods
+
+  # Create results
+  r = pd.DataFrame({
+    'spearman_corr': np.where(keep, scorr, np.nan)[i, j],
+    'spearman_pval': np.where(keep, _pvalue(scorr, n), np.nan)[i, j],
+    'pearson_corr': np.where(keep, pcorr, np.nan)[i, j],
+    'pearson_pval': np.where(keep, _pvalue(pcorr, n), np.nan)[i, j],
+    'crosscorr': np.where(keep, cross, np.nan)[i, j],
+    'nobs': n[i, j].astype(int)},
+    index=pd.MultiIndex.from_arrays([lx[i], ly[j]], names=['x', 'y']))
+
+  # Return
+  return r
+
+
+def crosscorrelation_batch(x, y=None, maxlag=12, min_periods=3):
+  """Lagged (pearson) cross-correlation of many pairs of series.
+
+  The correlation at lag k is between x[t] and y[t+k] (positive lags
+  mean that x leads y) using the observations available in both series.
+  The lagged sums (counts, sums, sums of squares and products) of all the
+  pairs and lags are computed at once with the fast fourier transform of
+  the zero-filled series and masks.
+
+  Parameters
+  ----------
+  x : array-like or pd.DataFrame
+    The series (n observations, mx series).
+
+  y : array-like or pd.DataFrame, default=None
+    The series (n observations, my series). If None, the pairs of
+    different series in x (i < j).
+
+  maxlag : int
+    The maximum lag (the lags are -maxlag, ..., maxlag).
+
+  min_periods : int
+    The minimum number of observations at each lag.
+
+  Returns
+  -------
+  pd.DataFrame with the pair (x, y) as index and the lags as columns.
+  """
+  # Format
+  x, lx = _format(x)
+  y, ly = (x, lx) if y is None else _format(y)
+  n = x.shape[0]
+  if y.shape[0] != n:
+    raise ValueError("""
+      The series in x and y must have the same length ({0} != {1})."""
+      .format(n, y.shape[0]))
+  if not 0 <= maxlag < n:
+    raise ValueError("""
+      The maxlag {0} must be between 0 and the length of the series
+      minus one ({1}).""".format(maxlag, n - 1))
+
+  # Masks and centered zero-filled values
+  mx, my = ~np.isnan(x), ~np.isnan(y)
+  xc = np.where(mx, x - np.nanmean(np.where(mx, x, np.nan), axis=0), 0)
+  yc = np.where(my, y - np.nanmean(np.where(my, y, np.nan), axis=0), 0)
+  mx, my = mx.astype(float), my.astype(float)
+
+  # Lagged sums of all the pairs sum_t a[t] b[t+k] (lags, mx, my)
+  size = 2 * n
+  lags = np.arange(-maxlag, maxlag + 1)
+  fft = lambda a: np.fft.rfft(a, n=size, axis=0)
+  def lagged(a, b):
+    c = np.fft.irfft(np.conj(a)[:, :, None] * b[:, None, :], n=size, axis=0)
+    return c[lags % size]
+
+  # Transforms
+  fx, fxx, fmx = fft(xc), fft(xc ** 2), fft(mx)
+  fy, fyy, fmy = fft(yc), fft(yc ** 2), fft(my)
+
+  # Sums over the pairwise complete observations
+  m = np.rint(lagged(fmx, fmy))
+  sx, sy = lagged(fx, fmy), lagged(fmx, fy)
+  sxx, syy = lagged(fxx, fmy), lagged(fmx, fyy)
+  sxy = lagged(fx, fy)
+
+  # Correlation
+  with np.errstate(divide='ignore', invalid='ignore'):
+    corr = (m * sxy - sx * sy) / \
+      np.sqrt((m * sxx - sx ** 2) * (m * syy - sy ** 2))
+  corr = np.where(m >= min_periods, np.clip(corr, -1, 1), np.nan)
+
+  # Pairs (upper triangle when y is None)
+  mask = np.ones(corr.shape[1:], dtype=bool)
+  i, j = np.nonzero(np.triu(mask, k=1) if y is x else mask)
+
+  # Return
+  return pd.DataFrame(corr[:, i, j].T, columns=pd.Index(lags, name='lag'),
+    index=pd.MultiIndex.from_arrays([lx[i], ly[j]], names=['x', 'y']))
+
+
+
 class CorrelationWrapper(BaseWrapper):
 
   # --------------------------------------------------------------------------
@@ -134,7 +378,28 @@ if __name__ == '__main__':
   print("\n")
   print(correlation.as_summary())
 
-  correlation
+  # ----------------------------
+  # batch
+  # ----------------------------
+  # Libraries
+  import time
+
+  # Create many series (with missing values)
+  X = np.cumsum(np.random.randn(length, 200), axis=0)
+  X[np.random.rand(*X.shape) < 0.05] = np.nan
+
+  # Compute all the pairs
+  t0 = time.time()
+  r = correlation_batch(X)
+  print("\nCorrelation of %s pairs in %.3fs" % (r.shape[0], time.time() - t0))
+  print(r.head())
+
+  # Compute lagged cross-correlation
+  t0 = time.time()
+  c = crosscorrelation_batch(X[:, :50], maxlag=6)
+  print("\nCross-correlation of %s pairs in %.3fs" %
+        (c.shape[0], time.time() - t0))
+  print(c.head())
 
   # -----------------
   # Save and load
@@ -23,6 +23,136 @@ from pyamr.core.stats.wbase import BaseWrapper
 # ----------------------------------------------------------------------------
 #
 # ----------------------------------------------------------------------------
+# Series up to this length compute S with the (vectorized) sign matrix. The
+# longer series count the inversions with a merge sort (O(n log n)).
+_SMALL = 256
+
+
+def _ranks(x):
+  """Dense ranks and tied pairs of many series (columns).
+
+  Parameters
+  ----------
+  x : a matrix of data (observations, series)
+
+  Returns
+  -------
+  r : ranks (observations, series). Equal values have equal rank.
+  t : array (series,) with the number of tied pairs.
+  """
+  # Compute n.
+  n, m = x.shape
+
+  # Sort the columns and find the runs of equal values.
+  order = np.argsort(x, axis=0, kind='stable')
+  xs = np.take_along_axis(x, order, axis=0)
+  new = np.ones(xs.shape, dtype=bool)
+  new[1:] = xs[1:] != xs[:-1]
+
+  # Dense ranks (in the original order).
+  r = np.empty((n, m), dtype=np.int64)
+  np.put_along_axis(r, order, np.cumsum(new, axis=0) - 1, axis=0)
+
+  # Tied pairs (length of the runs).
+  c = np.bincount(np.cumsum(new.T.ravel()) - 1)
+  col = np.repeat(np.arange(m), n)[new.T.ravel()]
+  t = np.bincount(col, weights=c*(c-1)//2, minlength=m).astype(np.int64)
+
+  # Return
+  return r, t
+
+
+def _inversions_arrays(r):
+  """Number of pairs i < j with r[i] > r[j] of many series (columns).
+
+  The inversions are counted with a bottom-up merge sort where each level
+  (merge of consecutive sorted blocks) is vectorized for all the series.
+  The halves of each block are merged by sorting the block with the half
+  in the lowest bit of the key (left first when equal), so the elements
+  of the left half greater than each right element are those not yet
+  seen. The sort is stable (timsort for integer keys) which finds the
+  two sorted halves and merges them in linear time, so each level is
+  O(n) and the count O(n log n). The series are padded (with the largest
+  rank) to a power of two.
+
+  Parameters
+  ----------
+  r : a matrix of dense ranks (observations, series)
+
+  Returns
+  -------
+  array (series,)
+  """
+  # Compute n (and padded length).
+  n, m = r.shape
+  size = 1 << max(n - 1, 0).bit_length()
+
+  # The series as rows (padded).
+  r = np.hstack((r.T, np.full((m, size - n), n, dtype=np.int64)))
+
+  # Merge blocks of width w (each one already sorted).
+  count, w = np.zeros(m, dtype=np.int64), 1
+  while w < size:
+    # Keys of the blocks (rank and whether it is in the right half).
+    key = r.reshape(m, -1, 2*w)*2 + (np.arange(2*w) >= w)
+    key.sort(axis=2, kind='stable')
+    right = key & 1
+    # Number of elements in the left half greater than each right element.
+    seen = np.cumsum(1 - right, axis=2)
+    count += (right*(w - seen)).sum(axis=(1, 2))
+    # Merge.
+    r = (key >> 1).reshape(m, size)
+    w *= 2
+
+  # Return
+  return count
+
+
+def _inversions(x):
+  """Number of pairs i < j with x[i] > x[j].
+
+  Parameters
+  ----------
+  x : a vector of data (without nan)
+
+  Returns
+  -------
+  int
+  """
+  r = _ranks(np.asarray(x, dtype=float).reshape(-1, 1))[0]
+  return int(_inversions_arrays(r)[0])
+
+
+def _s(x):
+  """Mann-Kendall statistic S = sum_{k<j} sign(x[j] - x[k]).
+
+  Parameters
+  ----------
+  x : a vector of data
+
+  Returns
+  -------
+  S (nan if any difference is nan)
+  """
+  # Compute n.
+  n = len(x)
+
+  # Small series (sign matrix)
+  if n <= _SMALL:
+    d = np.sign(x[None, :] - x[:, None])
+    return d[np.triu_indices(n, 1)].sum()
+
+  # Differences are nan (nan or infinite values of the same sign).
+  if n > 1 and (np.isnan(x).any() or (np.isposinf(x).sum() > 1) or
+                (np.isneginf(x).sum() > 1)):
+    return np.nan
+
+  # Pairs (all), ties and inversions (decreasing)
+  r, t = _ranks(np.asarray(x, dtype=float).reshape(-1, 1))
+
+  # Return
+  return n*(n-1)//2 - int(t[0]) - 2*int(_inversions_arrays(r)[0])
+
 
 def kendall(x):  
   """   
@@ -41,26 +171,23 @@ def kendall(x):
   # Libraries.
   from scipy.stats import norm
 
+  # Format
+  x = np.asarray(x, dtype=float)
+
   # Compute n.
   n = len(x)
 
   # calculate S 
-  s = 0
-  for k in range(n-1):
-      for j in range(k+1,n):
-          s += np.sign(x[j] - x[k])
+  s = _s(x)
 
   # calculate the unique data
-  unique_x = np.unique(x)
+  unique_x, tp = np.unique(x, return_counts=True)
   g = len(unique_x)
 
   # calculate the var(s)
   if n == g: # there is no tie
       var_s = (n*(n-1)*(2*n+5))/18
   else: # there are some ties in data
-      tp = np.zeros(unique_x.shape)
-      for i in range(len(unique_x)):
-          tp[i] = sum(unique_x[i] == x)
       var_s = (n*(n-1)*(2*n+5) + np.sum(tp*(tp-1)*(2*tp+5)))/18
 
   # calculate z
@@ -77,6 +204,313 @@ def kendall(x):
   # Return
   return [p, z]
 
+def _s_arrays(x):
+  """Computes S of many series (columns) of the same length.
+
+  Parameters
+  ----------
+  x : a matrix of data (observations, series)
+
+  Returns
+  -------
+  s : array (series,). S is nan for the series with nan.
+  """
+  # Compute n.
+  n, m = x.shape
+
+  # calculate S (by lag for short series)
+  if n <= _SMALL:
+    s = np.zeros(m)
+    for d in range(1, n):
+      s += np.sign(x[d:] - x[:-d]).sum(axis=0)
+    return s
+
+  # Differences are nan (nan or infinite values of the same sign).
+  nan = np.isnan(x).any(axis=0) | (np.isposinf(x).sum(axis=0) > 1) | \
+        (np.isneginf(x).sum(axis=0) > 1)
+
+  # Pairs (all), ties and inversions of all the series (merge sort).
+  r, t = _ranks(x)
+  s = (n*(n-1)//2 - t - 2*_inversions_arrays(r)).astype(float)
+  s[nan] = np.nan
+
+  # Return
+  return s
+
+
+def _z(s, var_s):
+  """Normalized statistic (with continuity correction) as in kendall."""
+  with np.errstate(divide='ignore', invalid='ignore'):
+    z = np.where(s > 0, (s - 1)/np.sqrt(var_s),
+        np.where(s < 0, (s + 1)/np.sqrt(var_s), 0.))
+  z[np.isnan(s)] = np.nan
+  return z
+
+
+def _kendall_arrays(x):
+  """Computes S and var(S) of many series (columns) of the same length.
+
+  Parameters
+  ----------
+  x : a matrix of data (observations, series)
+
+  Returns
+  -------
+  s, var_s : arrays (series,). S is nan for the series with nan.
+  """
+  # Compute n.
+  n, m = x.shape
+
+  # calculate S
+  s = _s_arrays(x)
+
+  # calculate the ties (length of the runs of the sorted columns)
+  xs = np.sort(x, axis=0)
+  new = np.ones(xs.shape, dtype=bool)
+  new[1:] = xs[1:] != xs[:-1]
+  gid = np.cumsum(new.T.ravel()) - 1
+  tp = np.bincount(gid).astype(float)
+  col = np.repeat(np.arange(m), n)[new.T.ravel()]
+  ties = np.bincount(col, weights=tp*(tp-1)*(2*tp+5), minlength=m)
+
+  # calculate the var(s)
+  var_s = (n*(n-1)*(2*n+5) + ties)/18
+
+  # Return
+  return s, var_s
+
+
+def _seasonal_arrays(x, period=12):
+  """Seasonal Mann-Kendall of many series (columns) of the same length.
+
+  The S and var(S) are the sum of those of each season (e.g. the values
+  of each month for monthly series with period 12).
+
+  Parameters
+  ----------
+  x      : a matrix of data (observations, series)
+  period : the number of seasons
+
+  Returns
+  -------
+  s, z, p : arrays (series,)
+  """
+  # Libraries.
+  from scipy.stats import norm
+
+  # Add each season.
+  s, var_s = np.zeros(x.shape[1]), np.zeros(x.shape[1])
+  for j in range(min(period, x.shape[0])):
+    sj, vj = _kendall_arrays(x[j::period])
+    s, var_s = s + sj, var_s + vj
+
+  # Return
+  z = _z(s, var_s)
+  return s, z, 2*(1-norm.cdf(np.abs(z)))
+
+
+def _bootstrap_arrays(x, block=None, n_boot=1000, random_state=None):
+  """Block bootstrap Mann-Kendall of many series of the same length.
+
+  The replicates are created by concatenating blocks of consecutive
+  observations (moving block bootstrap), which breaks the long range
+  ordering (the trend under the null) while keeping the short range
+  dependence within the blocks. The same resampled indexes are
+  used for all the series and the S of all the replicates is computed
+  at once. The pvalue is the proportion of replicates with |S| greater
+  or equal than the observed |S| and z is normalized with the variance
+  of the replicates.
+
+  Parameters
+  ----------
+  x            : a matrix of data (observations, series)
+  block        : the length of the blocks (default n^(1/3))
+  n_boot       : the number of replicates
+  random_state : the seed (or np.random.RandomState)
+
+  Returns
+  -------
+  s, z, p : arrays (series,)
+  """
+  # Compute n.
+  n, m = x.shape
+
+  # Observed S
+  s = _s_arrays(x)
+
+  # Random state
+  if not isinstance(random_state, np.random.RandomState):
+    random_state = np.random.RandomState(random_state)
+
+  # Resampled indexes (replicates, n)
+  block = max(1, int(round(n**(1/3)))) if block is None else min(block, n)
+  starts = random_state.randint(0, n - block + 1,
+                                size=(n_boot, int(np.ceil(n/block))))
+  idx = (starts[:, :, None] + np.arange(block)).reshape(n_boot, -1)[:, :n]
+
+  # S of the replicates (in chunks of series to bound memory)
+  sb = np.empty((n_boot, m))
+  step = max(1, 2**22 // (n_boot*max(n, 1)))
+  for i in range(0, m, step):
+    xb = x[:, i:i+step][idx]
+    c = xb.shape[2]
+    sb[:, i:i+c] = _s_arrays(xb.transpose(1, 0, 2).reshape(n, -1)) \
+      .reshape(n_boot, c)
+
+  # calculate z and the p_value
+  z = _z(s, sb.var(axis=0, ddof=1))
+  p = (1 + (np.abs(sb) >= np.abs(s)).sum(axis=0))/(n_boot + 1)
+  p[np.isnan(s)] = np.nan
+
+  # Return
+  return s, z, p
+
+
+def _result(z, p):
+  """Returns [p, z] as kendall ([None, None] if nan)."""
+  if np.isnan(z[0]): return [None, None]
+  return [p[0], z[0]]
+
+
+def seasonal_kendall(x, period=12):
+  """
+  Seasonal Mann-Kendall test (Hirsch et al. 1982).
+
+  Parameters
+  ----------
+  x      : a vector of data
+  period : the number of seasons (12 default for monthly series)
+
+  Returns
+  -------
+  p     : p value of the significance test
+  z     : normalized test statistics
+  """
+  s, z, p = _seasonal_arrays(np.asarray(x, dtype=float).reshape(-1, 1),
+                             period=period)
+  return _result(z, p)
+
+
+def bootstrap_kendall(x, block=None, n_boot=1000, random_state=None):
+  """
+  Block bootstrap Mann-Kendall test (for autocorrelated series).
+
+  Parameters
+  ----------
+  x            : a vector of data
+  block        : the length of the blocks (default n^(1/3))
+  n_boot       : the number of bootstrap replicates
+  random_state : the seed (or np.random.RandomState)
+
+  Returns
+  -------
+  p     : p value of the significance test
+  z     : normalized test statistics
+  """
+  s, z, p = _bootstrap_arrays(np.asarray(x, dtype=float).reshape(-1, 1),
+    block=block, n_boot=n_boot, random_state=random_state)
+  return _result(z, p)
+
+
+def _test_arrays(x, method='standard', **kwargs):
+  """Computes s, z and p of many series with the method."""
+  # Libraries.
+  from scipy.stats import norm
+
+  if method == 'standard':
+    s, var_s = _kendall_arrays(x)
+    z = _z(s, var_s)
+    return s, z, 2*(1-norm.cdf(np.abs(z)))
+  if method == 'seasonal':
+    return _seasonal_arrays(x, **kwargs)
+  if method == 'bootstrap':
+    return _bootstrap_arrays(x, **kwargs)
+  raise ValueError("""
+      The method <{0}> is not supported. The options are standard,
+      seasonal or bootstrap.""".format(method))
+
+
+def kendall_batch(x, alpha=0.05, by=None, value=None, correction='fdr_bh',
+                  method='standard', **kwargs):
+  """Mann-Kendall test of many series at once.
+
+  The statistics of the series with the same length are computed with
+  vectorized operations across series. As in kendall, the series with
+  nan values have no pvalue nor z (nan). The pvalues are adjusted for
+  multiple testing (e.g. Benjamini-Hochberg) and the trend exists when
+  the adjusted pvalue is lower than alpha.
+
+  Parameters
+  ----------
+  x          : a matrix (observations, series), a DataFrame with the
+               series as columns or a long DataFrame (see by and value).
+  alpha      : significance level (0.05 default)
+  by         : the columns identifying each series in a long DataFrame.
+               The rows of each series must be in time order.
+  value      : the column with the values in a long DataFrame.
+  correction : the multiple testing correction (see statsmodels
+               multipletests, e.g. fdr_bh, bonferroni or holm). If None,
+               the pvalues are not adjusted.
+  method     : the test (standard, seasonal or bootstrap).
+  kwargs     : the arguments of the method (e.g. period for seasonal or
+               block, n_boot and random_state for bootstrap).
+
+  Returns
+  -------
+  pd.DataFrame with one row per series and the columns s, z, pvalue,
+  pvalue_adj, trend_existence and trend_direction.
+  """
+  # Libraries.
+  from statsmodels.stats.multitest import multipletests
+
+  # Create series (list of arrays) and index
+  if by is not None:
+    groups = x.groupby(by, sort=True)[value]
+    index = pd.Index(list(groups.groups.keys()))
+    if isinstance(by, (list, tuple)) and len(by) > 1:
+      index = pd.MultiIndex.from_tuples(index, names=by)
+    else:
+      index = index.rename(by[0] if isinstance(by, (list, tuple)) else by)
+    series = [np.asarray(g, dtype=float) for _, g in groups]
+  else:
+    index = x.columns if isinstance(x, pd.DataFrame) else None
+    x = np.asarray(x, dtype=float)
+    x = x.reshape(-1, 1) if x.ndim == 1 else x
+    index = pd.RangeIndex(x.shape[1]) if index is None else index
+    series = None
+
+  # Compute S, z and p_value (grouped by length)
+  if series is None:
+    s, z, p = _test_arrays(x, method=method, **kwargs)
+  else:
+    s, z, p = [np.zeros(len(series)) for _ in range(3)]
+    lengths = np.array([len(e) for e in series])
+    for n in np.unique(lengths):
+      idx = np.flatnonzero(lengths == n)
+      s[idx], z[idx], p[idx] = _test_arrays(
+        np.column_stack([series[i] for i in idx]).reshape(n, idx.size),
+        method=method, **kwargs)
+
+  # Adjust the p_value (only series with p_value)
+  p_adj = p.copy()
+  valid = ~np.isnan(p)
+  if correction is not None and valid.any():
+    p_adj[valid] = multipletests(p[valid], alpha=alpha,
+                                 method=correction)[1]
+
+  # Trends
+  h = p_adj < alpha
+  direction = np.where(h & (z < 0), 'decreasing',
+              np.where(h & (z > 0), 'increasing', 'no trend')).astype(object)
+  exists = h.astype(object)
+  exists[~valid], direction[~valid] = None, None
+
+  # Return
+  return pd.DataFrame({'s': s, 'z': z, 'pvalue': p, 'pvalue_adj': p_adj,
+                       'trend_existence': exists,
+                       'trend_direction': direction}, index=index)
+
+
 class KendallWrapper(BaseWrapper):
   """
   """
@@ -1,8 +1,8 @@
 ##############################################################################
 # Author: Bernard Hernandez
-# Filename: adfuller.py
+# Filename: kpss.py
 #
-# Description : This file contains a wrapper for the adfuller module.
+# Description : This file contains a wrapper for the kpss module.
 ###############################################################################
 # https://mkaz.blog/code/python-string-format-cookbook/
 # Future
@@ -17,6 +17,139 @@ import pandas as pd
 from pyamr.core.stats.wbase import BaseWrapper
 
 
+# -----------------------------------------------------------------------------
+#                              vectorized kpss
+# -----------------------------------------------------------------------------
+# Critical values (Kwiatkowski et al. 1992, table 1) as in statsmodels
+_PVALUES = [0.10, 0.05, 0.025, 0.01]
+_CRITICAL = {'c': [0.347, 0.463, 0.574, 0.739],
+             'ct': [0.119, 0.146, 0.176, 0.216]}
+
+
+def _residuals(x, regression):
+    """Residuals of the level (c) or trend (ct) regression (n, m)."""
+    resid = x - x.mean(axis=0)
+    if regression == 'ct':
+        t = np.arange(1, x.shape[0] + 1, dtype=float)
+        t = t - t.mean()
+        beta = t @ resid / (t @ t)
+        resid = resid - t[:, None] * beta
+    return resid
+
+
+def _autocovariances(resid, maxlag):
+    """Sums of the lagged products of the residuals (maxlag+1, m).
+
+    The sums r[i:]r[:n-i] are computed for all the lags at once with the
+    fast fourier transform of the (zero padded) residuals.
+    """
+    n = resid.shape[0]
+    f = np.fft.rfft(resid, n=2 * n, axis=0)
+    return np.fft.irfft(f * np.conj(f), n=2 * n, axis=0)[:maxlag + 1]
+
+
+def kpss_batch(x, regression='c', nlags='auto', alpha=0.05):
+    """KPSS test of many series of the same length.
+
+    The residuals of the level (or trend) regression, their partial sums
+    and the Newey-West (Bartlett kernel) long-run variance are computed for
+    all the series at once. It follows the same steps as statsmodels kpss
+    (including the automatic number of lags of Hobijn et al. 1998), so the
+    statistics, number of lags and interpolated pvalues are the same within
+    tolerance. The series with nan values have nan results.
+
+    Parameters
+    ----------
+    x : array-like or pd.DataFrame
+      The series (n observations, m series).
+
+    regression : string, options = {c, ct}
+      The null hypothesis is that the series is level (c) or trend (ct)
+      stationary.
+
+    nlags : string or int, options = {auto, legacy}
+      The number of lags of the long-run variance. The option auto uses
+      the data-dependent method of Hobijn et al. (1998) and legacy uses
+      int(ceil(12 * (n / 100)^{1/4})).
+
+    alpha : float
+      The significance level to decide whether the series is stationary
+      (pvalue > alpha).
+
+    Returns
+    -------
+    pd.DataFrame with one row per series and the same columns as the
+    KPSSWrapper results (statistic, pvalue, nlags, stationary and critical
+    values).
+    """
+    # Check regression
+    if regression not in _CRITICAL:
+        raise ValueError("""
+            The regression <{0}> is not supported. The options are c (level
+            stationary) or ct (trend stationary).""".format(regression))
+
+    # Format
+    index = x.columns if isinstance(x, pd.DataFrame) else None
+    x = np.asarray(x, dtype=float)
+    x = x.reshape(-1, 1) if x.ndim == 1 else x
+    n, m = x.shape
+    index = pd.RangeIndex(m) if index is None else index
+
+    # Series without nan
+    valid = ~np.isnan(x).any(axis=0)
+    resid = _residuals(x[:, valid], regression)
+
+    # Number of lags
+    if nlags == 'legacy':
+        lags = np.full(resid.shape[1],
+            min(int(np.ceil(12.0 * np.power(n / 100.0, 1 / 4.0))), n - 1))
+    elif nlags == 'auto':
+        covlags = int(np.power(n, 2.0 / 9.0))
+        gamma = _autocovariances(resid, covlags) / (n / 2.0)
+        gamma[0] /= 2.0
+        i = np.arange(covlags + 1)[:, None]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            s_hat = (i * gamma).sum(axis=0) / gamma.sum(axis=0)
+            lags = 1.1447 * np.power(s_hat * s_hat, 1.0 / 3.0) \
+                * np.power(n, 1.0 / 3.0)
+        lags = np.minimum(np.nan_to_num(lags).astype(int), n - 1)
+    elif isinstance(nlags, str) or not 0 <= int(nlags) < n:
+        raise ValueError("""
+            The nlags <{0}> must be auto, legacy or an integer between 0 and
+            the number of observations minus one ({1}).""".format(nlags, n - 1))
+    else:
+        lags = np.full(resid.shape[1], int(nlags))
+
+    # Long-run variance (Bartlett kernel)
+    maxlag = int(lags.max()) if lags.size else 0
+    gamma = _autocovariances(resid, maxlag)
+    i = np.arange(1, maxlag + 1)[:, None]
+    w = np.where(i <= lags, 1.0 - i / (lags + 1.0), 0.0)
+    s_hat = (gamma[0] + 2 * (w * gamma[1:]).sum(axis=0)) / n
+
+    # Statistic (eq. 11, p. 165)
+    eta = (np.cumsum(resid, axis=0) ** 2).sum(axis=0) / (n ** 2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        statistic = eta / s_hat
+
+    # Create results
+    crit = _CRITICAL[regression]
+    r = pd.DataFrame(index=index, columns=['statistic', 'pvalue', 'nlags',
+        'stationary', 'criticalvalue_10%', 'criticalvalue_5%',
+        'criticalvalue_2.5%', 'criticalvalue_1%'], dtype=float)
+    r.loc[valid, 'statistic'] = statistic
+    r.loc[valid, 'pvalue'] = np.where(np.isnan(statistic), np.nan,
+        np.interp(statistic, crit, _PVALUES))
+    r.loc[valid, 'nlags'] = lags
+    r['stationary'] = (r.pvalue > alpha).astype(object)
+    r.loc[r.pvalue.isna(), 'stationary'] = None
+    r.loc[:, ['criticalvalue_10%', 'criticalvalue_5%',
+              'criticalvalue_2.5%', 'criticalvalue_1%']] = crit
+
+    # Return
+    return r
+
+
 class KPSSWrapper(BaseWrapper):
     """The KPSS wrapper.
 
@@ -36,10 +169,192 @@ class KPSSWrapper(BaseWrapper):
 
     Notes
     -----
-    H0: The series has unit root => Trend Stationary.
-    H1: The series has no unit root => No Trend Stationary.
+    H0: The series is level (c) or trend (ct) stationary.
+    H1: The series has a unit root => Non-stationary.
 
     If p-value > alpha: Failed to reject H0
     If p-value <= alpha: Reject H0
+
+    .. note:: Use kpss_batch to compute the test for many series of the
+              same length at once (e.g. all the SARI time series).
     """
-    pass
\ No newline at end of file
+
+    def _identifier(self):
+        """Description of the model"""
+        return "%s(%s)" % (self._name, self._config.get('regression', 'c'))
+
+    # --------------------------------------------------------------------------
+    #                             new methods
+    # --------------------------------------------------------------------------
+    def is_stationary(self, alpha=0.05):
+        """This method returns a boolean with the stationarity outcome.
+
+        Since the null hypothesis is stationarity, the series is considered
+        stationary when the null hypothesis cannot be rejected.
+
+        Parameters
+        ----------
+        alpha : float
+          The statistical significance
+
+        Returns
+        -------
+        boolean
+        """
+        return True if self._result['pvalue'] > alpha else False
+
+    def stationarity(self, alpha=0.05):
+        """This method returns the stationarity outcome.
+
+        Parameters
+        ----------
+        alpha : float
+          The stastistical significance
+
+        Returns
+        -------
+        string
+        """
+        return 'stationary' if self.is_stationary(alpha) else 'non-stationary'
+
+    # --------------------------------------------------------------------------
+    #                          overriden methods
+    # --------------------------------------------------------------------------
+    def evaluate(self, alpha=0.05, **kwargs):
+        """Evaluates the model.
+
+        Parameters
+        ----------
+        alpha : float
+          The statistical significance of the stationary attribute (use
+          is_stationary for other values).
+
+        Returns
+        -------
+        dict-like
+        """
+        # Create dictionary
+        d = {}
+
+        # Basic statistics
+        d['statistic'] = self._raw[0]
+        d['pvalue'] = self._raw[1]
+        d['nlags'] = self._raw[2]
+        d['stationary'] = self._raw[1] > alpha
+
+        # Format critical value array.
+        for key, value in self._raw[3].items():
+            d['criticalvalue_%s' % key] = value
+
+        # Return
+        return d
+
+    def as_summary(self, alpha=0.05, verbose=1, **kwargs):
+        """This method creates the summary to display.
+        """
+        # Symbols
+        alpha_symbol = '\u03B1'
+
+        # Template start
+        summary = '      kpss test stationarity ({r})     \n'
+        summary += "=======================================\n"
+        summary += "statistic:           {statistic:>18.3f}\n"
+        summary += "pvalue:              {pvalue:>18.5f}   \n"
+        summary += "nlags:               {nlags:>18.0f}    \n"
+        summary += "stationarity ({s}={alpha}): {stationarity:>16s}\n"
+
+        if verbose > 5:
+            # Add critical values
+            summary += "---------------------------------------\n"
+            summary += "critical value (10%): {cc10:>17.5f}\n"
+            summary += "critical value (5%):  {cc5:>17.5f} \n"
+            summary += "critical value (2.5%): {cc25:>16.5f}\n"
+            summary += "critical value (1%):  {cc1:>17.5f} \n"
+
+        if verbose > 7:
+            # Add hypothesis description
+            summary += "---------------------------------------\n"
+            summary += "H0: {h0:>34s}\n"
+            summary += "H1:                          Unit root\n"
+            summary += "pvalue <= {s}:                  Reject H0\n"
+
+        # Template end
+        summary += "======================================="
+
+        # Null hypothesis (level or trend stationarity)
+        regression = self._config.get('regression', 'c')
+        h0 = 'Trend stationary' if regression == 'ct' else 'Level stationary'
+
+        # Format
+        summary = summary.format(r=regression, h0=h0,
+            statistic=self.statistic, pvalue=self.pvalue,
+            nlags=self.nlags, alpha=alpha,
+            stationarity=self.stationarity(alpha),
+            cc10=self._result['criticalvalue_10%'],
+            cc5=self._result['criticalvalue_5%'],
+            cc25=self._result['criticalvalue_2.5%'],
+            cc1=self._result['criticalvalue_1%'],
+            s=alpha_symbol)
+
+        # Return
+        return summary
+
+
+
+if __name__ == '__main__':
+
+    # Libraries
+    import time
+    import warnings
+
+    # Import specific
+    from statsmodels.tsa.stattools import kpss
+
+    # ----------------------------
+    # create data
+    # ----------------------------
+    # Constants
+    length = 100
+    offset = 100
+    slope = 10
+
+    # Create time-series.
+    x = np.arange(length)
+    y = np.random.rand(length) * slope + offset
+
+    # ----------------------------
+    # create kpss object
+    # ----------------------------
+    # Create object
+    kps = KPSSWrapper(estimator=kpss).fit(x=y, regression='ct')
+
+    # Print series and summary.
+    print("\n")
+    print(kps.as_series())
+    print("\n")
+    print(kps.as_summary(verbose=10))
+
+    # ----------------------------
+    # batch
+    # ----------------------------
+    # Create many series (random walks and white noise)
+    X = np.cumsum(np.random.randn(length, 2000), axis=0)
+    X[:, ::2] = np.random.randn(length, 1000)
+
+    # Compute with statsmodels
+    t0 = time.time()
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        r1 = [kpss(X[:, i], regression='c', nlags='auto')[0]
+              for i in range(X.shape[1])]
+    t1 = time.time() - t0
+
+    # Compute batch
+    t0 = time.time()
+    r2 = kpss_batch(X, regression='c', nlags='auto')
+    t2 = time.time() - t0
+
+    # Show
+    print("\nstatsmodels: %.3fs | batch: %.3fs | equal: %s" %
+          (t1, t2, np.allclose(r1, r2.statistic)))
+    print(r2.head())
@@ -12,7 +12,10 @@
 from __future__ import division
 
 # Libraries
+import os
 import sys
+import logging
+import warnings
 import numpy as np
 import pandas as pd
 
@@ -20,6 +23,12 @@ import pandas as pd
 from pyamr.core.stats.wbase import BaseWrapper
 from pyamr.core.stats.wbase import fargs
 
+# Logger
+logger = logging.getLogger(__name__)
+
+# The tests available (names as test-regression).
+TESTS = ['adfuller-ct', 'adfuller-c', 'kpss-ct', 'kpss-c', 'rur']
+
 
 class StationarityWrapper(BaseWrapper):
     """This method....
@@ -56,46 +65,42 @@ class StationarityWrapper(BaseWrapper):
         d = {}
 
         # Basic statistics (adfuller).
-        d['adf_ct_statistic'] = self._raw['adfuller-ct'][0]
-        d['adf_ct_pvalue'] = self._raw['adfuller-ct'][1]
-        d['adf_ct_nlags'] = self._raw['adfuller-ct'][2]
-        d['adf_ct_nobs'] = self._raw['adfuller-ct'][3]
-        for key, value in self._raw['adfuller-ct'][4].items():
-            d['adf_ct_criticalvalue_%s' % key] = value
-
-        # Basic statistics (adfuller).
-        d['adf_c_statistic'] = self._raw['adfuller-c'][0]
-        d['adf_c_pvalue'] = self._raw['adfuller-c'][1]
-        d['adf_c_nlags'] = self._raw['adfuller-c'][2]
-        d['adf_c_nobs'] = self._raw['adfuller-c'][3]
-        for key, value in self._raw['adfuller-c'][4].items():
-            d['adf_c_criticalvalue_%s' % key] = value
-
-        # Basic statistics (kpss).
-        d['kpss_ct_statistic'] = self._raw['kpss-ct'][0]
-        d['kpss_ct_pvalue'] = self._raw['kpss-ct'][1]
-        d['kpss_ct_nlags'] = self._raw['kpss-ct'][2]
-        for key, value in self._raw['kpss-ct'][3].items():
-            d['kpss_ct_criticalvalue_%s' % key] = value
+        for r in ['ct', 'c']:
+            if 'adfuller-%s' % r not in self._raw:
+                continue
+            adf = self._raw['adfuller-%s' % r]
+            d['adf_%s_statistic' % r] = adf[0]
+            d['adf_%s_pvalue' % r] = adf[1]
+            d['adf_%s_nlags' % r] = adf[2]
+            d['adf_%s_nobs' % r] = adf[3]
+            for key, value in adf[4].items():
+                d['adf_%s_criticalvalue_%s' % (r, key)] = value
 
         # Basic statistics (kpss).
-        d['kpss_c_statistic'] = self._raw['kpss-c'][0]
-        d['kpss_c_pvalue'] = self._raw['kpss-c'][1]
-        d['kpss_c_nlags'] = self._raw['kpss-c'][2]
-        for key, value in self._raw['kpss-c'][3].items():
-            d['kpss_c_criticalvalue_%s' % key] = value
+        for r in ['ct', 'c']:
+            if 'kpss-%s' % r not in self._raw:
+                continue
+            kps = self._raw['kpss-%s' % r]
+            d['kpss_%s_statistic' % r] = kps[0]
+            d['kpss_%s_pvalue' % r] = kps[1]
+            d['kpss_%s_nlags' % r] = kps[2]
+            for key, value in kps[3].items():
+                d['kpss_%s_criticalvalue_%s' % (r, key)] = value
 
         # Extra parameters.
-        d['root_ct_stationary'] = d['adf_ct_pvalue'] <= alpha
-        d['root_c_stationary'] = d['adf_c_pvalue'] <= alpha
-        d['trend_ct_stationary'] = d['kpss_ct_pvalue'] > alpha
-        d['trend_c_stationary'] = d['kpss_c_pvalue'] > alpha
+        for r in ['ct', 'c']:
+            if 'adf_%s_pvalue' % r in d:
+                d['root_%s_stationary' % r] = d['adf_%s_pvalue' % r] <= alpha
+        for r in ['ct', 'c']:
+            if 'kpss_%s_pvalue' % r in d:
+                d['trend_%s_stationary' % r] = d['kpss_%s_pvalue' % r] > alpha
 
         # Unit root (Range unit root test)
-        d['rur_statistic'] = self._raw['rur'][0]
-        d['rur_pvalue'] = self._raw['rur'][1]
-        for key, value in self._raw['rur'][2].items():
-            d['rur_criticalvalue_%s' % key] = value
+        if 'rur' in self._raw:
+            d['rur_statistic'] = self._raw['rur'][0]
+            d['rur_pvalue'] = self._raw['rur'][1]
+            for key, value in self._raw['rur'][2].items():
+                d['rur_criticalvalue_%s' % key] = value
 
         # Return
         return d
@@ -108,24 +113,29 @@ class StationarityWrapper(BaseWrapper):
         summary += '==================================\n'
         summary += '          root           trend    \n'
         summary += '----------------------------------\n'
-        summary += 'c   {0!s:>5s} ({1:.3f})   {2!s:>5s} ({3:.3f})\n'
-        summary += 'ct  {4!s:>5s} ({5:.3f})   {6!s:>5s} ({7:.3f})\n'
-        summary += '=================================='
 
-        # Format
-        summary = summary.format(self.root_c_stationary,
-                                 self.adf_c_pvalue,
-                                 self.trend_c_stationary,
-                                 self.kpss_c_pvalue,
-                                 self.root_ct_stationary,
-                                 self.adf_ct_pvalue,
-                                 self.trend_ct_stationary,
-                                 self.kpss_ct_pvalue)
+        # Add the regressions fitted (only the tests computed)
+        for r in ['c', 'ct']:
+            cells = []
+            for test, name in [('root', 'adf'), ('trend', 'kpss')]:
+                if '%s_%s_pvalue' % (name, r) not in self._result:
+                    cells.append(None)
+                    continue
+                cells.append('{0!s:>5s} ({1:.3f})'.format(
+                    self._result['%s_%s_stationary' % (test, r)],
+                    self._result['%s_%s_pvalue' % (name, r)]))
+            if not any(cells):
+                continue
+            cells = [c if c else '{0:>13s}'.format('-') for c in cells]
+            summary += '{0:<3s} {1}   {2}\n'.format(r, *cells)
+
+        # Close
+        summary += '=================================='
 
         # Return
         return summary
 
-    def fit(self, x, adf_kwargs={}, kpss_kwargs={}, **kwargs):
+    def fit(self, x, adf_kwargs={}, kpss_kwargs={}, tests=None, **kwargs):
         """This method studies the stationarity of a given time-series.
 
         The parameters which can be passed to the adfuller and kpss methods
@@ -148,6 +158,9 @@ class StationarityWrapper(BaseWrapper):
         kpss_kwargs : dict-like
           The parameters to apss to the kpss function
 
+        tests : list, default=None
+          The tests to compute (adfuller-ct, adfuller-c, kpss-ct, kpss-c
+          and/or rur). If None, all of them.
 
         Returns
         -------
@@ -158,14 +171,24 @@ class StationarityWrapper(BaseWrapper):
         from statsmodels.tsa.stattools import kpss
         from statsmodels.tsa.stattools import range_unit_root_test
 
+        # Check tests
+        tests = TESTS if tests is None else list(tests)
+        unknown = set(tests).difference(TESTS)
+        if unknown:
+            raise ValueError("""
+                The tests {0} are not supported. The options are
+                {1}.""".format(sorted(unknown), TESTS))
+
         # Empty the class
         self._empty()
 
         # In this fit a number of scenarios are going to be tested. The
         # term that varies within scenarios is regression, as such, if
-        # it is passed it will be deleted.
-        adf_kwargs.pop('regression', None)
-        kpss_kwargs.pop('regression', None)
+        # it is passed it will be ignored.
+        adf_kwargs = {k: v for k, v in adf_kwargs.items()
+                      if k != 'regression'}
+        kpss_kwargs = {k: v for k, v in kpss_kwargs.items()
+                       if k != 'regression'}
 
         # Update the configuration
         self._config.update({'adf_%s' % k: v for k, v in adf_kwargs.items()})
@@ -175,13 +198,17 @@ class StationarityWrapper(BaseWrapper):
         self._raw = {'x': x}
 
         # Compute adfuller and kpss
-        self._raw['adfuller-ct'] = adfuller(x=x, regression='ct', **adf_kwargs)
-        self._raw['adfuller-c'] = adfuller(x=x, regression='c', **adf_kwargs)
-        self._raw['kpss-ct'] = kpss(x=x, regression='ct', **kpss_kwargs)
-        self._raw['kpss-c'] = kpss(x=x, regression='c', **kpss_kwargs)
-        self._raw['rur'] = range_unit_root_test(x=x)
-
-        print(self._raw['rur'])
+        for name in tests:
+            test, regression = (name.split('-') + [None])[:2]
+            if test == 'adfuller':
+                self._raw[name] = adfuller(x=x, regression=regression,
+                                           **adf_kwargs)
+            elif test == 'kpss':
+                self._raw[name] = kpss(x=x, regression=regression,
+                                       **kpss_kwargs)
+            elif test == 'rur':
+                self._raw[name] = range_unit_root_test(x=x)
+            logger.debug("%s: %s", name, self._raw[name])
 
         # Evaluate the model
         if self.evaluate:
@@ -191,6 +218,110 @@ class StationarityWrapper(BaseWrapper):
         return self
 
 
+def _stationarity(x, kwargs):
+    """Computes the stationarity tests of a series (see batch).
+
+    Returns
+    -------
+    dict-like with the results and error (None if it did not fail).
+    """
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            return StationarityWrapper().fit(x=x, **kwargs)._result, None
+    except Exception as e:
+        return {}, str(e)
+
+
+def _gather(outputs, names, callback=None):
+    """Gathers the results of the series (and reports progress).
+
+    Returns
+    -------
+    pd.DataFrame with one row per series (see stationarity_batch).
+    """
+    results = []
+    for i, (result, error) in enumerate(outputs):
+        if error is None:
+            logger.info("%d/%d. %s", i + 1, len(names), names[i])
+        else:
+            logger.warning("%d/%d. %s ... failed: %s",
+                           i + 1, len(names), names[i], error)
+        if callback is not None:
+            callback(i, len(names), names[i], error)
+        results.append(result)
+    return pd.DataFrame(results, index=pd.Index(names))
+
+
+def stationarity_batch(series, tests=None, adf_kwargs={}, kpss_kwargs={},
+                       n_jobs=None, callback=None):
+    """Computes the stationarity tests of many series.
+
+    The series are independent so they are computed in a process pool
+    (n_jobs). The progress is reported to the logger of this module
+    (pyamr.core.stats.stationarity) and, optionally, to a callback.
+
+    Parameters
+    ----------
+    series : array-like, pd.DataFrame or dict-like
+      The series as the columns of a matrix or DataFrame or as a
+      dictionary with the name and the values (different lengths).
+
+    tests : list, default=None
+      The tests to compute (see StationarityWrapper.fit).
+
+    adf_kwargs, kpss_kwargs : dict-like
+      The parameters to pass to the adfuller and kpss functions.
+
+    n_jobs : int, default=None
+      The number of processes. If None or 1 it is serial. If -1, all
+      the processors are used.
+
+    callback : callable, default=None
+      The function called after each series with the arguments (index,
+      number of series, name and error).
+
+    Returns
+    -------
+    pd.DataFrame with one row per series and the results as columns. The
+    series that failed have NaN values.
+    """
+    # Format the series
+    if isinstance(series, dict):
+        names, values = list(series.keys()), list(series.values())
+    elif isinstance(series, pd.DataFrame):
+        names = list(series.columns)
+        values = [series[c].to_numpy() for c in names]
+    else:
+        series = np.asarray(series)
+        series = series.reshape(-1, 1) if series.ndim == 1 else series
+        names = list(range(series.shape[1]))
+        values = [series[:, i] for i in names]
+
+    # Arguments
+    kwargs = {'tests': tests, 'adf_kwargs': adf_kwargs,
+              'kpss_kwargs': kpss_kwargs}
+
+    # Number of jobs
+    if n_jobs is not None and n_jobs < 0:
+        n_jobs = os.cpu_count()
+
+    # Compute
+    if n_jobs is None or n_jobs == 1:
+        outputs = (_stationarity(v, kwargs) for v in values)
+    else:
+        from concurrent import futures
+        with futures.ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            outputs = pool.map(_stationarity, values,
+                [kwargs] * len(values),
+                chunksize=max(1, len(values) // (n_jobs * 4)))
+            return _gather(outputs, names, callback)
+
+    # Return
+    return _gather(outputs, names, callback)
+
+
+
 if __name__ == '__main__':
 
     # Libraries
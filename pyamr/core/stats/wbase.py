@@ -8,18 +8,26 @@
 # TODO: Move it to a module.
 ###############################################################################
 # Libraries
+import os
 import math
+import signal
 import pickle
 import inspect
 import warnings
+import threading
 import numpy as np
 import pandas as pd
 # import cPickle as pickle # not needed in python 3.x
 
 # Specific
 from copy import deepcopy
+from types import SimpleNamespace
+from contextlib import contextmanager
 from sklearn.model_selection import ParameterGrid
 
+# Import pyamr
+from pyamr.core.profiling import record
+
 
 # -----------------------------------------------------------------------------
 #                              helper methods
@@ -74,6 +82,283 @@ def getargspecdict(instance, funcname):
         return {}
 
 
+# -----------------------------------------------------------------------------
+#                             grid search helpers
+# -----------------------------------------------------------------------------
+# Template wrapper and shared parameters of each worker process. These
+# are sent once to each worker (see _init_worker) instead of once per
+# candidate.
+_WORKER = {}
+
+
+@contextmanager
+def _time_limit(seconds):
+    """Raises TimeoutError if the block takes longer than seconds.
+
+    .. note:: It relies on SIGALRM so it is only enforced on POSIX systems
+              and in the main thread of a process (e.g. serial search or
+              process pool). Otherwise, the block runs without limit.
+    """
+    # No limit
+    if not seconds or not hasattr(signal, 'SIGALRM') or \
+            threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    def handler(signum, frame):
+        raise TimeoutError("exceeded timeout of %ss" % seconds)
+
+    # Set alarm
+    previous = signal.signal(signal.SIGALRM, handler)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def _init_worker(template, shared):
+    """Stores the template wrapper and shared parameters in the worker."""
+    _WORKER['template'] = template
+    _WORKER['shared'] = shared
+
+
+def _fit_chunk(chunk, timeout=None, template=None, shared=None):
+    """Fits a chunk of candidates.
+
+    Parameters
+    ----------
+    chunk : list
+      The list of tuples (index, params) to fit.
+
+    timeout : float
+      The maximum number of seconds for each candidate.
+
+    template : wrapper
+      The wrapper which is copied for each candidate. If None, the one
+      stored in the worker is used.
+
+    shared : dict-like
+      The parameters common to all the candidates. If None, the ones
+      stored in the worker are used.
+
+    Returns
+    -------
+    list of tuples (index, wrapper, error)
+    """
+    # Use the worker configuration
+    worker = template is None
+    if worker:
+        template = _WORKER['template']
+        shared = _WORKER['shared']
+
+    # Loop
+    results = []
+    for i, params in chunk:
+        try:
+            # Deep copy the object (recording the time) and fit
+            timer = SimpleNamespace(profiling=getattr(template, 'profiling',
+                                                      False))
+            with record(timer, 'deepcopy'):
+                copied = deepcopy(template)
+            copied.__dict__.pop('_timings', None)
+            if '_timings' in timer.__dict__:
+                copied._timings = timer._timings
+            with _time_limit(timeout):
+                copied.fit(**dict(shared, **params))
+            # Do not send the shared parameters back
+            if worker:
+                copied._config.update({k: None for k, v in shared.items()
+                                       if copied._config.get(k) is v})
+            results.append((i, copied, None))
+        except Exception as e:
+            results.append((i, None, "%s" % e))
+
+    # Return
+    return results
+
+
+def _split_grid(grid_params):
+    """Splits the grid in shared (single value) and varying parameters.
+
+    Parameters which only have one value (e.g. endog, exog) are shared by
+    all the candidates, so there is no need to send them with each one.
+    If a list of grids is given, only the parameters with the same single
+    value (same object) in all of them are shared.
+
+    Returns
+    -------
+    shared : dict-like
+      The parameters with only one value.
+
+    parameters : ParameterGrid
+      The grid with the remaining parameters.
+    """
+    # Format
+    grids = [grid_params] if isinstance(grid_params, dict) else grid_params
+
+    # Find single values
+    single = []
+    for grid in grids:
+        single.append({k: list(v)[0] for k, v in grid.items()
+            if not isinstance(v, (str, bytes)) and len(v) == 1})
+
+    # Keep those common to all grids
+    shared = dict(single[0]) if single else {}
+    for values in single[1:]:
+        shared = {k: v for k, v in shared.items()
+                  if k in values and values[k] is v}
+
+    # Remove shared from the grids
+    varying = [{k: v for k, v in grid.items() if k not in shared}
+               for grid in grids]
+    if isinstance(grid_params, dict):
+        varying = varying[0]
+
+    # Return
+    return shared, ParameterGrid(varying)
+
+
+def _grid_search(template, grid_params, n_jobs=None, executor='process',
+                 chunksize=None, timeout=None):
+    """Fits a copy of the template for each combination of the grid.
+
+    Parameters
+    ----------
+    template : wrapper
+      The wrapper which is copied for each candidate.
+
+    grid_params : dict-like or list of dict-like
+      The grid of parameters to search (see ParameterGrid).
+
+    n_jobs : int, default=None
+      The number of workers. If None or 1, the candidates are fitted
+      serially. If -1, all the processors are used.
+
+    executor : string, options = {process, thread}
+      The pool used when n_jobs is greater than 1.
+
+    chunksize : int, default=None
+      The number of candidates sent to each worker at a time. By default,
+      the candidates are divided in four chunks per worker.
+
+    timeout : float, default=None
+      The maximum number of seconds for each candidate.
+
+    Yields
+    ------
+    tuples (index, number of candidates, params, wrapper, error) in the
+    order of the grid.
+    """
+    # Split the parameters
+    shared, parameters = _split_grid(grid_params)
+    candidates = list(enumerate(parameters))
+    n = len(candidates)
+
+    # Number of jobs
+    if n_jobs is not None and n_jobs < 0:
+        n_jobs = os.cpu_count()
+
+    # Serial
+    if n_jobs is None or n_jobs == 1 or n < 2:
+        for c in candidates:
+            i, wrapper, error = _fit_chunk([c], timeout, template, shared)[0]
+            yield i, n, dict(shared, **c[1]), wrapper, error
+        return
+
+    # Check executor
+    if executor not in ['process', 'thread']:
+        raise ValueError("""
+            The executor <{0}> is not supported. The options are
+            process or thread.""".format(executor))
+
+    # Create chunks
+    if chunksize is None:
+        chunksize = max(1, math.ceil(n / (n_jobs * 4)))
+    chunks = [candidates[i:i + chunksize] for i in range(0, n, chunksize)]
+
+    # Library
+    from concurrent import futures
+
+    # Create pool
+    if executor == 'process':
+        pool = futures.ProcessPoolExecutor(max_workers=n_jobs,
+            initializer=_init_worker, initargs=(template, shared))
+        submit = lambda c: pool.submit(_fit_chunk, c, timeout)
+    else:
+        pool = futures.ThreadPoolExecutor(max_workers=n_jobs)
+        submit = lambda c: pool.submit(_fit_chunk, c, timeout,
+                                       template, shared)
+
+    # Compute (keeping the order of the grid)
+    with pool:
+        for f in [submit(c) for c in chunks]:
+            for i, wrapper, error in f.result():
+                yield i, n, dict(shared, **candidates[i][1]), wrapper, error
+
+
+def _json(value):
+    """Converts the values which are not supported by json."""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return str(value)
+
+
+def _summary(wrappers, fname=None, **kwargs):
+    """Creates the summary of the wrappers in linear time.
+
+    The information of each wrapper (see as_series) is collected as a
+    dictionary and the DataFrame is created once from the columns (in
+    order of appearance, missing values are nan). Alternatively, the rows
+    are written to a file (json lines) as they are created so that the
+    summary of very large grids does not need to be kept in memory. It
+    can be read with pd.read_json(fname, lines=True).
+
+    Parameters
+    ----------
+    wrappers : iterable
+      The wrappers (None values are ignored).
+
+    fname : string, default=None
+      The file to write the rows to.
+
+    kwargs : dict-like
+      The arguments to pass to as_series (flabel, label, exclude).
+
+    Returns
+    -------
+    pd.DataFrame (one row per wrapper) or the number of rows written.
+    """
+    # Rows
+    rows = (w._as_dict(**kwargs) if hasattr(w, '_as_dict') else
+            w.as_series(**kwargs).to_dict() for w in wrappers
+            if w is not None)
+
+    # Stream to disk
+    if fname is not None:
+        import json
+        count = 0
+        with open(fname, 'w') as f:
+            for row in rows:
+                row = {k: None if isinstance(v, float) and np.isnan(v) else v
+                       for k, v in row.items()}
+                f.write(json.dumps(row, default=_json) + '\n')
+                count += 1
+        return count
+
+    # Columns
+    rows = list(rows)
+    columns = dict.fromkeys(k for row in rows for k in row)
+
+    # Return
+    return pd.DataFrame({c: [row.get(c, np.nan) for row in rows]
+                         for c in columns}, index=pd.RangeIndex(len(rows)),
+                        columns=list(columns))
+
+
 # def attrs(self):
 #  """This method returns all the defined attributes as tuples."""
 #  return inspect.getmembers(self, lambda a: not inspect.isroutine(a))
@@ -97,6 +382,15 @@ class BaseWrapper(object):
     _conkwargs = {}
     _fitkwargs = {}
 
+    # The cache of fits (see pyamr.core.cache.FitCache). It is shared by all
+    # the wrappers when set in the class (e.g. BaseWrapper.cache = FitCache()).
+    cache = None
+
+    # Whether to record the time of each phase (fit, evaluate, diagnostics,
+    # summary, ...) in _timings. If 'memory', the memory high-water mark is
+    # also recorded (see pyamr.core.profiling).
+    profiling = False
+
     def __init__(self, estimator=None, evaluate=True):
         """Constructor empty defined just so grid_search works in main.
 
@@ -153,6 +447,41 @@ class BaseWrapper(object):
         raise AttributeError("'%s' object has no attribute '%s'" % \
                              (self.__class__.__name__, name))
 
+    def _from_cache(self, kwargs):
+        """This method restores the fit from the cache.
+
+        Parameters
+        ----------
+        kwargs : dict-like
+          The arguments passed to fit.
+
+        Returns
+        -------
+        key (or None if there is no cache) and whether it was found.
+        """
+        # No cache
+        if self.cache is None:
+            return None, False
+
+        # Library
+        from pyamr.core.cache import fit_key
+
+        # Retrieve
+        with record(self, 'cache'):
+            key = fit_key(self, kwargs)
+            state = self.cache.get(key)
+        if state is None:
+            return key, False
+
+        # Restore
+        self._empty()
+        self._config.update(kwargs)
+        self.__dict__.update(state)
+        self._result = dict(state['_result'])
+
+        # Return
+        return key, True
+
     # ---------------------------------------------------------------------------
     #                               save and load
     # ---------------------------------------------------------------------------
@@ -166,15 +495,44 @@ class BaseWrapper(object):
         self.__dict__.update(pickle.load(open(fname, "rb")))
         return self
 
-        # ---------------------------------------------------------------------------
+    def save_npz(self, fname, arrays=True):
+        """This method saves the wrapper in compact format (see serialize)."""
+        from pyamr.core.serialize import save_wrappers
+        save_wrappers([self], fname, arrays=arrays)
 
+    def load_npz(self, fname, mmap_mode=None):
+        """This method loads the wrapper in compact format (see serialize)."""
+        from pyamr.core.serialize import load_wrappers
+        self.__dict__.clear()
+        self.__dict__.update(load_wrappers(fname, mmap_mode=mmap_mode)[0].__dict__)
+        return self
+
+    def profile(self):
+        """This method returns the report of the phases recorded.
+
+        The phases are only recorded when profiling is enabled (e.g.
+        wrapper.profiling = True). Use pyamr.core.profiling.profile_report
+        to aggregate the wrappers of a grid search.
+
+        Returns
+        -------
+        pd.DataFrame (see pyamr.core.profiling.profile_report)
+        """
+        from pyamr.core.profiling import profile_report
+        return profile_report(self)
+
+    # ---------------------------------------------------------------------------
     #                               grid search
     # ---------------------------------------------------------------------------
-    def grid_search(self, grid_params, verbose=0):
+    def grid_search(self, grid_params, verbose=0, n_jobs=None,
+                    executor='process', chunksize=None, timeout=None):
         """This method computes grid search.
 
         .. note: The wrapper needs to have the method ``fit`` implemented.
 
+        .. note: The parameters with only one value (e.g. endog, exog) are
+                 sent once to each worker instead of once per candidate.
+
         Parameters
         ----------
         grid_params : array-like
@@ -183,46 +541,59 @@ class BaseWrapper(object):
         verbose : int
           Wether to show the progress of the search.
 
+        n_jobs : int, default=None
+          The number of workers. If None or 1 the search is serial. If -1,
+          all the processors are used.
+
+        executor : string, options = {process, thread}
+          The pool used when n_jobs is greater than 1.
+
+        chunksize : int, default=None
+          The number of candidates sent to each worker at a time.
+
+        timeout : float, default=None
+          The maximum number of seconds to fit each candidate. Those that
+          exceed it are considered failed (only enforced on POSIX systems
+          and not with the thread executor).
+
         Returns
         -------
         summary : summary with all the elements.
         """
-
         # Create empty list.
         wrappers = []
 
-        # Create all possible combinations
-        parameters = ParameterGrid(grid_params)
-
-        # Number of combinations
-        n = len(parameters)
-
         # Loop for all possible combinations.
-        for i, params in enumerate(parameters):
-            try:
-                # Deep copy the object.
-                copied = deepcopy(self)
-                # Create model and fit
-                wrappers.append(copied.fit(**params))
-                # Show information
-                if (verbose > 0):
-                    print("%d/%d. %s" % (i + 1, n, copied._identifier()))
-
-            except Exception as e:
+        for i, n, params, wrapper, error in _grid_search(self, grid_params,
+                n_jobs=n_jobs, executor=executor, chunksize=chunksize,
+                timeout=timeout):
+
+            if error is not None:
                 # Create message and raise warning
-                msg = "%d/%d. %s ... failed: %s" % (i + 1, n, copied._identifier(), e)
+                msg = "%d/%d. %s ... failed: %s" % \
+                      (i + 1, n, self._identifier(), error)
                 print(msg)
+                continue
+
+            # Restore the shared parameters (same object)
+            wrapper._config.update({k: v for k, v in params.items()
+                                    if k in wrapper._config})
+            wrappers.append(wrapper)
+
+            # Show information
+            if (verbose > 0):
+                print("%d/%d. %s" % (i + 1, n, wrapper._identifier()))
 
         # Return summary.
         return wrappers
 
-    def from_list_dataframe(self, wrapper_list, **kwargs):
+    def from_list_dataframe(self, wrapper_list, fname=None, **kwargs):
         """This methods creates a dataframe summary from a list.
 
         Parameters
         ----------
         wrapper_list : array-like
-          The list with wrapper objects.
+          The list (or iterable) with wrapper objects.
 
         flabel : boolean
           Wether to include a label before the attributes.
@@ -231,25 +602,23 @@ class BaseWrapper(object):
           The label to include before the attributes. By default it includes
           the value of the attribute `self._name` in lowercase.
 
+        exclude : list, default=None
+          The attributes (without label) not to include (e.g. model).
+
+        fname : string, default=None
+          The file to write the rows to (json lines) instead of keeping
+          them in memory (see _summary).
+
         Returns
         -------
-        summary : pandas dataframe.
+        summary : pandas dataframe (or the number of rows written).
         """
-        # Create summary.
-        summary = pd.DataFrame()
-
-        # Loop filling the summary.
-        for i, wrapper in enumerate(wrapper_list):
-            results = wrapper.as_series(**kwargs).rename(i)
-            summary = pd.concat([summary, results], axis=1, join='outer')
-
-        # Return
-        return summary.T
+        return _summary(wrapper_list, fname=fname, **kwargs)
 
     # ---------------------------------------------------------------------------
     #                                OVERRIDE
     # ---------------------------------------------------------------------------
-    def as_series(self, flabel=True, label=None):
+    def as_series(self, flabel=True, label=None, exclude=None):
         """This method returns a series with all the information.
 
         Parameters
@@ -261,31 +630,46 @@ class BaseWrapper(object):
           The label to include before the attributes. By default it includes
           the value of the attribute `self._name` in lowercase.
 
+        exclude : list, default=None
+          The attributes (without label) not to include (e.g. model).
+
         Returns
         -------
         series : pandas series with the results, configuration and model.
         """
-        # Concatenate the configuration.
-        s = {}
-        s.update(self._result)
-        s.update(self._config)
-        s.update({'model': self._raw})
-        s.update({'id': self._identifier()})
+        return pd.Series(self._as_dict(flabel=flabel, label=label,
+                                       exclude=exclude))
 
-        # No label.
-        if not flabel: return pd.Series(s)
+    def _as_dict(self, flabel=True, label=None, exclude=None):
+        """This method returns a dictionary with all the information.
 
-        # Create the label to include
-        if label is None and hasattr(self, '_name'):
-            label = self._name.lower()
-        else:
-            label = str(label)
-
-        # format label
-        f = lambda x: "%s-%s" % (label.lower(), x)
-
-        # Return
-        return pd.Series(s).rename(index=f, copy=True)
+        See as_series.
+        """
+        with record(self, 'summary'):
+            # Concatenate the configuration.
+            s = {}
+            s.update(self._result)
+            s.update(self._config)
+            if not exclude or 'model' not in exclude:
+                s.update({'model': self._raw})
+            if not exclude or 'id' not in exclude:
+                s.update({'id': self._identifier()})
+
+            # Exclude
+            if exclude:
+                s = {k: v for k, v in s.items() if k not in exclude}
+
+            # No label.
+            if not flabel: return s
+
+            # Create the label to include
+            if label is None and hasattr(self, '_name'):
+                label = self._name.lower()
+            else:
+                label = str(label)
+
+            # Return
+            return {"%s-%s" % (label.lower(), k): v for k, v in s.items()}
 
     def as_summary(self):
         """This method displays the final summary."""
@@ -337,20 +721,31 @@ class BaseWrapper(object):
         -------
 
         """
+        # Retrieve from cache
+        key, found = self._from_cache(kwargs)
+        if found:
+            return self
+
         # Empty the class
         self._empty()
         # Update the configuration
         self._config.update(kwargs)
 
         # Fit the model
-        if inspect.isfunction(self.estimator):
-            self._fit_funct(**kwargs)
-        elif inspect.isclass(self.estimator):
-            self._fit_class(**kwargs)
+        with record(self, 'fit'):
+            if inspect.isfunction(self.estimator):
+                self._fit_funct(**kwargs)
+            elif inspect.isclass(self.estimator):
+                self._fit_class(**kwargs)
 
         # Evaluate the model
         if self.evaluate:
-            self._result = self.evaluate()
+            with record(self, 'evaluate'):
+                self._result = self.evaluate()
+
+        # Store in cache
+        if key is not None:
+            self.cache.put(key, self)
 
         # Return
         return self
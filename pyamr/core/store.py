@@ -0,0 +1,383 @@
+################################################################################
+# Author:
+# Date:
+# Description:
+#
+#
+#
+# Copyright:
+#
+#
+################################################################################
+# Import libraries
+import os
+import json
+import numpy as np
+import pandas as pd
+
+# Import helper
+from pyamr.core.cube import _aggregate
+
+
+class FrequencyStore:
+    """Daily frequencies persisted to disk with memory-mapped reads.
+
+    The number of susceptibility test records for each (day, specimen,
+    microorganism, antimicrobial, outcome) are stored in a folder as
+    fixed-width binary records, sorted by day, together with a code
+    dictionary (json) which maps the integer codes to the categories.
+
+    .. code-block:: text
+
+        path/
+            codes.json    # categories of each column and record dtype
+            records.bin   # fixed-width records (day, spe, org, abx, out, freq)
+
+    The records are read with ``np.memmap`` so that only the slice of days
+    requested is loaded. New days can be appended without rewriting the
+    existing records; the code dictionary is append-only so the codes
+    already stored remain valid.
+
+    Examples
+    --------
+
+    .. code-block:: python
+
+        # Append the records (e.g. once per day)
+        store = FrequencyStore('./daily').append(data)
+
+        # Daily frequencies in long format (as SART)
+        store.to_dataframe(start='2021-01-01', end='2021-06-30')
+
+        # Frequencies by organism and antimicrobial (as SARI)
+        store.frequencies(by=['MICROORGANISM', 'ANTIMICROBIAL'])
+    """
+
+    # Attributes
+    c_spe = 'SPECIMEN'
+    c_org = 'MICROORGANISM'
+    c_abx = 'ANTIMICROBIAL'
+    c_dat = 'DATE'
+    c_out = 'SENSITIVITY'
+
+    # Record format (day is the number of days since 1970-01-01)
+    dtype = np.dtype([('day', '<i4'),
+                      ('spe', '<i4'),
+                      ('org', '<i4'),
+                      ('abx', '<i4'),
+                      ('out', '<i4'),
+                      ('freq', '<i8')])
+
+    # Files
+    f_codes = 'codes.json'
+    f_records = 'records.bin'
+
+    def __init__(self, path,
+                       column_specimen=c_spe,
+                       column_microorganism=c_org,
+                       column_antimicrobial=c_abx,
+                       column_date=c_dat,
+                       column_outcome=c_out):
+        """Constructor.
+
+        Parameters
+        ----------
+        path: string
+            The folder where the store is (or will be) saved.
+
+        Returns
+        --------
+        FrequencyStore instance
+        """
+        # Columns
+        self.c_spe = column_specimen
+        self.c_org = column_microorganism
+        self.c_abx = column_antimicrobial
+        self.c_dat = column_date
+        self.c_out = column_outcome
+
+        # Columns of the records (same order as dtype)
+        self.columns = {'spe': self.c_spe,
+                        'org': self.c_org,
+                        'abx': self.c_abx,
+                        'out': self.c_out}
+
+        # Path
+        self.path = path
+        self.codes = {k: [] for k in self.columns}
+
+        # Load the code dictionary
+        if os.path.exists(self._file(self.f_codes)):
+            with open(self._file(self.f_codes)) as f:
+                meta = json.load(f)
+            if np.dtype([tuple(e) for e in meta['dtype']]) != self.dtype:
+                raise ValueError("""
+                    The records in {0} were saved with a different
+                    format {1}.""".format(path, meta['dtype']))
+            self.codes = meta['codes']
+
+    # ---------------------------------------------------------------------
+    #                           helper methods
+    # ---------------------------------------------------------------------
+    def _file(self, name):
+        """Returns the path of the file."""
+        return os.path.join(self.path, name)
+
+    def _encode(self, key, values):
+        """Integer codes of the values (extends the code dictionary).
+
+        Parameters
+        ----------
+        key: string
+            The record field (spe, org, abx or out).
+
+        values: pd.Series
+            The values to encode.
+
+        Returns
+        -------
+        np.array
+        """
+        # Add new categories at the end
+        codes = self.codes[key]
+        new = pd.Index(values.unique()).difference(codes)
+        codes.extend(new.tolist())
+        # Return
+        return pd.Index(codes).get_indexer(values).astype(np.int32)
+
+    def _day(self, date):
+        """Returns the number of days since 1970-01-01."""
+        return pd.Timestamp(date).to_datetime64() \
+            .astype('datetime64[D]').astype(np.int64)
+
+    # ---------------------------------------------------------------------
+    #                               write
+    # ---------------------------------------------------------------------
+    def append(self, dataframe):
+        """Appends the daily frequencies of the raw records.
+
+        The days in the DataFrame must be after the last day stored.
+
+        Parameters
+        ----------
+        dataframe: pd.DataFrame
+            The DataFrame with the raw susceptibility test records.
+
+        Returns
+        -------
+        FrequencyStore instance
+        """
+        # Copy the relevant columns
+        columns = [self.c_dat] + list(self.columns.values())
+        aux = dataframe[columns].dropna()
+        if aux.empty:
+            return self
+
+        # Days since 1970-01-01
+        days = pd.to_datetime(aux[self.c_dat]).values \
+            .astype('datetime64[D]').astype(np.int64)
+
+        # Check order (records are sorted by day)
+        last = self.read()['day'][-1:]
+        if last.size and days.min() <= last[-1]:
+            raise ValueError("""
+                The records to append start on {0} but the store already
+                contains records until {1}. Only days after the last day
+                stored can be appended.""".format(
+                    np.datetime64(int(days.min()), 'D'),
+                    np.datetime64(int(last[-1]), 'D')))
+
+        # Integer codes
+        codes = np.column_stack([days] +
+            [self._encode(k, aux[c]) for k, c in self.columns.items()])
+
+        # Count (unique returns the records sorted by day)
+        ukeys, freq = np.unique(codes, axis=0, return_counts=True)
+
+        # Create records
+        records = np.empty(freq.size, dtype=self.dtype)
+        for i, name in enumerate(self.dtype.names[:-1]):
+            records[name] = ukeys[:, i]
+        records['freq'] = freq
+
+        # Save
+        os.makedirs(self.path, exist_ok=True)
+        with open(self._file(self.f_records), 'ab') as f:
+            records.tofile(f)
+        with open(self._file(self.f_codes), 'w') as f:
+            json.dump({'dtype': self.dtype.descr,
+                       'codes': self.codes}, f)
+
+        # Return
+        return self
+
+    # ---------------------------------------------------------------------
+    #                               read
+    # ---------------------------------------------------------------------
+    def read(self, start=None, end=None):
+        """Reads the records (memory-mapped) between two dates.
+
+        Parameters
+        ----------
+        start, end: date-like, default=None
+            The first and last day (inclusive). If None, the records are
+            read from the first or until the last day respectively.
+
+        Returns
+        -------
+        np.memmap
+            The records (structured array with dtype FrequencyStore.dtype).
+        """
+        # Empty
+        if not os.path.exists(self._file(self.f_records)) or \
+                os.path.getsize(self._file(self.f_records)) == 0:
+            return np.empty(0, dtype=self.dtype)
+
+        # Memory map
+        records = np.memmap(self._file(self.f_records),
+            dtype=self.dtype, mode='r')
+
+        # Slice (records are sorted by day)
+        lo, hi = 0, records.shape[0]
+        if start is not None:
+            lo = np.searchsorted(records['day'], self._day(start), 'left')
+        if end is not None:
+            hi = np.searchsorted(records['day'], self._day(end), 'right')
+
+        # Return
+        return records[lo:hi]
+
+    def days(self):
+        """Returns the days (since 1970-01-01) with records."""
+        return np.unique(self.read()['day'])
+
+    def to_dataframe(self, start=None, end=None):
+        """Returns the daily frequencies in long format.
+
+        Parameters
+        ----------
+        start, end: date-like, default=None
+            The first and last day (inclusive).
+
+        Returns
+        -------
+        pd.DataFrame
+            The daily frequencies with the columns date, specimen,
+            microorganism, antimicrobial, outcome and freq.
+        """
+        # Read
+        records = self.read(start=start, end=end)
+
+        # Decode
+        data = {self.c_dat: records['day'].astype('datetime64[D]')}
+        for k, c in self.columns.items():
+            data[c] = np.asarray(self.codes[k], dtype=object)[records[k]] \
+                if len(self.codes[k]) else np.empty(0, dtype=object)
+        data['freq'] = np.asarray(records['freq'])
+
+        # Return
+        return pd.DataFrame(data)
+
+    def frequencies(self, by=None, start=None, end=None):
+        """Returns the frequencies of each outcome grouped by columns.
+
+        Parameters
+        ----------
+        by: list, default=None
+            The columns to group by (specimen, microorganism and/or
+            antimicrobial). If None, all of them.
+
+        start, end: date-like, default=None
+            The first and last day (inclusive).
+
+        Returns
+        -------
+        pd.DataFrame
+            The frequencies with the columns in by as index and the
+            outcomes as columns (similar to SARI.compute).
+        """
+        # Format
+        if by is None:
+            by = [self.c_spe, self.c_org, self.c_abx]
+        by = [by] if isinstance(by, str) else list(by)
+
+        # Check columns
+        names = {c: k for k, c in self.columns.items() if k != 'out'}
+        missing = set(by).difference(names)
+        if missing:
+            raise ValueError("""
+                The columns {0} are not in the store. The available
+                columns are {1}.""".format(sorted(missing), list(names)))
+
+        # Read
+        records = self.read(start=start, end=end)
+        keys = [names[c] for c in by]
+        sizes = [max(len(self.codes[k]), 1) for k in keys]
+
+        # Frequency of each outcome
+        counts = np.zeros((records.shape[0], len(self.codes['out'])))
+        counts[np.arange(records.shape[0]), records['out']] = records['freq']
+
+        # Aggregate
+        codes = np.column_stack([records[k] for k in keys]) \
+            .reshape(records.shape[0], len(keys)).astype(np.int64)
+        codes, counts = _aggregate(codes, counts, sizes)
+
+        # Create index
+        arrays = [pd.Index(np.asarray(self.codes[k], dtype=object)[codes[:, i]])
+                  for i, k in enumerate(keys)]
+        index = pd.MultiIndex.from_arrays(arrays, names=by) \
+            if len(by) > 1 else arrays[0].rename(by[0])
+
+        # Return
+        return pd.DataFrame(counts, index=index,
+            columns=pd.Index(self.codes['out'])) \
+                .sort_index().sort_index(axis=1)
+
+
+
+if __name__ == '__main__': # pragma: no cover
+
+    # Libraries
+    import time
+    import tempfile
+
+    # Specific
+    from pyamr.core.sari import SARI
+    from pyamr.core.store import FrequencyStore
+
+    # ----------------------------------
+    # Create data
+    # ----------------------------------
+    # Number of records
+    n = 100000
+
+    # Create susceptibility test records
+    data = pd.DataFrame({
+        'DATE': pd.Timestamp('2020-01-01') +
+            pd.to_timedelta(np.random.randint(0, 730, n), unit='D'),
+        'SPECIMEN': np.random.choice(['BLDCUL', 'URICUL'], n),
+        'MICROORGANISM': np.random.choice(['ECOL', 'SAUR', 'KPNE'], n),
+        'ANTIMICROBIAL': np.random.choice(['AAUG', 'ACIP', 'AMER'], n),
+        'SENSITIVITY': np.random.choice(['sensitive', 'resistant'], n)
+    })
+
+    # Create store (append one year at a time)
+    path = tempfile.mkdtemp()
+    store = FrequencyStore(path)
+    store.append(data[data.DATE < '2021-01-01'])
+    store.append(data[data.DATE >= '2021-01-01'])
+
+    # Load and query
+    t0 = time.time()
+    freqs = FrequencyStore(path).frequencies(
+        by=['MICROORGANISM', 'ANTIMICROBIAL'], start='2021-01-01')
+    print("\nQuery in %.5fs:" % (time.time() - t0))
+    print(freqs)
+
+    # Compare with SARI
+    print("\nSARI:")
+    print(SARI(groupby=['MICROORGANISM',
+                        'ANTIMICROBIAL',
+                        'SENSITIVITY']) \
+        .compute(data[data.DATE >= '2021-01-01']))
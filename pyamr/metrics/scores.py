@@ -120,6 +120,62 @@ def _mean_absolute_scaled_error(y_train, y_test, y_pred):
     return forecast_error.mean() / d
 
 
+
+def _forecast_scores(y_true, y_pred, y_last, y_scale):
+    """It computes the forecast scores for each horizon (vectorized).
+
+    The scores are computed across the forecast origins (rows) for each
+    horizon (columns), ignoring the missing values (NaN). The direction
+    is measured with respect to the last value observed at the origin
+    and the absolute scaled error uses the in-sample naive forecast error
+    of each origin (see _mean_absolute_scaled_error).
+
+    Parameters
+    ----------
+    y_true : array-like
+      Real values with shape (origins, horizons).
+
+    y_pred : array-like
+      Predicted values with shape (..., origins, horizons).
+
+    y_last : array-like
+      The last value observed at each origin (origins,).
+
+    y_scale : array-like
+      The mean absolute difference of the training values at each
+      origin (origins,).
+
+    Returns
+    -------
+    dict with the mae, mape, mda and mase arrays (..., horizons).
+    """
+    # Format arrays.
+    y_true = np.asarray(y_true, dtype=float)
+    y_pred = np.asarray(y_pred, dtype=float)
+    y_last = np.asarray(y_last, dtype=float)[:, None]
+    y_scale = np.asarray(y_scale, dtype=float)[:, None]
+
+    # Errors
+    error = np.abs(y_true - y_pred)
+    valid = ~np.isnan(error)
+    count = valid.sum(axis=-2)
+
+    # Directions
+    same = np.sign(y_true - y_last) == np.sign(y_pred - y_last)
+
+    # Compute
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = lambda x: np.where(valid, x, 0).sum(axis=-2) / count
+        scores = {
+            'mae': mean(error),
+            'mape': 100. * mean(error / np.abs(y_true)),
+            'mda': mean(same),
+            'mase': mean(error / y_scale)
+        }
+
+    # Return
+    return scores
+
 if __name__ == '__main__': # pragma: no cover
 
 
@@ -13,10 +13,48 @@ from __future__ import division
 
 # Libraries
 import sys
+import warnings
 import numpy as np
 import pandas as pd
 import statsmodels.api as sm
 
+
+# -----------------------------------------------------------------------------
+#                               helper methods
+# -----------------------------------------------------------------------------
+def _ragged_to_padded(x, offsets):
+  """This function converts a ragged array into a padded 2-D array.
+
+  Parameters
+  ----------
+  x: numpy.array
+    The concatenated values of all the series (1-D).
+  offsets: numpy.array
+    The boundaries of the series within x, so that the i-th series is
+    x[offsets[i]:offsets[i+1]]. Its length is the number of series + 1.
+
+  Returns
+  -------
+  X : numpy.array
+    The 2-D array with the series as rows padded with NaN.
+  rows, cols : numpy.array
+    The indexes to go back from X to the ragged array (X[rows, cols]).
+  """
+  # Format
+  x = np.asarray(x, dtype=float)
+  offsets = np.asarray(offsets, dtype=int)
+  # Lengths of each series.
+  lengths = np.diff(offsets)
+  # Indexes of each value within the padded array.
+  rows = np.repeat(np.arange(lengths.size), lengths)
+  cols = np.arange(offsets[0], offsets[-1]) - np.repeat(offsets[:-1], lengths)
+  # Create padded array.
+  X = np.full((lengths.size, lengths.max(initial=0)), np.nan)
+  X[rows, cols] = x[offsets[0]:offsets[-1]]
+  # Return
+  return X, rows, cols
+
+
 class SigmoidA():
 
   def __init__(self, r=200, g=0.5, offset=0.0, scale=1.0,
@@ -181,6 +219,142 @@ class SigmoidA():
     return self.offset + self.scale*r
 
 
+  # ---------------------------------------------------------------------------
+  #                             BATCHED WEIGHTS
+  # ---------------------------------------------------------------------------
+  def approximated_sigmoid_batch(self, X, X_curves=None):
+    """This function computes the approximated sigmoid for each row.
+
+    It is the batched version of ``approximated_sigmoid``. The rows might
+    be padded with NaN (see ``weights_batch``), which are ignored and
+    returned as NaN. When the two curves start at the same value (e.g. the
+    row is constant) the sigmoid becomes a step function and the constant
+    rows are given the maximum weight (one) instead of NaN.
+
+    Parameters
+    ----------
+    X: numpy.array
+      The 2-D array with the values to be converted to weights (rows).
+    X_curves: tuple
+      The arrays (one value per row) indicating where the low/upper curves
+      should start. By default the minimum and maximum of each row.
+
+    Returns
+    -------
+    r : numpy.array
+      The weights.
+    """
+    # Where the two curves should start.
+    if X_curves is None:
+      X_curves = [np.nanmin(X, axis=1), np.nanmax(X, axis=1)]
+    cmin = np.asarray(X_curves[0], dtype=float).reshape(-1, 1)
+    cmax = np.asarray(X_curves[1], dtype=float).reshape(-1, 1)
+
+    # Sigmoid variables (step function when cmin == cmax)
+    d = cmax - cmin
+    z = np.divide(X - cmin, d, out=(X >= cmin).astype(float),
+                  where=(d != 0))
+    # Approximated sigmoid.
+    r = (1 + self.r ** (-z + self.g)) ** (-1)
+
+    # Normalize so it goes between zero and one (rows with
+    # the same value everywhere are given the maximum weight).
+    rmin = np.nanmin(r, axis=1, keepdims=True)
+    rmax = np.nanmax(r, axis=1, keepdims=True)
+    d = rmax - rmin
+    r = np.divide(r - rmin, d, out=np.ones(r.shape), where=(d != 0))
+
+    # Keep padding
+    r[np.isnan(X)] = np.nan
+
+    # Return
+    return r
+
+  def threshold_batch(self, R, X, thresholds=(None, None)):
+    """This function thresholds each row of R given the values of X.
+
+    Parameters
+    ----------
+    R: numpy.array
+      The 2-D array with the weights to be thresholded.
+    X: numpy.array
+      The 2-D array with the values converted to weights.
+    thresholds: tuple
+      The low and high thresholds (see ``threshold``).
+
+    Returns
+    -------
+    R : numpy.array
+      The 2-D array with the thresholded weights (same shape as R). The
+      values below the low threshold are zero and those above the high
+      threshold have the maximum weight of the row.
+    """
+    # Get thresholds
+    threshold_low, threshold_high = thresholds
+
+    # Lower threshold.
+    if threshold_low is not None:
+      R = np.where(X < threshold_low, 0, R)
+
+    # Upper threshold.
+    if threshold_high is not None:
+      R = np.where(X > threshold_high,
+                   np.nanmax(R, axis=1, keepdims=True), R)
+
+    # Return
+    return R
+
+  def weights_batch(self, x, offsets=None):
+    """This function computes the weights for many series at once.
+
+    Each series is transformed exactly as in ``weights`` (the minimum,
+    maximum and percentiles are computed per series) but all of them
+    are computed with a single set of numpy operations.
+
+    Parameters
+    ----------
+    x: numpy.array
+      The 2-D array with one series per row. Alternatively, when offsets
+      is passed, the 1-D array with all the series concatenated.
+    offsets: numpy.array (optional)
+      The boundaries of the series within x for ragged inputs so that
+      the i-th series is x[offsets[i]:offsets[i+1]].
+
+    Returns
+    -------
+    numpy.array
+      The weights with the same shape as x.
+    """
+    # Format as a (padded) 2-D array.
+    if offsets is not None:
+      X, rows, cols = _ragged_to_padded(x, offsets)
+    else:
+      X = np.atleast_2d(np.asarray(x, dtype=float))
+
+    # Empty series are all NaN (ignore warnings)
+    with warnings.catch_warnings():
+      warnings.simplefilter('ignore', category=RuntimeWarning)
+
+      # Get the standard sigmoid or the percentile sigmoid.
+      if self.percentiles is None:
+        r = self.approximated_sigmoid_batch(X)
+      else:
+        r = self.approximated_sigmoid_batch(X,
+          np.nanpercentile(X, self.percentiles, axis=1))
+
+      # Threshold the result.
+      if self.thresholds is not None:
+        r = self.threshold_batch(r, X, self.thresholds)
+
+    # Scale
+    r = self.offset + self.scale * r
+
+    # Return
+    if offsets is not None:
+      return r[rows, cols]
+    return r.reshape(np.shape(x))
+
+
 
 
 
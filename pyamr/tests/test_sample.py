@@ -11,6 +11,11 @@ from pyamr.core.asai import asai
 from pyamr.core.sari import SARI
 from pyamr.core.asai import ASAI
 from pyamr.core.mari import MARI
+from pyamr.core.sart import SART
+from pyamr.core.freq import Frequency
+from pyamr.core.cube import FrequencyCube
+from pyamr.core.store import FrequencyStore
+from pyamr.metrics.weights import SigmoidA
 
 # ----------------------------------------------------
 # Fixtures
@@ -110,6 +115,126 @@ def test_sari_class_timeseries(fixture3):
     assert 'DATE' in r.index.names
 
 
+# ----------------------------------------------
+#   Frequency
+# ----------------------------------------------
+@pytest.fixture
+def frequency():
+    return Frequency(column_antibiotic='ANTIMICROBIAL',
+                     column_organism='MICROORGANISM',
+                     column_date='DATE',
+                     column_outcome='SENSITIVITY')
+
+@pytest.mark.parametrize("by_category", ['pairs', 'organisms', 'antibiotics'])
+def test_frequency_iti_matches_resample(fixture3, frequency, by_category):
+    r = frequency.compute(fixture3, strategy='ITI',
+        by_category=by_category, fs='1D')
+    keys = list(r.index.names[:-1])
+    aux = fixture3.rename(columns=frequency.rename_columns)
+    aux['DATE'] = pd.to_datetime(aux['DATE'])
+    e = aux.groupby(keys + ['DATE', 'SENSITIVITY']).size() \
+        .unstack().fillna(0).reset_index(level=keys) \
+        .groupby(keys).resample('1D').sum(numeric_only=True)
+    assert np.allclose(r.values, e[r.columns].values)
+
+def test_frequency_oti(fixture3, frequency):
+    iti = frequency.compute(fixture3, strategy='ITI', fs='1D')
+    oti = frequency.compute(fixture3, strategy='OTI',
+        wshift='1D', wsize='2D')
+    assert oti.shape == iti.shape
+    assert oti.sum().sum() == 2 * iti.sum().sum() - \
+        iti.groupby(level=[0, 1]).tail(1).sum().sum()
+
+def test_frequency_iti_month_end_intraday(frequency):
+    df = pd.DataFrame({'ANTIMICROBIAL': 'A', 'MICROORGANISM': 'O',
+        'SENSITIVITY': 'sensitive', 'DATE': pd.to_datetime(['2021-01-03 00:00',
+            '2021-01-31 14:00', '2021-02-10 00:00', '2021-03-31 23:00'])})
+    r = frequency.compute(df, strategy='ITI', by_category='pairs', fs='M')
+    assert r['sensitive'].tolist() == [2, 1, 1]
+    e = df.set_index('DATE').resample('M').size()
+    assert list(r.index.get_level_values('DATE')) == list(e.index)
+
+def test_frequency_invalid_strategy(fixture3, frequency):
+    with pytest.raises(ValueError):
+        frequency.compute(fixture3, strategy='invalid')
+    with pytest.raises(ValueError):
+        frequency.compute(fixture3, strategy='OTI')
+
+
+# ----------------------------------------------
+#   Frequency cube
+# ----------------------------------------------
+@pytest.fixture
+def cube(fixture3):
+    return FrequencyCube(dimensions=['SPECIMEN',
+                                     'MICROORGANISM',
+                                     'ANTIMICROBIAL'],
+                         column_date='DATE',
+                         period='D').fit(fixture3)
+
+def test_cube_rollups(cube):
+    assert len(cube.cuboids) == 2 ** 4
+
+def test_cube_sari_equals_sari_class(fixture3, cube):
+    r = cube.compute_sari(by=['MICROORGANISM', 'ANTIMICROBIAL'],
+        where={'SPECIMEN': 'BLDCUL'})
+    e = SARI(groupby=['MICROORGANISM', 'ANTIMICROBIAL', 'SENSITIVITY']) \
+        .compute(fixture3[fixture3.SPECIMEN == 'BLDCUL'])
+    assert np.allclose(r.sari, e.sari)
+    assert np.allclose(r.freq, e.freq)
+
+def test_cube_invalid_dimension(cube):
+    with pytest.raises(ValueError):
+        cube.query(by=['GENUS'])
+
+
+# ----------------------------------------------
+#   Frequency store
+# ----------------------------------------------
+def test_store_append_and_read(fixture3, tmp_path):
+    dates = pd.to_datetime(fixture3.DATE)
+    split = dates.sort_values().iloc[dates.size // 2]
+    store = FrequencyStore(str(tmp_path))
+    store.append(fixture3[dates < split])
+    store.append(fixture3[dates >= split])
+
+    # Reload from disk
+    store = FrequencyStore(str(tmp_path))
+    r = store.frequencies(by=['MICROORGANISM', 'ANTIMICROBIAL'])
+    e = SARI(groupby=['MICROORGANISM', 'ANTIMICROBIAL', 'SENSITIVITY']) \
+        .compute(fixture3, return_frequencies=True)
+    assert np.allclose(r.sum(axis=1), e.freq)
+    assert store.to_dataframe().freq.sum() == fixture3.shape[0]
+    assert store.to_dataframe(start=split).freq.sum() == (dates >= split).sum()
+
+def test_store_append_invalid_order(fixture3, tmp_path):
+    store = FrequencyStore(str(tmp_path)).append(fixture3)
+    with pytest.raises(ValueError):
+        store.append(fixture3)
+
+
+# ----------------------------------------------
+#   Single Antibiotic Resistance Trend (SART)
+# ----------------------------------------------
+def test_sart_class_cdate(fixture3):
+    aux = fixture3.rename(columns={'DATE': 'date_received'})
+    r = SART().compute(aux, shift='1D', period='2D',
+        cdate='date_received', return_objects=False)
+    assert isinstance(r, pd.DataFrame)
+    assert r.shape[0] == 4
+
+def test_sart_class_windows(fixture3):
+    r, objs = SART().compute(fixture3,
+        windows=[('2D', '1D'), ('3D', '1D')])
+    assert r.shape[0] == 8
+    assert len(objs) == 8
+    assert r.index.names[:2] == ['period', 'shift']
+
+def test_sart_class_windows_invalid(fixture3):
+    with pytest.raises(ValueError):
+        SART().compute(fixture3, windows=[(2, '1D')])
+
+
 # ----------------------------------------------
 #   Multiple Antibiotic Resistance Index (MARI)
 # ----------------------------------------------
@@ -204,3 +329,501 @@ def test_asai_class(fixture4):
 # --------------------------------------
 # Statistical tests (statstools)
 # --------------------------------------
+
+
+# --------------------------------------
+# Regression wrappers
+# --------------------------------------
+@pytest.fixture
+def series():
+    return np.cumsum(np.random.RandomState(0).randn(60)) + 50
+
+@pytest.mark.parametrize("executor", ['process', 'thread'])
+def test_grid_search_parallel_equals_serial(series, executor):
+    from statsmodels.tsa.statespace.sarimax import SARIMAX
+    from pyamr.core.regression.sarimax import SARIMAXWrapper
+    grid = {'endog': [series], 'exog': [None], 'disp': [0],
+            'order': [(0,1,0), (1,0,0), (1,1,1)], 'trend': ['n', 'c']}
+    w = SARIMAXWrapper(estimator=SARIMAX)
+    a = w.grid_search(grid_params=grid)
+    b = w.grid_search(grid_params=grid, n_jobs=2, executor=executor)
+    assert [x.order for x in a] == [x.order for x in b]
+    assert np.allclose([x.bic for x in a], [x.bic for x in b])
+    assert all(x._config['endog'] is series for x in b)
+
+def test_wls_batch_equals_wrapper():
+    import statsmodels.api as sm
+    from pyamr.core.regression.wls import WLSWrapper
+    from pyamr.core.regression.wls import WLSBatch
+    rs = np.random.RandomState(0)
+    Y = np.arange(30)[:, None] + rs.randn(30, 4) * 3
+    F = rs.randint(1, 100, (30, 4)).astype(float)
+    W = SigmoidA(r=200, g=0.5, offset=0.0, scale=1.0)
+    batch = WLSBatch().fit(endog=Y, trend='c', weights=F, W=W).as_frame()
+    for i in range(Y.shape[1]):
+        s = WLSWrapper(estimator=sm.WLS).fit(endog=Y[:, i], trend='c',
+            weights=F[:, i], W=W).as_series()
+        assert list(s.index) == list(batch.columns)
+        for c in ['wls-x1_coef', 'wls-x1_std', 'wls-bic', 'wls-rsquared',
+                  'wls-fprob', 'wls-s_dw'] + \
+                 [c for c in s.index if c.startswith('wls-m_')]:
+            assert np.isclose(s[c], batch[c].iloc[i])
+    # Near collinear exogenous variables
+    X = np.column_stack((np.arange(30), np.arange(30) * (1 + 1e-12)))
+    with pytest.warns(RuntimeWarning, match='collinear'):
+        WLSBatch().fit(endog=Y, exog=X, trend='c')
+
+def test_wls_prediction_batch():
+    import statsmodels.api as sm
+    from pyamr.core.regression.wls import WLSWrapper
+    from pyamr.core.regression.wls import WLSBatch
+    from pyamr.core.regression.wls import get_prediction_batch
+    rs = np.random.RandomState(0)
+    Y = np.arange(30)[:, None] + rs.randn(30, 4) * 3
+    F = rs.randint(1, 100, (30, 4)).astype(float)
+    W = SigmoidA(r=200, g=0.5, offset=0.0, scale=1.0)
+    wrappers = [WLSWrapper(estimator=sm.WLS).fit(endog=Y[:, i], trend='c',
+        weights=F[:, i], W=W) for i in range(Y.shape[1])]
+    batch = WLSBatch().fit(endog=Y, trend='c', weights=F, W=W)
+    expected = np.stack([w.get_prediction(start=10, end=40) for w in wrappers])
+    assert expected.shape == (4, 4, 31)
+    assert np.allclose(get_prediction_batch(wrappers, start=10, end=40), expected)
+    assert np.allclose(batch.get_prediction(start=10, end=40), expected)
+    # Only the time (and constant) as exogenous variable
+    X = np.column_stack((np.arange(30), rs.randn(30)))
+    wrappers.append(WLSWrapper(estimator=sm.WLS).fit(endog=Y[:, 0],
+        exog=X, trend='c'))
+    with pytest.raises(ValueError):
+        get_prediction_batch(wrappers)
+    with pytest.raises(ValueError):
+        WLSBatch().fit(endog=Y, exog=X, trend='c').get_prediction()
+
+@pytest.mark.parametrize("mmap_mode", [None, 'r'])
+def test_save_load_wrappers(tmp_path, series, mmap_mode):
+    import statsmodels.api as sm
+    from statsmodels.tsa.statespace.sarimax import SARIMAX
+    from pyamr.core.regression.wls import WLSWrapper
+    from pyamr.core.regression.sarimax import SARIMAXWrapper
+    from pyamr.core.serialize import save_wrappers
+    from pyamr.core.serialize import load_wrappers
+    from pyamr.core.serialize import read_results
+    fname = str(tmp_path / 'wrappers.npz')
+    wrappers = [WLSWrapper(estimator=sm.WLS).fit(endog=series, trend='c',
+                    weights=np.ones(len(series)), W=SigmoidA()),
+                SARIMAXWrapper(estimator=SARIMAX).fit(endog=series,
+                    order=(1, 0, 0), trend='c', disp=0)]
+    save_wrappers(wrappers, fname)
+    loaded = load_wrappers(fname, mmap_mode=mmap_mode)
+    for w, l in zip(wrappers, loaded):
+        assert type(l) is type(w)
+        assert l._identifier() == w._identifier()
+        assert l._result.keys() == w._result.keys()
+        assert np.array_equal(l.endog, w.endog)
+        assert np.allclose(l._cov_params, w._raw.cov_params())
+    assert loaded[1].order == (1, 0, 0)
+    assert loaded[0].x1_coef == wrappers[0].x1_coef
+    assert read_results(fname)['bic'].tolist() == [w.bic for w in wrappers]
+    # Only pyamr wrappers and objects (and estimators) are imported
+    from pyamr.core.serialize import _decode, _import
+    for path, kind in [('os:system', 'estimator'), ('os:system', 'object'),
+                       ('pyamr.core.serialize:np.load', 'estimator'),
+                       ('pyamr.metrics.weights:SigmoidA', 'wrapper')]:
+        with pytest.raises(ValueError):
+            _import(path, kind)
+    with pytest.raises(ValueError):
+        _decode({'__object__': 'subprocess:Popen', '__dict__': {}})
+
+def test_backtest_scores(series):
+    import statsmodels.api as sm
+    from pyamr.core.regression.wls import WLSWrapper
+    from pyamr.core.regression.backtest import Backtest
+    from pyamr.metrics.scores import _mean_absolute_error
+    configs = {'wls': (WLSWrapper(estimator=sm.WLS), {'trend': 'c'})}
+    bt = Backtest(horizon=2, initial=20, window=15).fit(series, configs)
+    # Forecast of the last complete origin
+    w = WLSWrapper(estimator=sm.WLS).fit(endog=series[-17:-2], trend='c')
+    assert np.allclose(bt.forecasts[0, -2], w.get_prediction(end=16)[1, -2:])
+    # Scores by horizon
+    y, p = bt.actuals[:, 0], bt.forecasts[0, :, 0]
+    assert np.isclose(bt.scores().loc[('wls', 1), 'mae'],
+                      _mean_absolute_error(y, p))
+    # Parallel (blocks of origins)
+    pt = Backtest(horizon=2, initial=20, window=15, n_jobs=2) \
+        .fit(series, configs)
+    assert np.allclose(pt.forecasts, bt.forecasts)
+
+def test_fit_cache(tmp_path, series, monkeypatch):
+    import statsmodels.api as sm
+    from pyamr.core.cache import FitCache
+    from pyamr.core.stats.wbase import BaseWrapper
+    from pyamr.core.regression.wls import WLSWrapper
+    monkeypatch.setattr(BaseWrapper, 'cache', FitCache(path=str(tmp_path)))
+    a = WLSWrapper(estimator=sm.WLS).fit(endog=series, trend='c')
+    cache = BaseWrapper.cache
+    assert (cache.hits, cache.misses) == (0, 1)
+    # Hits do not fit the model
+    b = WLSWrapper(estimator=sm.WLS).fit(endog=series, trend='c')
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert b._result == a._result and b._raw is None
+    # Hits do not share their state with the cache (or other hits)
+    b._result['bic'] = 0
+    b._params.iloc[0] = 0
+    d = WLSWrapper(estimator=sm.WLS).fit(endog=series, trend='c')
+    assert d._result == a._result
+    assert np.allclose(d._params, a._raw.params)
+    # Disk tier
+    cache.clear()
+    c = WLSWrapper(estimator=sm.WLS).fit(endog=series, trend='c')
+    assert (cache.hits, cache.misses) == (1, 0)
+    assert c.x1_coef == a.x1_coef
+    assert np.allclose(c._params, a._raw.params)
+    # Different content is a miss
+    e = WLSWrapper(estimator=sm.WLS).fit(endog=series + 1, trend='c')
+    assert (cache.hits, cache.misses) == (1, 1) and e._raw is not None
+    # Functions with different code or closure are different
+    import functools
+    from pyamr.core.cache import fit_key
+    scale = lambda a: (lambda x: x * a)
+    w = WLSWrapper(estimator=sm.WLS)
+    key = lambda f: fit_key(w, {'endog': series, 'W': f})
+    assert key(scale(1)) == key(scale(1)) != key(scale(2))
+    assert key(lambda x: x + 1) != key(lambda x: x + 2)
+    assert key(functools.partial(np.add, 1)) != \
+        key(functools.partial(np.add, 2))
+
+def test_wlsarma_batch_equals_wrapper():
+    from pyamr.core.regression.wlsarma import WLSARMAWrapper
+    from pyamr.core.regression.wlsarma import WLSARMABatch
+    rs = np.random.RandomState(0)
+    Y = np.arange(40)[:, None] * 0.5 + np.cumsum(rs.randn(40, 3), axis=0)
+    kwargs = {'order': (1, 0, 0), 'trend': 'n', 'disp': 0}
+    batch = WLSARMABatch().fit(Y, wls_kwargs={'trend': 'c'},
+                               sarimax_kwargs=kwargs)
+    pred = batch.get_prediction(start=30, end=45)
+    for i in range(Y.shape[1]):
+        w = WLSARMAWrapper().fit(endog=Y[:, i], wls_kwargs={'trend': 'c'},
+                                 sarimax_kwargs=kwargs)
+        p = w.get_prediction(start=30, end=45)
+        assert np.allclose(w._fittedvalues, batch.fittedvalues[:, i])
+        assert np.allclose(p, pred[i])
+        assert np.allclose(p[1], w.get_prediction(start=30, end=45,
+            ptype='wls')[1] + w._arma.get_prediction(start=30, end=45)[1])
+
+@pytest.mark.parametrize("start,end", [(None, None), (30, 45), (50, 70)])
+def test_wlsarma_prediction_ptypes(start, end):
+    from pyamr.core.regression.wlsarma import WLSARMAWrapper
+    rs = np.random.RandomState(0)
+    y = np.arange(40) * 0.5 + np.cumsum(rs.randn(40))
+    w = WLSARMAWrapper().fit(endog=y, wls_kwargs={'trend': 'c'},
+        sarimax_kwargs={'order': (1, 0, 0), 'trend': 'n', 'disp': 0})
+    wls = w.get_prediction(start=start, end=end, ptype='wls')
+    arma = w.get_prediction(start=start, end=end, ptype='arma')
+    both = w.get_prediction(start=start, end=end)
+    assert np.array_equal(wls[0], arma[0]) and np.array_equal(wls[0], both[0])
+    assert np.allclose(both[1:], wls[1:] + arma[1])
+    # The ARMA of the residuals is required
+    with pytest.raises(ValueError):
+        WLSARMAWrapper().fit(endog=y, wls_kwargs={'trend': 'c'})
+
+def test_kendall_merge_sort_equals_sign_matrix():
+    from pyamr.core.stats import kendall as k
+    rs = np.random.RandomState(0)
+    x = np.round(rs.randn(600) * 5) + np.arange(600) * 0.01
+    d = np.sign(x[None, :] - x[:, None])
+    assert k._s(x) == d[np.triu_indices(x.size, 1)].sum()
+    x[10] = np.nan
+    assert k.kendall(x) == [None, None]
+    assert k.kendall(x[11:]) == k.kendall(list(x[11:]))
+    # Many long series at once (merge sort of all the columns)
+    X = np.round(rs.randn(300, 5) * 5)
+    X[3, 1], X[:2, 4] = np.nan, np.inf
+    s = k._s_arrays(X)
+    assert np.isnan(s[1]) and np.isnan(s[4])
+    for i in [0, 2, 3]:
+        d = np.sign(X[None, :, i] - X[:, None, i])
+        assert s[i] == d[np.triu_indices(300, 1)].sum()
+
+def test_kendall_batch_equals_kendall():
+    import pandas as pd
+    from pyamr.core.stats.kendall import kendall
+    from pyamr.core.stats.kendall import kendall_batch
+    rs = np.random.RandomState(0)
+    X = np.round(rs.randn(40, 20) * 3) + np.arange(40)[:, None] * 0.2
+    X[5, 3] = np.nan
+    r = kendall_batch(X, correction=None)
+    for i in range(X.shape[1]):
+        p, z = kendall(X[:, i])
+        if p is None:
+            assert np.isnan(r.z[i]) and r.trend_direction[i] is None
+            continue
+        assert np.isclose(r.pvalue[i], p) and np.isclose(r.z[i], z)
+    # Benjamini-Hochberg adjusted pvalues are larger
+    a = kendall_batch(X)
+    assert (a.pvalue_adj.dropna() >= a.pvalue.dropna() - 1e-12).all()
+    # Long format (different lengths)
+    df = pd.DataFrame({'g': np.repeat(['a', 'b'], [10, 25]),
+                       'v': rs.randn(35)})
+    l = kendall_batch(df, by='g', value='v')
+    assert list(l.index) == ['a', 'b']
+    assert np.isclose(l.loc['b', 'z'], kendall(df.v[10:].values)[1])
+
+def test_kendall_seasonal_and_bootstrap():
+    from pyamr.core.stats import kendall as k
+    rs = np.random.RandomState(0)
+    X = rs.randn(48, 4) + np.arange(48)[:, None] * 0.05
+    # Seasonal with one season is the standard test
+    assert np.allclose(k.seasonal_kendall(X[:, 0], period=1),
+                       k.kendall(X[:, 0]))
+    # Seasonal adds the S of each season
+    s = sum(k._s(X[j::12, 0]) for j in range(12))
+    assert k.kendall_batch(X, method='seasonal', period=12).s[0] == s
+    # Bootstrap batch equals bootstrap of each series
+    b = k.kendall_batch(X, method='bootstrap', n_boot=200, random_state=1)
+    for i in range(X.shape[1]):
+        p, z = k.bootstrap_kendall(X[:, i], n_boot=200, random_state=1)
+        assert np.isclose(b.pvalue[i], p) and np.isclose(b.z[i], z)
+    with pytest.raises(ValueError):
+        k.kendall_batch(X, method='unknown')
+
+def test_stationarity_batch(capsys):
+    from pyamr.core.stats.stationarity import StationarityWrapper
+    from pyamr.core.stats.stationarity import stationarity_batch
+    rs = np.random.RandomState(0)
+    X = np.cumsum(rs.randn(60, 4), axis=0)
+    X[:, 3] = 1.0
+    calls = []
+    r = stationarity_batch(X, tests=['adfuller-c', 'kpss-c'],
+        callback=lambda i, n, name, error: calls.append((name, error)))
+    w = StationarityWrapper().fit(x=X[:, 0], tests=['adfuller-c', 'kpss-c'])
+    assert list(r.columns) == list(w._result)
+    assert np.isclose(r.loc[0, 'adf_c_pvalue'], w.adf_c_pvalue)
+    assert r.loc[3].isna().all() and calls[3][1] is not None
+    assert 'adf_ct_pvalue' not in w._result
+    assert capsys.readouterr().out == ''
+
+@pytest.mark.parametrize("tests", [['adfuller-c', 'kpss-c'], ['kpss-ct'],
+                                   ['rur'], None])
+@pytest.mark.filterwarnings('ignore')
+def test_stationarity_summary_partial_fit(tests):
+    from pyamr.core.stats.stationarity import StationarityWrapper
+    x = np.cumsum(np.random.RandomState(0).randn(60))
+    w = StationarityWrapper().fit(x=x, tests=tests)
+    rows = w.as_summary().split('\n')[4:-1]
+    regressions = {t.split('-')[1] for t in (tests or ['adfuller-c',
+        'adfuller-ct']) if '-' in t}
+    assert sorted(r.split()[0] for r in rows) == sorted(regressions)
+    if tests == ['kpss-ct']:
+        assert rows[0].split()[1] == '-'
+
+@pytest.mark.parametrize("regression", ['c', 'ct', 'n'])
+@pytest.mark.parametrize("autolag", ['AIC', 't-stat', None])
+def test_adfuller_batch_equals_statsmodels(regression, autolag):
+    from statsmodels.tsa.stattools import adfuller
+    from pyamr.core.stats.adfuller import adfuller_batch
+    rs = np.random.RandomState(0)
+    X = np.cumsum(rs.randn(60, 6), axis=0)
+    X[:, :3] = rs.randn(60, 3)
+    r = adfuller_batch(X, regression=regression, autolag=autolag)
+    for i in range(X.shape[1]):
+        stat, p, lags, nobs, crit = adfuller(X[:, i],
+            regression=regression, autolag=autolag)[:5]
+        assert np.isclose(r.statistic[i], stat)
+        assert np.isclose(r.pvalue[i], p)
+        assert r.nlags[i] == lags and r.nobs[i] == nobs
+        assert np.isclose(r['criticalvalue_5%'][i], crit['5%'])
+
+@pytest.mark.parametrize("regression", ['c', 'ct'])
+@pytest.mark.parametrize("nlags", ['auto', 'legacy', 3])
+def test_kpss_batch_equals_wrapper(regression, nlags):
+    import warnings
+    from statsmodels.tsa.stattools import kpss
+    from pyamr.core.stats.kpss import KPSSWrapper, kpss_batch
+    rs = np.random.RandomState(0)
+    X = np.cumsum(rs.randn(60, 6), axis=0)
+    X[:, :3] = rs.randn(60, 3)
+    X[0, 5] = np.nan
+    r = kpss_batch(X, regression=regression, nlags=nlags)
+    assert np.isnan(r.statistic[5]) and r.stationary[5] is None
+    for i in range(5):
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            w = KPSSWrapper(estimator=kpss).fit(x=X[:, i],
+                regression=regression, nlags=nlags)
+        assert np.isclose(r.statistic[i], w.statistic)
+        assert np.isclose(r.pvalue[i], w.pvalue)
+        assert r.nlags[i] == w.nlags
+        assert r.stationary[i] == w.is_stationary()
+        assert list(r.columns) == list(w._result)
+        assert w.stationary == w.is_stationary()
+    # Significance and null hypothesis of the summary
+    a = kpss_batch(X, regression=regression, nlags=nlags, alpha=0.001)
+    assert (a.stationary[:5] == (a.pvalue[:5] > 0.001)).all()
+    h0 = {'c': 'Level stationary', 'ct': 'Trend stationary'}[regression]
+    assert 'H0: %34s' % h0 in w.as_summary(verbose=10)
+
+def test_correlation_batch_equals_scipy():
+    from scipy.stats import pearsonr, spearmanr
+    from pyamr.core.stats.correlation import correlation_batch
+    from pyamr.core.stats.correlation import crosscorrelation_batch
+    rs = np.random.RandomState(0)
+    X = np.cumsum(rs.randn(40, 5), axis=0)
+    X[rs.rand(40, 5) < 0.1] = np.nan
+    X[:, 4] = np.round(X[:, 4])
+    r = correlation_batch(X, X[:, :2] * 2)
+    assert r.shape[0] == 10 and len(correlation_batch(X)) == 10
+    for (i, j), row in r.iterrows():
+        m = ~np.isnan(X[:, i]) & ~np.isnan(X[:, j])
+        p, s = pearsonr(X[m, i], X[m, j]), spearmanr(X[m, i], X[m, j])
+        assert np.isclose(row.pearson_corr, p[0])
+        assert np.isclose(row.pearson_pval, p[1])
+        assert np.isclose(row.spearman_corr, s.correlation)
+        assert np.isclose(row.spearman_pval, s.pvalue, atol=1e-12)
+        assert row.nobs == m.sum()
+    # Lagged correlation between x[t] and y[t+k]
+    c = crosscorrelation_batch(X[:, :2], maxlag=3)
+    for k in range(-3, 4):
+        a, b = (X[:40 - k, 0], X[k:, 1]) if k >= 0 else \
+               (X[-k:, 0], X[:40 + k, 1])
+        m = ~np.isnan(a) & ~np.isnan(b)
+        assert np.isclose(c.loc[(0, 1), k], pearsonr(a[m], b[m])[0])
+
+@pytest.mark.parametrize("mode", ['pairwise', 'fast'])
+def test_theilslopes_batch_equals_scipy(mode):
+    from scipy.stats import theilslopes
+    from pyamr.core.regression.theilsens import theilslopes_batch
+    rs = np.random.RandomState(0)
+    Y = np.cumsum(rs.randn(60, 6), axis=0)
+    Y[:, 1] = np.round(Y[:, 1])
+    Y[rs.rand(60, 6) < 0.1] = np.nan
+    x = np.round(np.arange(60) / 2.)
+    r = theilslopes_batch(Y, x=x, mode=mode, method='joint')
+    for i in range(Y.shape[1]):
+        m = ~np.isnan(Y[:, i])
+        assert np.allclose(r.iloc[i], theilslopes(Y[m, i], x[m],
+                                                  method='joint'))
+    with pytest.raises(ValueError):
+        theilslopes_batch(Y, mode='unknown')
+
+def test_wrapper_profiling(series, tmp_path):
+    import statsmodels.api as sm
+    from pyamr.core.profiling import profile_report
+    from pyamr.core.regression.wls import WLSWrapper
+    from pyamr.core.serialize import save_wrappers, load_wrappers
+    w = WLSWrapper(estimator=sm.WLS).fit(endog=series, trend='c')
+    assert '_timings' not in w.__dict__ and w.profile().empty
+    w = WLSWrapper(estimator=sm.WLS)
+    w.profiling = 'memory'
+    w.fit(endog=series, trend='c').as_series()
+    r = w.profile()
+    assert list(r.index) == ['fit', 'evaluate', 'diagnostics', 'summary']
+    assert (r.calls == 1).all() and (r.memory > 0).all()
+    wrappers = w.grid_search(grid_params={'endog': [series],
+        'trend': ['c'], 'weights': [None, np.ones(len(series))]})
+    g = profile_report(wrappers)
+    assert g.loc['deepcopy', 'calls'] == 2 and g.loc['fit', 'calls'] == 2
+    save_wrappers(wrappers, tmp_path / 'w.npz')
+    assert len(load_wrappers(tmp_path / 'w.npz')) == 2
+    # Failed phases are also recorded
+    from pyamr.core.profiling import record
+    for profiling in [True, 'memory']:
+        w.profiling, w._timings = profiling, {}
+        with pytest.raises(ZeroDivisionError):
+            with record(w, 'fit'):
+                1 / 0
+        assert w.profile().loc['fit', 'calls'] == 1
+
+def test_from_list_dataframe(series, tmp_path):
+    import statsmodels.api as sm
+    from pyamr.core.regression.wls import WLSWrapper
+    from pyamr.core.regression.theilsens import TheilSensWrapper
+    a = WLSWrapper(estimator=sm.WLS).fit(endog=series, trend='c')
+    b = WLSWrapper(estimator=sm.WLS, diagnostics=None) \
+        .fit(endog=series, trend='c')
+    r = WLSWrapper().from_list_dataframe([a, b, a])
+    assert r.shape[0] == 3
+    assert list(r.columns[:3]) == list(a.as_series().index[:3])
+    assert np.isnan(r['wls-m_jb_prob'][1]) and r['wls-model'][0] is a._raw
+    r = WLSWrapper().from_list_dataframe([a], exclude=['model', 'endog'])
+    assert 'wls-model' not in r and 'wls-endog' not in r
+    n = WLSWrapper().from_list_dataframe([a, b], fname=tmp_path / 's.jsonl',
+                                         exclude=['model'], flabel=False)
+    s = pd.read_json(tmp_path / 's.jsonl', lines=True)
+    assert n == 2 and np.isclose(s.m_dw[0], a.m_dw) and np.isnan(s.m_dw[1])
+    g = TheilSensWrapper().grid_search_dataframe(grid_params={
+        'x': [np.arange(len(series))], 'y': [series], 'alpha': [0.05, 0.1]},
+        exclude=['model', 'x', 'y'])
+    assert g.shape[1] == 2 and 'theilsens-x' not in g.index
+    p = TheilSensWrapper().grid_search_dataframe(grid_params={
+        'x': [np.arange(len(series))], 'y': [series], 'alpha': [0.05, 0.1]},
+        exclude=['model', 'x', 'y'], n_jobs=2, executor='thread',
+        chunksize=1, timeout=60)
+    assert p.equals(g)
+
+@pytest.mark.parametrize("diagnostics", [None, ['dw']])
+def test_wls_lazy_diagnostics(series, diagnostics):
+    import statsmodels.api as sm
+    from pyamr.core.regression.wls import WLSWrapper
+    a = WLSWrapper(estimator=sm.WLS).fit(endog=series, trend='c')
+    b = WLSWrapper(estimator=sm.WLS, diagnostics=diagnostics) \
+        .fit(endog=series, trend='c')
+    assert 'm_jb_prob' not in b._result
+    assert b.m_jb_prob == a.m_jb_prob
+    assert 'm_jb_prob' in b._result
+    with pytest.raises(ValueError):
+        WLSWrapper(estimator=sm.WLS, diagnostics=['xx']) \
+            .fit(endog=series, trend='c')
+
+def test_sarimax_auto_prunes_invalid(series):
+    from statsmodels.tsa.statespace.sarimax import SARIMAX
+    from pyamr.core.regression.sarimax import SARIMAXWrapper
+    fits, best = SARIMAXWrapper(estimator=SARIMAX).auto(series,
+        max_ar=1, max_ma=1, max_d=1, trends=['n', 'c'],
+        converged=False, return_fits=True)
+    ids = [(tuple(w.order), w.trend) for w in fits]
+    assert len(ids) == len(set(ids)) == 15
+    assert ((0, 0, 0), 'n') not in ids
+
+def test_sarimax_refit_warm_start(series):
+    from statsmodels.tsa.statespace.sarimax import SARIMAX
+    from pyamr.core.regression.sarimax import SARIMAXWrapper
+    kwargs = dict(exog=None, order=(1, 1, 0), trend='n', disp=0)
+    w = SARIMAXWrapper(estimator=SARIMAX).fit(endog=series[:50], **kwargs)
+    a = w.refit(series[5:55])
+    b = SARIMAXWrapper(estimator=SARIMAX).fit(endog=series[5:55], **kwargs)
+    assert np.isclose(a.llf, b.llf, atol=1e-3)
+    # Parameters by name (new lags start at zero)
+    c = SARIMAXWrapper(estimator=SARIMAX).fit(endog=series[:50],
+        exog=None, order=(2, 1, 0), trend='n', disp=0,
+        start_params=w.params_dict())
+    assert c.llf >= w.llf - 1e-6
+
+def test_sarimax_auto_stepwise(series):
+    from statsmodels.tsa.statespace.sarimax import SARIMAX
+    from pyamr.core.regression.sarimax import SARIMAXWrapper
+    w = SARIMAXWrapper(estimator=SARIMAX)
+    grid, a = w.auto(series, max_ar=2, max_ma=2, trends=['n', 'c'],
+        return_fits=True)
+    fits, b = w.auto(series, max_ar=2, max_ma=2, trends=['n', 'c'],
+        search='stepwise', return_fits=True)
+    assert len(fits) < len(grid)
+    assert b.bic >= a.bic
+    with pytest.raises(ValueError):
+        w.auto(series, search='random')
+
+
+# --------------------------------------
+# Weights
+# --------------------------------------
+@pytest.mark.parametrize("kwargs",
+    [{}, {'percentiles': [10, 90]}, {'thresholds': [15, 85]}])
+def test_weights_batch_equals_weights(kwargs):
+    x = np.random.rand(5, 20) * 100
+    W = SigmoidA(r=200, g=0.5, **kwargs)
+    r = W.weights_batch(x)
+    assert np.allclose(r, np.array([W.weights(e) for e in x]))
+
+def test_weights_batch_ragged_constant():
+    W = SigmoidA(r=200, g=0.5)
+    r = W.weights_batch(np.array([3, 3, 3, 1, 2, 3]), offsets=[0, 3, 6])
+    assert r.shape == (6,)
+    assert not np.isnan(r).any()